@@ -0,0 +1,434 @@
+"""Firestore client factory and a local stand-in for it.
+
+Every script gets its client from get_client(): the real Firestore client
+(service account key, connected lazily) or a FakeFirestore. The fake keeps
+documents in memory, optionally persisted to a snapshot file between runs,
+and adds a fixed simulated latency to every round trip. It implements the
+part of the google-cloud-firestore API the pipeline uses:
+
+    client.collection(name).document(id).set(data) / .get() / .collection(name)
+    client.collection(name).stream(), .order_by(), .where(), .start_after(), .limit()
+    client.collection_group(name), client.document(path), client.batch()
+"""
+import json
+import os
+import pickle
+import random
+import string
+import threading
+import time
+from datetime import datetime, timezone
+
+KEY_PATH = 'config/serviceAccountKey.json'
+DOCUMENT_ID = "__name__"  # same value as FieldPath.document_id()
+MAX_BATCH_WRITES = 500
+
+# --- CLIENT FACTORY ---
+def firebase_client(key_path=KEY_PATH):
+    """Initializes firebase_admin once and returns its Firestore client.
+    Raises FileNotFoundError if the service account key is missing."""
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+
+    # Check to ensure app isn't initialized twice if running in a loop/notebook
+    if not firebase_admin._apps:
+        if not os.path.exists(key_path):
+            raise FileNotFoundError(f"Key file not found at {key_path}")
+        with open(key_path, 'r') as readfile:
+            service_account_info = json.load(readfile)
+        firebase_admin.initialize_app(credentials.Certificate(service_account_info))
+    return firestore.client()
+
+def get_client(fake=None, latency=0.0, key_path=KEY_PATH, seed=None):
+    """Returns the Firestore client to use.
+
+    fake: None for real Firestore, ":memory:" for an empty in-memory fake, or
+        the path of a FakeFirestore snapshot (loaded if it exists, written back
+        by close()).
+    latency: simulated seconds per round trip (fake only).
+    """
+    if fake is None:
+        return firebase_client(key_path)
+    return FakeFirestore(None if fake == ":memory:" else fake, latency, seed)
+
+def add_client_arguments(parser):
+    parser.add_argument("--key", default=KEY_PATH, help=f"Service account key file (default: {KEY_PATH})")
+    parser.add_argument("--fake", metavar="PATH", default=None,
+                        help="Use a local fake Firestore persisted to PATH (':memory:' for none) "
+                             "instead of the real project")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="Simulated seconds per round trip for --fake (default: 0)")
+
+def client_from_args(args):
+    return get_client(args.fake, args.latency, args.key)
+
+# --- FAKE FIRESTORE ---
+def _normalize(value):
+    """Copies a document value the way Firestore stores it: naive datetimes
+    become UTC, containers are copied."""
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    return value
+
+def _get_field(data, field_path):
+    """Value at a dotted field path, or None."""
+    for part in field_path.split('.'):
+        if not isinstance(data, dict):
+            return None
+        data = data.get(part)
+    return data
+
+def _has_field(data, field_path):
+    for part in field_path.split('.'):
+        if not isinstance(data, dict) or part not in data:
+            return False
+        data = data[part]
+    return True
+
+def _path_key(path):
+    return tuple(path.split('/'))
+
+def _order_key(value):
+    """Sort key following Firestore's cross-type value ordering."""
+    if value is None:
+        return (0,)
+    if isinstance(value, bool):
+        return (1, value)
+    if isinstance(value, (int, float)):
+        return (2, value)
+    if isinstance(value, datetime):
+        return (3, value if value.tzinfo else value.replace(tzinfo=timezone.utc))
+    if isinstance(value, str):
+        return (4, value)
+    if isinstance(value, bytes):
+        return (5, value)
+    if isinstance(value, FakeDocumentReference):
+        return (6, _path_key(value.path))
+    if isinstance(value, (list, tuple)):
+        return (8, tuple(_order_key(item) for item in value))
+    if isinstance(value, dict):
+        return (9, tuple((key, _order_key(value[key])) for key in sorted(value)))
+    raise TypeError(f"Unsupported Firestore value: {value!r}")
+
+_OPERATORS = {
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+}
+
+def _matches(data, field_path, op, value):
+    if not _has_field(data, field_path):
+        return False
+    actual = _get_field(data, field_path)
+    if op in _OPERATORS:
+        actual_key, value_key = _order_key(actual), _order_key(value)
+        # Range filters only match values of the same type
+        if op not in ("==", "!=") and actual_key[0] != value_key[0]:
+            return False
+        return _OPERATORS[op](actual_key, value_key)
+    if op == "in":
+        return any(_order_key(actual) == _order_key(item) for item in value)
+    if op == "not-in":
+        return all(_order_key(actual) != _order_key(item) for item in value)
+    if op == "array_contains":
+        return isinstance(actual, list) and value in actual
+    if op == "array_contains_any":
+        return isinstance(actual, list) and any(item in actual for item in value)
+    raise ValueError(f"Unsupported operator: {op!r}")
+
+class FakeDocumentSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+        self.exists = data is not None
+
+    def to_dict(self):
+        return None if self._data is None else dict(self._data)
+
+    def get(self, field_path):
+        return _get_field(self._data, field_path)
+
+class FakeQuery:
+    """Immutable query over one collection, or over every collection with a
+    given id (collection group)."""
+
+    ASCENDING = "ASCENDING"
+    DESCENDING = "DESCENDING"
+
+    def __init__(self, client, collection_id, parent_path=None, all_descendants=False,
+                 orders=(), filters=(), cursor=None, limit=None):
+        self._client = client
+        self._collection_id = collection_id
+        self._parent_path = parent_path
+        self._all_descendants = all_descendants
+        self._orders = tuple(orders)
+        self._filters = tuple(filters)
+        self._cursor = cursor
+        self._limit = limit
+
+    def _copy(self, **changes):
+        state = dict(orders=self._orders, filters=self._filters, cursor=self._cursor, limit=self._limit)
+        state.update(changes)
+        return FakeQuery(self._client, self._collection_id, self._parent_path, self._all_descendants, **state)
+
+    def order_by(self, field_path, direction=ASCENDING):
+        return self._copy(orders=self._orders + ((field_path, direction),))
+
+    def where(self, field_path=None, op_string=None, value=None, filter=None):
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        return self._copy(filters=self._filters + ((field_path, op_string, value),))
+
+    def start_after(self, document_fields):
+        return self._copy(cursor=(document_fields, False))
+
+    def start_at(self, document_fields):
+        return self._copy(cursor=(document_fields, True))
+
+    def limit(self, count):
+        return self._copy(limit=count)
+
+    # --- Evaluation ---
+    def _full_orders(self):
+        # Results are always ordered by document name last
+        orders = list(self._orders)
+        if not any(field == DOCUMENT_ID for field, _ in orders):
+            direction = orders[-1][1] if orders else self.ASCENDING
+            orders.append((DOCUMENT_ID, direction))
+        return orders
+
+    def _key(self, path, data, field):
+        if field == DOCUMENT_ID:
+            return (6, _path_key(path))
+        return _order_key(_get_field(data, field))
+
+    def _cursor_keys(self, orders):
+        fields, _ = self._cursor
+        if isinstance(fields, FakeDocumentSnapshot):
+            path, data = fields.reference.path, fields._data
+            return [self._key(path, data, field) for field, _ in orders]
+        keys = []
+        for field, _ in orders:
+            if field not in fields:
+                break
+            value = fields[field]
+            if field == DOCUMENT_ID:
+                path = value.path if isinstance(value, FakeDocumentReference) else f"{self._parent_path}/{self._collection_id}/{value}".lstrip('/')
+                keys.append((6, _path_key(path)))
+            else:
+                keys.append(_order_key(value))
+        return keys
+
+    def _past_cursor(self, row_keys, cursor_keys, directions, inclusive):
+        for row, cursor, direction in zip(row_keys, cursor_keys, directions):
+            if row != cursor:
+                return row > cursor if direction == self.ASCENDING else row < cursor
+        return inclusive
+
+    def _results(self):
+        rows = self._client._documents_in(self._collection_id, self._parent_path, self._all_descendants)
+        rows = [(path, data) for path, data in rows
+                if all(_matches(data, *condition) for condition in self._filters)]
+        orders = self._full_orders()
+        # Firestore leaves out documents that lack an ordered field
+        rows = [(path, data) for path, data in rows
+                if all(field == DOCUMENT_ID or _has_field(data, field) for field, _ in orders)]
+        for field, direction in reversed(orders):
+            rows.sort(key=lambda row: self._key(row[0], row[1], field), reverse=direction == self.DESCENDING)
+        if self._cursor is not None:
+            cursor_keys = self._cursor_keys(orders)
+            directions = [direction for _, direction in orders]
+            inclusive = self._cursor[1]
+            rows = [(path, data) for path, data in rows
+                    if self._past_cursor([self._key(path, data, field) for field, _ in orders],
+                                         cursor_keys, directions, inclusive)]
+        if self._limit is not None:
+            rows = rows[:self._limit]
+        return rows
+
+    def stream(self, transaction=None):
+        self._client._round_trip()
+        for path, data in self._results():
+            yield FakeDocumentSnapshot(self._client.document(path), data)
+
+    def get(self, transaction=None):
+        return list(self.stream())
+
+class FakeCollectionReference(FakeQuery):
+    def __init__(self, client, path):
+        parent_path, _, collection_id = path.rpartition('/')
+        super().__init__(client, collection_id, parent_path)
+        self.path = path
+        self.id = collection_id
+        self.parent = client.document(parent_path) if parent_path else None
+
+    def document(self, document_id=None):
+        if document_id is None:
+            document_id = self._client._new_id()
+        return self._client.document(f"{self.path}/{document_id}")
+
+    def add(self, document_data, document_id=None):
+        reference = self.document(document_id)
+        reference.set(document_data)
+        return datetime.now(timezone.utc), reference
+
+class FakeDocumentReference:
+    def __init__(self, client, path):
+        self._client = client
+        self.path = path
+        self.id = path.rpartition('/')[2]
+
+    @property
+    def parent(self):
+        return FakeCollectionReference(self._client, self.path.rpartition('/')[0])
+
+    def collection(self, collection_id):
+        return FakeCollectionReference(self._client, f"{self.path}/{collection_id}")
+
+    def set(self, document_data, merge=False):
+        self._client._round_trip()
+        self._client._apply([("set", self.path, document_data, merge)])
+
+    def update(self, field_updates):
+        self._client._round_trip()
+        self._client._apply([("update", self.path, field_updates, False)])
+
+    def delete(self):
+        self._client._round_trip()
+        self._client._apply([("delete", self.path, None, False)])
+
+    def get(self, field_paths=None, transaction=None):
+        self._client._round_trip()
+        return FakeDocumentSnapshot(self, self._client._read(self.path))
+
+    def __eq__(self, other):
+        return isinstance(other, FakeDocumentReference) and other.path == self.path
+
+    def __hash__(self):
+        return hash(self.path)
+
+class FakeWriteBatch:
+    """Writes applied atomically in one round trip on commit()."""
+
+    def __init__(self, client):
+        self._client = client
+        self._writes = []
+
+    def set(self, reference, document_data, merge=False):
+        self._writes.append(("set", reference.path, document_data, merge))
+
+    def update(self, reference, field_updates):
+        self._writes.append(("update", reference.path, field_updates, False))
+
+    def delete(self, reference):
+        self._writes.append(("delete", reference.path, None, False))
+
+    def commit(self):
+        if len(self._writes) > MAX_BATCH_WRITES:
+            raise ValueError(f"A batch can contain at most {MAX_BATCH_WRITES} writes, got {len(self._writes)}")
+        self._client._round_trip()
+        self._client._apply(self._writes)
+        writes, self._writes = self._writes, []
+        return writes
+
+    def __len__(self):
+        return len(self._writes)
+
+class FakeFirestore:
+    """In-memory Firestore stand-in. Documents are indexed by collection path,
+    so reading one recipe's sub-collection does not scan the whole store."""
+
+    def __init__(self, path=None, latency=0.0, seed=None):
+        self.path = path
+        self.latency = latency
+        self.round_trips = 0
+        self._lock = threading.Lock()
+        self._ids = random.Random(seed)
+        # collection path -> {document id: data}
+        self._collections = {}
+        if path and os.path.exists(path):
+            with open(path, 'rb') as f:
+                self._collections = pickle.load(f)
+
+    # --- Public API ---
+    def collection(self, collection_path):
+        return FakeCollectionReference(self, collection_path)
+
+    def document(self, document_path):
+        return FakeDocumentReference(self, document_path)
+
+    def collection_group(self, collection_id):
+        return FakeQuery(self, collection_id, all_descendants=True)
+
+    def batch(self):
+        return FakeWriteBatch(self)
+
+    def close(self):
+        """Writes the snapshot file, if any."""
+        if not self.path:
+            return
+        with self._lock:
+            with open(self.path + '.tmp', 'wb') as f:
+                pickle.dump(self._collections, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(self.path + '.tmp', self.path)
+
+    def count(self):
+        return sum(len(documents) for documents in self._collections.values())
+
+    # --- Storage ---
+    def _round_trip(self):
+        self.round_trips += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _new_id(self):
+        with self._lock:
+            return ''.join(self._ids.choices(string.ascii_letters + string.digits, k=20))
+
+    def _read(self, path):
+        collection, _, document_id = path.rpartition('/')
+        return self._collections.get(collection, {}).get(document_id)
+
+    def _apply(self, writes):
+        with self._lock:
+            for kind, path, data, merge in writes:
+                collection, _, document_id = path.rpartition('/')
+                documents = self._collections.setdefault(collection, {})
+                if kind == "delete":
+                    documents.pop(document_id, None)
+                elif kind == "update":
+                    if document_id not in documents:
+                        raise KeyError(f"No document to update: {path}")
+                    updated = dict(documents[document_id])
+                    for field_path, value in data.items():
+                        target = updated
+                        *parents, leaf = field_path.split('.')
+                        for part in parents:
+                            target[part] = dict(target.get(part) or {})
+                            target = target[part]
+                        target[leaf] = _normalize(value)
+                    documents[document_id] = updated
+                elif merge and document_id in documents:
+                    documents[document_id] = {**documents[document_id], **_normalize(data)}
+                else:
+                    documents[document_id] = _normalize(data)
+
+    def _documents_in(self, collection_id, parent_path, all_descendants):
+        """Snapshot of (path, data) for one collection or a collection group."""
+        with self._lock:
+            if not all_descendants:
+                collection = f"{parent_path}/{collection_id}".lstrip('/')
+                return [(f"{collection}/{document_id}", data)
+                        for document_id, data in self._collections.get(collection, {}).items()]
+            return [(f"{collection}/{document_id}", data)
+                    for collection, documents in self._collections.items()
+                    if collection.rpartition('/')[2] == collection_id
+                    for document_id, data in documents.items()]
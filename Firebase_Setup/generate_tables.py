@@ -0,0 +1,198 @@
+"""Offline synthetic dataset generator for the normalized tables.
+
+Writes recipes/ingredients/steps/interactions tables in the shape the ETL
+produces, using the vocabularies of genrate_sytetic.py, without going through
+Firestore. Rows are sampled with vectorized NumPy in chunks of recipes, so
+memory stays bounded and 10^8-row fixtures build in minutes. The same seed
+and --chunk-recipes always give the same tables.
+
+    python generate_tables.py --recipes 1000000 --interactions 100000000 --format csv --format parquet
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Make the project root importable when run as a script from this folder
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from Firebase_Setup.genrate_sytetic import (
+    difficulty_levels, ingredient_pool, interaction_types, recipe_titles, sample_users, units,
+)
+from transform_data.durations import parse_durations
+from transform_data.tables import OUTPUT_FORMATS, TABLES, open_writer, table_path
+
+# --- VOCABULARIES ---
+# Same ranges and phrases as genrate_sytetic.py, as arrays to index into
+TITLES = np.array(recipe_titles, dtype=object)
+DESCRIPTIONS = np.array([f"Traditional Maharashtrian style {title}." for title in recipe_titles], dtype=object)
+INGREDIENTS = np.array(ingredient_pool, dtype=object)
+UNITS = np.array(units, dtype=object)
+DIFFICULTIES = np.array(difficulty_levels, dtype=object)
+INTERACTION_TYPES = np.array(interaction_types, dtype=object)
+USER_IDS = np.array([user["userID"] for user in sample_users], dtype=object)
+USERNAMES = np.array([user["username"] for user in sample_users], dtype=object)
+VERBS = ["Tempering (Phodni)", "Sauté", "Steam", "Knead", "Roll", "Deep Fry", "Garnish", "Pressure Cook"]
+INSTRUCTIONS = np.array([f"{verb} the mixture properly for authentic taste." for verb in VERBS], dtype=object)
+DURATIONS = np.array([f"{minutes} min" for minutes in range(16)], dtype=object)
+QUANTITIES = np.array([str(quantity) for quantity in range(251)], dtype=object)
+RATINGS = np.array([str(rating) for rating in range(6)], dtype=object)
+COOKNOTES = np.array(["Mast zala hota.", "Lai bhari! (Awesome)"], dtype=object)
+
+ID_ALPHABET = np.frombuffer(b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789", dtype=np.uint8)
+START_TIME = np.datetime64("2025-01-01T00:00:00", "us")
+DEFAULT_CHUNK_RECIPES = 20_000
+
+# --- SAMPLING ---
+def random_ids(rng, n):
+    """n Firestore-style 20-character alphanumeric document IDs."""
+    codes = ID_ALPHABET[rng.integers(0, len(ID_ALPHABET), size=(n, 20))]
+    return codes.view("S20").ravel().astype(str).astype(object)
+
+def utc(timestamps):
+    return pd.Series(timestamps).dt.tz_localize("UTC")
+
+def frame(data):
+    """DataFrame that keeps string columns as object arrays; inferring
+    pandas' Arrow-backed string dtype would cost a conversion per column."""
+    return pd.DataFrame({column: values if isinstance(values, pd.Series) else pd.Series(values, dtype=values.dtype)
+                         for column, values in data.items()})
+
+def per_recipe_counts(rng, start, n, recipes, interactions):
+    """Interactions per recipe for recipes start..start+n: 1-4 each by
+    default, or `interactions` spread evenly over all `recipes`."""
+    if interactions is None:
+        return rng.integers(1, 5, size=n)
+    index = np.arange(start, start + n)
+    return interactions // recipes + (index < interactions % recipes)
+
+def child_positions(counts):
+    """(parent row of each child row, 1-based position within its parent)."""
+    parents = np.repeat(np.arange(len(counts)), counts)
+    starts = np.repeat(np.cumsum(counts) - counts, counts)
+    return parents, np.arange(len(parents)) - starts + 1
+
+def generate_chunk(rng, start, n, recipes, interactions, clock):
+    """Returns (recipes, ingredients, steps, interactions) DataFrames for n
+    recipes, and the creation time of the last recipe."""
+    recipe_ids = random_ids(rng, n)
+    title = rng.integers(0, len(TITLES), size=n)
+    author = rng.integers(0, len(USER_IDS), size=n)
+    prep = rng.integers(15, 41, size=n)
+    cook = rng.integers(20, 61, size=n)
+    # Recipes are created in order, a few seconds apart
+    created = clock + np.cumsum(rng.integers(1, 10_000_000, size=n)).astype("timedelta64[us]")
+    recipes_frame = frame({
+        "recipe_id": recipe_ids,
+        "title": TITLES[title],
+        "description": DESCRIPTIONS[title],
+        "prep_time_min": prep,
+        "cook_time_min": cook,
+        "total_time_min": prep + cook,
+        "difficulty": DIFFICULTIES[rng.integers(0, len(DIFFICULTIES), size=n)],
+        "category": np.full(n, "Uncategorized", dtype=object),
+        "dietary_type": np.full(n, "Unknown", dtype=object),
+        "author_id": USER_IDS[author],
+        "author_name": USERNAMES[author],
+        "created_at": utc(created),
+    })
+
+    # 6-12 distinct ingredients per recipe: the first k of a random permutation
+    counts = rng.integers(6, 13, size=n)
+    order = rng.random((n, len(INGREDIENTS))).argsort(axis=1)
+    parents, position = child_positions(counts)
+    rows = len(parents)
+    ingredients_frame = frame({
+        "recipe_id": recipe_ids[parents],
+        "name": INGREDIENTS[order[parents, position - 1]],
+        "quantity": QUANTITIES[rng.integers(1, 251, size=rows)],
+        "unit": UNITS[rng.integers(0, len(UNITS), size=rows)],
+        "is_optional": rng.random(rows) < 0.5,
+    })
+
+    # range(1, randint(5, 10)) in genrate_sytetic.py: 4-9 steps
+    counts = rng.integers(5, 11, size=n) - 1
+    parents, position = child_positions(counts)
+    rows = len(parents)
+    durations = DURATIONS[rng.integers(2, 16, size=rows)]
+    duration_min, duration_max_min = parse_durations(pd.Series(durations))
+    steps_frame = frame({
+        "recipe_id": recipe_ids[parents],
+        "step_number": position,
+        "instruction": INSTRUCTIONS[rng.integers(0, len(INSTRUCTIONS), size=rows)],
+        "duration": durations,
+        "duration_min": duration_min,
+        "duration_max_min": duration_max_min,
+    })
+
+    counts = per_recipe_counts(rng, start, n, recipes, interactions)
+    parents = np.repeat(np.arange(n), counts)
+    rows = len(parents)
+    user = rng.integers(0, len(USER_IDS), size=rows)
+    # Interactions arrive within 30 days of their recipe
+    offset = rng.integers(1, 30 * 86400 * 10**6, size=rows).astype("timedelta64[us]")
+    interactions_frame = frame({
+        "interaction_id": random_ids(rng, rows),
+        "recipe_id": recipe_ids[parents],
+        "user_id": USER_IDS[user],
+        "username": USERNAMES[user],
+        "type": INTERACTION_TYPES[rng.integers(0, len(INTERACTION_TYPES), size=rows)],
+        "rating": RATINGS[rng.integers(3, 6, size=rows)],
+        "cooknote": COOKNOTES[(rng.random(rows) > 0.6).astype(np.intp)],
+        "created_at": utc(created[parents] + offset),
+    })
+    frames = (recipes_frame, ingredients_frame, steps_frame, interactions_frame)
+    return frames, created[-1] if n else clock
+
+# --- DRIVER ---
+def generate_tables(out_dir, recipes, interactions=None, seed=0, formats=("csv",),
+                    chunk_recipes=DEFAULT_CHUNK_RECIPES):
+    """Writes the four tables for `recipes` recipes into `out_dir` in every
+    format of `formats`. Returns {table name: rows written}."""
+    os.makedirs(out_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    writers = {name: [open_writer(fmt, name, table_path(name, fmt, out_dir)) for fmt in formats]
+               for name in TABLES}
+    clock = START_TIME
+    try:
+        for start in range(0, recipes, chunk_recipes):
+            n = min(chunk_recipes, recipes - start)
+            frames, clock = generate_chunk(rng, start, n, recipes, interactions, clock)
+            for name, frame in zip(TABLES, frames):
+                for writer in writers[name]:
+                    writer.write_frame(frame)
+            print(f"  {start + n}/{recipes} recipes generated")
+    finally:
+        for table_writers in writers.values():
+            for writer in table_writers:
+                writer.close()
+    return {name: table_writers[0].rows for name, table_writers in writers.items()}
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic normalized recipe tables offline.")
+    parser.add_argument("--recipes", type=int, default=1000, help="Number of recipes (default: 1000)")
+    parser.add_argument("--interactions", type=int, default=None,
+                        help="Total interactions, spread evenly over the recipes (default: 1-4 per recipe)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    parser.add_argument("--format", action="append", choices=sorted(OUTPUT_FORMATS), dest="formats",
+                        help="Output format; repeat for several (default: csv)")
+    parser.add_argument("--out-dir", default="synthetic_tables", help="Output folder (default: ./synthetic_tables)")
+    parser.add_argument("--chunk-recipes", type=int, default=DEFAULT_CHUNK_RECIPES,
+                        help="Recipes generated per chunk; bounds memory use")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    rows = generate_tables(args.out_dir, args.recipes, args.interactions, args.seed,
+                           tuple(args.formats or ["csv"]), args.chunk_recipes)
+    elapsed = time.perf_counter() - started
+    print(f"Generated {', '.join(f'{count} {name}' for name, count in rows.items())} "
+          f"in {elapsed:.1f}s -> {os.path.abspath(args.out_dir)}")
+
+if __name__ == "__main__":
+    main()
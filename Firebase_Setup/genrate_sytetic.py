@@ -1,14 +1,18 @@
-import firebase_admin
-from firebase_admin import credentials, firestore
-from datetime import datetime
+import argparse
 import random
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
 
-# Check if app is already initialized to avoid errors on re-run
-if not firebase_admin._apps:
-    cred = credentials.Certificate('config/serviceAccountKey.json')
-    firebase_admin.initialize_app(cred)
+# Make the project root importable when run as a script from this folder
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
 
-db = firestore.client()
+from Firebase_Setup.firestore_client import add_client_arguments, get_client
 
 # --- NEW DATASET: Maharashtrian Cuisine ---
 
@@ -75,11 +79,9 @@ def generate_steps():
         })
     return steps
 
-def generate_interaction(recipe_ref, recipe_title):
+def interaction_data(recipe_title):
     user = random.choice(sample_users)
-    
-    interaction_ref = recipe_ref.collection("Interaction").document()
-    interaction_ref.set({
+    return {
         "username": user["username"],
         "userID": user["userID"],
         "type": random.choice(interaction_types),
@@ -87,21 +89,17 @@ def generate_interaction(recipe_ref, recipe_title):
         "cooknote": "Lai bhari! (Awesome)" if random.random() > 0.6 else "Mast zala hota.",
         "recipename": recipe_title,
         "createdAt": datetime.now()
-    })
+    }
 
-# --- EXECUTION LOOP ---
+def generate_interaction(recipe_ref, recipe_title):
+    interaction_ref = recipe_ref.collection("Interaction").document()
+    interaction_ref.set(interaction_data(recipe_title))
 
-# Generate 20 Maharashtrian recipes
-for i in range(20): 
-    title = random.choice(recipe_titles)
+def recipe_data(title):
     author = random.choice(sample_users)
-
-    recipe_ref = db.collection("Recipe").document()
-
     prep = random.randint(15, 40)
     cook = random.randint(20, 60)
-    
-    recipe_ref.set({
+    return {
         "Title": title,
         "Description": f"Traditional Maharashtrian style {title}.",
         "Ingredients": generate_ingredients(),
@@ -115,12 +113,118 @@ for i in range(20):
         "CreatedAt": datetime.now(),
         "AuthorID": author["userID"],
         "AuthorName": author["username"]
-    })
-
-    # Create random interactions
-    for _ in range(random.randint(1, 4)):
-        generate_interaction(recipe_ref, title)
-
-    print(f"✔ Recipe {i+1} created: {title} (ID: {recipe_ref.id})")
-
-print("\n--- Maharashtrian Data Generation Complete ---")
\ No newline at end of file
+    }
+
+def iter_documents(db, recipes, interactions=None):
+    """Yields (document_ref, data) for `recipes` recipes and their interactions.
+
+    `interactions` is the total number of interactions, spread evenly over the
+    recipes; by default each recipe gets 1 to 4. Document IDs are generated
+    client-side, so no request is made until the batches are committed.
+    """
+    for i in range(recipes):
+        title = random.choice(recipe_titles)
+        recipe_ref = db.collection("Recipe").document()
+        yield recipe_ref, recipe_data(title)
+
+        if interactions is None:
+            count = random.randint(1, 4)
+        else:
+            count = interactions // recipes + (1 if i < interactions % recipes else 0)
+        for _ in range(count):
+            yield recipe_ref.collection("Interaction").document(), interaction_data(title)
+
+# --- BATCHED WRITES ---
+BATCH_LIMIT = 500  # Firestore maximum operations per batch
+
+def is_retryable(error):
+    """Transient Firestore errors worth retrying (unavailable, timeouts,
+    contention and quota)."""
+    try:
+        from google.api_core import exceptions
+    except ImportError:
+        return False
+    return isinstance(error, (
+        exceptions.ServiceUnavailable, exceptions.DeadlineExceeded, exceptions.Aborted,
+        exceptions.ResourceExhausted, exceptions.InternalServerError,
+    ))
+
+def commit_batch(db, docs, max_retries=5, backoff=0.5):
+    """Writes one batch of (ref, data) pairs, retrying transient failures
+    with exponential backoff and jitter. Sets are idempotent, so a retried
+    commit cannot duplicate documents."""
+    for attempt in range(max_retries + 1):
+        batch = db.batch()
+        for ref, data in docs:
+            batch.set(ref, data)
+        try:
+            batch.commit()
+            return len(docs)
+        except Exception as error:
+            if attempt == max_retries or not is_retryable(error):
+                raise
+            delay = backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+            print(f"Batch commit failed ({error.__class__.__name__}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+def write_documents(db, docs, batch_size=BATCH_LIMIT, concurrency=8, max_retries=5,
+                    backoff=0.5, progress_every=5.0):
+    """Commits (ref, data) pairs in batches of up to `batch_size` writes, with
+    up to `concurrency` batches in flight. Returns (documents, seconds)."""
+    if not 1 <= batch_size <= BATCH_LIMIT:
+        raise ValueError(f"batch_size must be between 1 and {BATCH_LIMIT}")
+    started = last_report = time.perf_counter()
+    written = 0
+
+    def batches():
+        batch = []
+        for doc in docs:
+            batch.append(doc)
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as pool:
+        pending = deque()
+        for batch in batches():
+            pending.append(pool.submit(commit_batch, db, batch, max_retries, backoff))
+            # Bound the number of generated-but-unwritten documents
+            while len(pending) >= 2 * max(concurrency, 1) or (pending and pending[0].done()):
+                written += pending.popleft().result()
+            now = time.perf_counter()
+            if now - last_report >= progress_every:
+                print(f"  {written} documents written ({written / (now - started):.0f} docs/sec)")
+                last_report = now
+        while pending:
+            written += pending.popleft().result()
+    return written, time.perf_counter() - started
+
+# --- EXECUTION ---
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic Maharashtrian recipes in Firestore.")
+    parser.add_argument("--recipes", type=int, default=20, help="Number of recipes to create (default: 20)")
+    parser.add_argument("--interactions", type=int, default=None,
+                        help="Total interactions, spread evenly over the recipes (default: 1-4 per recipe)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_LIMIT,
+                        help=f"Writes per batch commit (max {BATCH_LIMIT})")
+    parser.add_argument("--concurrency", type=int, default=8, help="Batch commits in flight")
+    parser.add_argument("--max-retries", type=int, default=5, help="Retries per batch on transient errors")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducible content")
+    add_client_arguments(parser)
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    # Set FIRESTORE_EMULATOR_HOST to target a local emulator instead of the real project
+    db = get_client(args.fake, args.latency, args.key, seed=args.seed)
+    docs = iter_documents(db, args.recipes, args.interactions)
+    written, seconds = write_documents(db, docs, args.batch_size, args.concurrency, args.max_retries)
+    db.close()
+    rate = written / seconds if seconds else float("inf")
+    print(f"\n--- Maharashtrian Data Generation Complete: {written} documents "
+          f"in {seconds:.1f}s ({rate:.0f} docs/sec) ---")
+
+if __name__ == "__main__":
+    main()
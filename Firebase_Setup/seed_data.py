@@ -1,13 +1,14 @@
-import firebase_admin
-from firebase_admin import credentials, firestore
+import argparse
+import sys
 from datetime import datetime
+from pathlib import Path
 
-# Check to ensure app isn't initialized twice if running in a loop/notebook
-if not firebase_admin._apps:
-    cred = credentials.Certificate('config/serviceAccountKey.json')
-    firebase_admin.initialize_app(cred)
+# Make the project root importable when run as a script from this folder
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
 
-db = firestore.client()
+from Firebase_Setup.firestore_client import add_client_arguments, client_from_args
 
 # --- 1. Define Dosa Data ---
 
@@ -37,71 +38,81 @@ dosa_steps = [
     {"StepNumber": 13, "Instruction": "Serve hot with chutney and sambar", "Duration": "1 min"},
 ]
 
-# --- 2. Add Recipe to Firestore ---
-
-recipe_ref = db.collection("Recipe").document()
-
-recipe_ref.set({
-    "Title": "Crispy Dosa",
-    "Description": "South Indian fermented crepe made from rice and lentil batter.",
-    "Ingredients": dosa_ingredients,
-    "Steps": dosa_steps,
-    "TimeRequired": {
-        "PrepTime": 30,       # Active prep time
-        "RestTime": 480,      # Fermentation (8 hours)
-        "CookTime": 30,       # Cooking time for a batch
-        "TotalTime": 540
-    },
-    "Difficulty": "Medium",
-    "CreatedAt": datetime.now(),
-    "AuthorID": "user_12345",
-    "AuthorName": "Dnyaneshwarpotdar"
-})
-
-print("Dosa Recipe Added. ID:", recipe_ref.id)
-
-# --- 3. Add Interaction (Rating/Comment) ---
-
-interaction_ref = recipe_ref.collection("Interaction").document()
-
-interaction_ref.set({
-    "username": "dnyaneshwarpotdar",
-    "userID": "user_12345",
-    "type": "rating",
-    "rating": "5",
-    "cooknote": "Batter fermented perfectly! Very crispy.",
-    "recipename": "Crispy Dosa",
-    "createdAt": datetime.now()
-})
-
-print("Interaction added for:", recipe_ref.id)
-
-# --- 4. Create User & Log Activity ---
-
-user_ref = db.collection("Users").document()
-
-user_data = {
-    "UserID": user_ref.id,
-    "UserName": "SouthIndianFoodie",
-    "Email": "dosaLover@gmail.com",
-    "Mobile Number": "9876543210",
-    "Joined At": datetime.now(),
-    "Skill Level": "Intermediate"
-}
-
-user_ref.set(user_data)
-print("User created with ID:", user_ref.id)
-
-activity_ref = user_ref.collection("Activities").document()
-
-activity_data = {
-    "Activity ID": activity_ref.id,
-    "Recipe Name": "Crispy Dosa",
-    "Type": "Like",
-    "rating": "0",
-    "cooknote": "Batter fermented perfectly! Very crispy.",
-    "CreatedAt": datetime.now()
-}
-
-activity_ref.set(activity_data)
-print("Activity added for user:", user_ref.id)
\ No newline at end of file
+def seed(db):
+    """Adds the Dosa recipe, one interaction, one user and one activity."""
+    # --- 2. Add Recipe to Firestore ---
+
+    recipe_ref = db.collection("Recipe").document()
+
+    recipe_ref.set({
+        "Title": "Crispy Dosa",
+        "Description": "South Indian fermented crepe made from rice and lentil batter.",
+        "Ingredients": dosa_ingredients,
+        "Steps": dosa_steps,
+        "TimeRequired": {
+            "PrepTime": 30,       # Active prep time
+            "RestTime": 480,      # Fermentation (8 hours)
+            "CookTime": 30,       # Cooking time for a batch
+            "TotalTime": 540
+        },
+        "Difficulty": "Medium",
+        "CreatedAt": datetime.now(),
+        "AuthorID": "user_12345",
+        "AuthorName": "Dnyaneshwarpotdar"
+    })
+
+    print("Dosa Recipe Added. ID:", recipe_ref.id)
+
+    # --- 3. Add Interaction (Rating/Comment) ---
+
+    interaction_ref = recipe_ref.collection("Interaction").document()
+
+    interaction_ref.set({
+        "username": "dnyaneshwarpotdar",
+        "userID": "user_12345",
+        "type": "rating",
+        "rating": "5",
+        "cooknote": "Batter fermented perfectly! Very crispy.",
+        "recipename": "Crispy Dosa",
+        "createdAt": datetime.now()
+    })
+
+    print("Interaction added for:", recipe_ref.id)
+
+    # --- 4. Create User & Log Activity ---
+
+    user_ref = db.collection("Users").document()
+
+    user_data = {
+        "UserID": user_ref.id,
+        "UserName": "SouthIndianFoodie",
+        "Email": "dosaLover@gmail.com",
+        "Mobile Number": "9876543210",
+        "Joined At": datetime.now(),
+        "Skill Level": "Intermediate"
+    }
+
+    user_ref.set(user_data)
+    print("User created with ID:", user_ref.id)
+
+    activity_ref = user_ref.collection("Activities").document()
+
+    activity_data = {
+        "Activity ID": activity_ref.id,
+        "Recipe Name": "Crispy Dosa",
+        "Type": "Like",
+        "rating": "0",
+        "cooknote": "Batter fermented perfectly! Very crispy.",
+        "CreatedAt": datetime.now()
+    }
+
+    activity_ref.set(activity_data)
+    print("Activity added for user:", user_ref.id)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed Firestore with the Crispy Dosa recipe.")
+    add_client_arguments(parser)
+    args = parser.parse_args()
+    db = client_from_args(args)
+    seed(db)
+    db.close()
@@ -1,134 +1,601 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
+import argparse
 import os
+import sys
 import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import cached_property
 from pathlib import Path
 
-def load_csvs():
-    # Prefer the project's `transform_data` folder
-    project_root = Path(__file__).resolve().parents[1]
-    data_dir = project_root / 'transform_data'
+# Make the project root importable when run as a script from this folder
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from data_validation.valid_mask import MASK_FILE, StaleMaskError, load_valid_mask, recipe_ids_digest
+from pipeline.metrics import Metrics, add_metrics_arguments
+from pipeline.typed_ingest import parse_numbers
+from transform_data.durations import step_minutes
+from transform_data.tables import FORMAT_EXTENSIONS, read_table, table_path
+
+TABLE_NAMES = ("recipes", "ingredients", "steps", "interactions")
+# The project's `transform_data` folder, unless a data_dir is given
+DATA_DIR = PROJECT_ROOT / 'transform_data'
 
-    print(f"Loading CSVs from: {data_dir}")
+def load_tables(fmt="csv", names=TABLE_NAMES, data_dir=None):
+    """Loads the normalized tables written by the ETL in the given format
+    (all four by default). Parquet/feather files keep their stored column
+    types, so no re-inference."""
+    data_dir = data_dir or DATA_DIR
+
+    print(f"Loading {fmt} tables from: {data_dir}")
     try:
-        recipes = pd.read_csv(str(data_dir / 'recipes.csv'))
-        ingredients = pd.read_csv(str(data_dir / 'ingredients.csv'))
-        steps = pd.read_csv(str(data_dir / 'steps.csv'))
-        interactions = pd.read_csv(str(data_dir / 'interactions.csv'))
-        return recipes, ingredients, steps, interactions
+        return tuple(read_table(table_path(name, fmt, str(data_dir))) for name in names)
     except FileNotFoundError:
-        print(f"Error: Could not find CSV files in {data_dir}. Did you run the ETL pipeline?")
+        print(f"Error: Could not find {fmt} files in {data_dir}. Did you run the ETL pipeline?")
         exit(1)
 
-def insights(recipes, ingredients, steps, interactions):
-    out = {}
-    
-    # 1. Most common ingredients
-    out["most_common_ingredients"] = ingredients['name'].value_counts().head(20).to_dict()
+def load_csvs():
+    return load_tables("csv")
+
+def filter_valid(tables, valid_mask):
+    """Keeps the recipes rows set in `valid_mask` (see
+    data_validation/valid_mask.py) and the child rows of those recipes.
+    `tables` maps names to DataFrames (or None); recipes is required."""
+    recipes = tables["recipes"][valid_mask].reset_index(drop=True)
+    valid_ids = pd.Index(recipes['recipe_id'].unique())
+    filtered = {"recipes": recipes}
+    for name, table in tables.items():
+        if name != "recipes":
+            filtered[name] = None if table is None else \
+                table[table['recipe_id'].isin(valid_ids)].reset_index(drop=True)
+    return filtered
+
+# --- CATEGORICAL COLUMNS ---
+def first_seen_counts(values):
+    """Counts of the non-null values of a Series, in first-seen order. For a
+    categorical column this is one bincount over the integer codes."""
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        return values.groupby(values.to_numpy(), sort=False).size()
+    codes = values.cat.codes.to_numpy()
+    codes = codes[codes >= 0]
+    order = pd.unique(codes)
+    counts = np.bincount(codes, minlength=len(values.cat.categories))[order]
+    return pd.Series(counts, index=pd.Index(values.cat.categories.take(order), name=values.name), name="count")
+
+def value_counts(values):
+    """Series.value_counts(), with ties in first-seen order for categoricals
+    too (their own value_counts() breaks ties in category order)."""
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        return values.value_counts()
+    return first_seen_counts(values).sort_values(ascending=False, kind="stable")
+
+# --- INGREDIENT SCORES ---
+def recipe_rating_stats(interactions, ratings=None):
+    """Sum and count of numeric ratings per recipe_id (one pass over interactions)."""
+    if ratings is None:
+        ratings = parse_numbers(interactions['rating']).series(interactions.index)
+    return ratings.groupby(interactions['recipe_id']).agg(['sum', 'count'])
+
+def ingredient_rating_totals(ingredients, rating_stats, by='name'):
+    """Sum and count of ratings per ingredient group, each recipe contributing
+    its rating sum and count once per ingredient row. Partial totals from
+    different ingredient chunks can simply be added together."""
+    recipe_ids = ingredients['recipe_id']
+    totals = pd.DataFrame({
+        'sum': recipe_ids.map(rating_stats['sum']).fillna(0.0).to_numpy(),
+        'count': recipe_ids.map(rating_stats['count']).fillna(0).to_numpy(),
+    })
+    keys = ingredients[by]
+    if not isinstance(keys.dtype, pd.CategoricalDtype):
+        return totals.groupby(keys.to_numpy()).sum()
+    # Group on the integer codes, then label and sort by the values
+    codes = keys.cat.codes.to_numpy()
+    totals = totals[codes >= 0].groupby(codes[codes >= 0]).sum()
+    totals.index = keys.cat.categories.take(totals.index)
+    return totals.sort_index()
+
+def ingredient_scores(ingredients, rating_stats, by='name'):
+    """Interaction-weighted mean rating per ingredient (or any other
+    ingredients column given as `by`).
+
+    Equivalent to joining every ingredient row with every rating of its recipe
+    and averaging per group, but built from the per-recipe sums and counts in
+    `rating_stats` (see recipe_rating_stats()). Cost is O(ingredients) instead
+    of O(ingredients x interactions per recipe). Groups that were never rated
+    get NaN; the result is indexed by the sorted group values.
+    """
+    totals = ingredient_rating_totals(ingredients, rating_stats, by)
+    return totals['sum'] / totals['count']
+
+# --- STEP TIMES ---
+def recipe_step_minutes(steps):
+    """Summed minimum and maximum minutes ('min', 'max') of the steps whose
+    duration parsed, per recipe_id (see transform_data/durations.py)."""
+    low, high = step_minutes(steps)
+    timed = ~np.isnan(low)
+    recipe_ids = steps['recipe_id'].to_numpy()[timed]
+    return pd.DataFrame({'min': low[timed], 'max': high[timed]}).groupby(recipe_ids, sort=False).sum()
+
+def step_time_summary(recipes, step_sum, step_max_sum, total_sum, exceeding, corr):
+    """The step_time_vs_total_time metric from its sums over the recipes that
+    have a total_time_min and at least one timed step."""
+    def mean(total):
+        return float(total / recipes) if recipes else float("nan")
+    return {
+        "recipes": int(recipes),
+        "mean_step_minutes": mean(step_sum),
+        "mean_step_max_minutes": mean(step_max_sum),
+        "mean_total_minutes": mean(total_sum),
+        "step_vs_total_corr": float(corr),
+        "steps_exceed_total": int(exceeding),
+    }
+
+# --- AGGREGATION ENGINE ---
+# Metric keys, in the order they appear in analytics_summary.json
+METRIC_NAMES = (
+    "most_common_ingredients", "avg_prep_time", "avg_cook_time",
+    "difficulty_distribution", "most_interacted", "prep_vs_rating_corr",
+    "ingredients_high_rating", "top_rated_recipes", "steps_count_distribution",
+    "recipes_most_comments", "longest_total_time", "step_time_vs_total_time",
+)
+
+# Tables each metric reads; a cached metric is reused while these are unchanged
+METRIC_INPUTS = {
+    "most_common_ingredients": ("ingredients",),
+    "avg_prep_time": ("recipes",),
+    "avg_cook_time": ("recipes",),
+    "difficulty_distribution": ("recipes",),
+    "most_interacted": ("interactions",),
+    "prep_vs_rating_corr": ("recipes", "interactions"),
+    "ingredients_high_rating": ("ingredients", "interactions"),
+    "top_rated_recipes": ("recipes", "interactions"),
+    "steps_count_distribution": ("steps",),
+    "recipes_most_comments": ("interactions",),
+    "longest_total_time": ("recipes",),
+    "step_time_vs_total_time": ("recipes", "steps"),
+}
+
+class InsightEngine:
+    """Computes the insight metrics with as few scans of each table as possible.
 
-    # 2. Average preparation time
-    out["avg_prep_time"] = recipes['prep_time_min'].dropna().astype(float).mean()
+    Shared intermediates (numeric ratings, per-recipe rating sums and counts,
+    value counts, ...) are computed once, on first use, and reused by every
+    metric that needs them. Nothing is ever joined at interaction granularity.
+    """
 
-    # 3. Average cooking time
-    out["avg_cook_time"] = recipes['cook_time_min'].dropna().astype(float).mean()
+    def __init__(self, recipes, ingredients, steps, interactions):
+        self.recipes = recipes
+        self.ingredients = ingredients
+        self.steps = steps
+        self.interactions = interactions
 
-    # 4. Difficulty distribution
-    out['difficulty_distribution'] = recipes['difficulty'].value_counts().to_dict()
+    # --- Shared intermediates ---
+    @cached_property
+    def ratings(self):
+        return parse_numbers(self.interactions['rating']).series(self.interactions.index)
 
-    # 5. Most interacted recipes
-    out['most_interacted'] = interactions['recipe_id'].value_counts().head(20).to_dict()
+    @cached_property
+    def recipe_rating_stats(self):
+        return recipe_rating_stats(self.interactions, self.ratings)
 
-    # 6. Correlation between prep time and average rating
-    interactions['rating'] = pd.to_numeric(interactions['rating'], errors='coerce')
-    merged = recipes.merge(interactions.groupby('recipe_id')['rating'].mean().reset_index(), left_on='recipe_id', right_on='recipe_id', how='left')
-    out['prep_vs_rating_corr'] = merged['prep_time_min'].astype(float).corr(merged['rating'])
+    @cached_property
+    def recipe_mean_rating(self):
+        stats = self.recipe_rating_stats
+        return stats['sum'] / stats['count']
 
-    # 7. Ingredients with high ratings
-    ing_ratings = ingredients.merge(interactions[['recipe_id','rating']], on='recipe_id', how='left')
-    ing_ratings['rating'] = pd.to_numeric(ing_ratings['rating'], errors='coerce')
-    ing_score = ing_ratings.groupby('name')['rating'].mean().dropna().sort_values(ascending=False).head(20)
-    out['ingredients_high_rating'] = ing_score.to_dict()
+    @cached_property
+    def merged(self):
+        """Recipes with their average rating (NaN when never rated)."""
+        return self.recipes.assign(rating=self.recipes['recipe_id'].map(self.recipe_mean_rating))
 
-    # 8. Top rated recipes
-    top_rated = merged.sort_values('rating', ascending=False).head(10)[['recipe_id','title','rating']]
-    out['top_rated_recipes'] = top_rated.to_dict(orient='records')
+    @cached_property
+    def prep_time(self):
+        return parse_numbers(self.recipes['prep_time_min']).series(self.recipes.index)
 
-    # 9. Steps count distribution
-    steps_count = steps.groupby('recipe_id').size().rename('steps_count')
-    out['steps_count_distribution'] = steps_count.describe().to_dict()
+    @cached_property
+    def ingredient_counts(self):
+        return value_counts(self.ingredients['name'])
 
-    # 10. Recipes with most comments
-    comments = interactions[interactions['cooknote'].notnull() & (interactions['cooknote'].str.strip() != '')]
-    out['recipes_most_comments'] = comments['recipe_id'].value_counts().head(10).to_dict()
+    @cached_property
+    def recipe_step_minutes(self):
+        return recipe_step_minutes(self.steps)
 
-    # 11. Longest total time recipes
-    out['longest_total_time'] = recipes[['recipe_id','title','total_time_min']].sort_values('total_time_min', ascending=False).head(10).to_dict(orient='records')
+    # --- Metrics ---
+    def metric(self, name):
+        return getattr(self, name)()
 
-    # Save CSV outputs to current directory
-    pd.Series(out['most_common_ingredients']).to_csv('most_common_ingredients.csv')
-    pd.DataFrame(out['top_rated_recipes']).to_csv('top_rated_recipes.csv', index=False)
+    def most_common_ingredients(self):
+        return self.ingredient_counts.head(20).to_dict()
 
-    # Save summary JSON to current directory
-    with open('analytics_summary.json', 'w', encoding='utf-8') as f:
+    def avg_prep_time(self):
+        return self.prep_time.dropna().mean()
+
+    def avg_cook_time(self):
+        return parse_numbers(self.recipes['cook_time_min']).series().dropna().mean()
+
+    def difficulty_distribution(self):
+        return value_counts(self.recipes['difficulty']).to_dict()
+
+    def most_interacted(self):
+        return self.interactions['recipe_id'].value_counts().head(20).to_dict()
+
+    def prep_vs_rating_corr(self):
+        return self.prep_time.corr(self.merged['rating'])
+
+    def ingredients_high_rating(self):
+        scores = ingredient_scores(self.ingredients, self.recipe_rating_stats)
+        return scores.dropna().sort_values(ascending=False).head(20).to_dict()
+
+    def top_rated_recipes(self):
+        top_rated = self.merged.sort_values('rating', ascending=False).head(10)[['recipe_id','title','rating']]
+        return top_rated.to_dict(orient='records')
+
+    def steps_count_distribution(self):
+        steps_count = self.steps.groupby('recipe_id').size().rename('steps_count')
+        return steps_count.describe().to_dict()
+
+    def recipes_most_comments(self):
+        notes = self.interactions['cooknote']
+        has_note = notes.notnull() & (notes.str.strip() != '')
+        return self.interactions.loc[has_note, 'recipe_id'].value_counts().head(10).to_dict()
+
+    def longest_total_time(self):
+        longest = self.recipes[['recipe_id','title','total_time_min']].sort_values('total_time_min', ascending=False).head(10)
+        return longest.to_dict(orient='records')
+
+    def step_time_vs_total_time(self):
+        steps = self.recipe_step_minutes.reindex(self.recipes['recipe_id'].to_numpy())
+        total = parse_numbers(self.recipes['total_time_min']).values
+        both = steps['min'].notna().to_numpy() & ~np.isnan(total)
+        low, high, total = steps['min'].to_numpy()[both], steps['max'].to_numpy()[both], total[both]
+        return step_time_summary(len(low), low.sum(), high.sum(), total.sum(), (low > total).sum(),
+                                 pd.Series(low).corr(pd.Series(total)))
+
+def insights(recipes, ingredients, steps, interactions):
+    engine = InsightEngine(recipes, ingredients, steps, interactions)
+    out = {name: engine.metric(name) for name in METRIC_NAMES}
+    save_outputs(out)
+    return out, engine.merged
+
+OUTPUT_FILES = ('most_common_ingredients.csv', 'top_rated_recipes.csv', 'analytics_summary.json')
+
+def save_outputs(out, output_dir=''):
+    # Save CSV outputs to output_dir (default: current directory)
+    pd.Series(out['most_common_ingredients']).to_csv(os.path.join(output_dir, 'most_common_ingredients.csv'))
+    pd.DataFrame(out['top_rated_recipes']).to_csv(os.path.join(output_dir, 'top_rated_recipes.csv'), index=False)
+
+    # Save summary JSON to output_dir
+    with open(os.path.join(output_dir, 'analytics_summary.json'), 'w', encoding='utf-8') as f:
         json.dump(out, f, indent=2, default=str)
 
-    return out, merged
+# --- CHARTS ---
+# Charts are drawn on standalone Agg figures (no pyplot state), so they can be
+# rendered headless and in parallel. matplotlib is only imported when a chart
+# is actually rendered. Each chart has a prepare step that extracts the small
+# amount of data it plots from the engine, and a render step that runs in a
+# worker process.
+SCATTER_MODES = ("auto", "scatter", "hexbin")
+# Above this many points, "auto" draws a hexbin density plot instead of markers
+HEXBIN_MIN_POINTS = 50_000
+
+def _new_figure(figsize):
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig, fig.add_subplot()
 
-def generate_charts(recipes, ingredients, interactions, merged_data, out):
+def _save_figure(fig, path):
+    fig.tight_layout()
+    fig.savefig(path)
+
+def prepare_difficulty_donut(engine, scatter_mode):
+    return value_counts(engine.recipes['difficulty'])
+
+def render_difficulty_donut(counts, path):
+    from matplotlib.patches import Circle
+
+    fig, ax = _new_figure((8, 8))
+    ax.pie(counts, labels=counts.index, autopct='%1.1f%%', startangle=90, pctdistance=0.85, colors=['#66b3ff','#99ff99','#ffcc99'])
+    # Draw white circle for Donut effect
+    ax.add_artist(Circle((0,0),0.70,fc='white'))
+    ax.set_title('Recipe Difficulty Breakdown')
+    _save_figure(fig, path)
+
+def prepare_top_ingredients(engine, scatter_mode):
+    return engine.ingredient_counts.head(20).sort_values()
+
+def render_top_ingredients(top_ing, path):
+    fig, ax = _new_figure((10, 8))
+    positions = np.arange(len(top_ing))
+    ax.barh(positions, top_ing.to_numpy(), height=0.5, color='#ff9999', edgecolor='grey')
+    ax.set_yticks(positions, [str(name) for name in top_ing.index])
+    ax.set_title('Top 20 Most Common Ingredients')
+    ax.set_xlabel('Frequency')
+    _save_figure(fig, path)
+
+def prepare_prep_vs_rating(engine, scatter_mode):
+    prep = engine.prep_time.to_numpy()
+    rating = engine.merged['rating'].to_numpy(dtype=float)
+    present = ~(np.isnan(prep) | np.isnan(rating))
+    prep, rating = prep[present], rating[present]
+    if scatter_mode == "auto":
+        scatter_mode = "hexbin" if len(prep) >= HEXBIN_MIN_POINTS else "scatter"
+    return prep, rating, scatter_mode
+
+def render_prep_vs_rating(data, path):
+    prep, rating, scatter_mode = data
+    fig, ax = _new_figure((10, 6))
+    if scatter_mode == "hexbin":
+        density = ax.hexbin(prep, rating, gridsize=60, bins='log', mincnt=1, cmap='viridis')
+        fig.colorbar(density, ax=ax, label='Recipes')
+    else:
+        ax.scatter(prep, rating, alpha=0.6, c='teal', edgecolors='w', s=80)
+    ax.set_title('Correlation: Prep Time vs Average Rating')
+    ax.set_xlabel('Prep Time (minutes)')
+    ax.set_ylabel('Average Rating (0-5)')
+    ax.grid(True, linestyle='--', alpha=0.5)
+    _save_figure(fig, path)
+
+def prepare_cook_time_histogram(engine, scatter_mode):
+    return engine.recipes['cook_time_min'].dropna().to_numpy(dtype=float)
+
+def render_cook_time_histogram(cook_times, path):
+    fig, ax = _new_figure((10, 6))
+    ax.hist(cook_times, bins=15, color='#86bf91', edgecolor='black')
+    ax.set_title('Distribution of Cooking Times')
+    ax.set_xlabel('Cooking Time (minutes)')
+    ax.set_ylabel('Number of Recipes')
+    ax.grid(axis='y', alpha=0.5)
+    _save_figure(fig, path)
+
+# file name -> (prepare function, render function, tables it reads)
+CHARTS = {
+    "difficulty_donut_chart.png": (prepare_difficulty_donut, render_difficulty_donut, ("recipes",)),
+    "top_ingredients_bar_chart.png": (prepare_top_ingredients, render_top_ingredients, ("ingredients",)),
+    "prep_vs_rating_scatter_plot.png": (prepare_prep_vs_rating, render_prep_vs_rating, ("recipes", "interactions")),
+    "cook_time_histogram.png": (prepare_cook_time_histogram, render_cook_time_histogram, ("recipes",)),
+}
+
+def chart_cache_name(name, scatter_mode):
+    """Name a chart is cached under; the scatter plot differs per mode."""
+    return f"{name}:{scatter_mode}" if name == "prep_vs_rating_scatter_plot.png" else name
+
+def generate_charts(engine, charts_dir='charts', names=tuple(CHARTS), workers=None, scatter_mode="auto"):
+    """Renders the named charts into `charts_dir`, one chart per worker
+    process (`workers` defaults to one per chart, capped at the CPU count)."""
     print("Generating charts...")
-    # Create charts directory in current folder
-    charts_dir = 'charts'
     os.makedirs(charts_dir, exist_ok=True)
+    jobs = []
+    for name in names:
+        prepare, render, _ = CHARTS[name]
+        jobs.append((render, prepare(engine, scatter_mode), os.path.join(charts_dir, name)))
 
-    # Chart 1: Difficulty Distribution (DONUT CHART)
-    plt.figure(figsize=(8, 8))
-    counts = recipes['difficulty'].value_counts()
-    plt.pie(counts, labels=counts.index, autopct='%1.1f%%', startangle=90, pctdistance=0.85, colors=['#66b3ff','#99ff99','#ffcc99'])
-    # Draw white circle for Donut effect
-    centre_circle = plt.Circle((0,0),0.70,fc='white')
-    fig = plt.gcf()
-    fig.gca().add_artist(centre_circle)
-    plt.title('Recipe Difficulty Breakdown')
-    plt.tight_layout()
-    plt.savefig(f'{charts_dir}/difficulty_donut_chart.png')
-    plt.close() 
-
-    # Chart 2: Top Ingredients (HORIZONTAL BAR CHART)
-    plt.figure(figsize=(10, 8))
-    top_ing = pd.Series(out['most_common_ingredients'])
-    top_ing.sort_values().plot(kind='barh', color='#ff9999', edgecolor='grey')
-    plt.title('Top 20 Most Common Ingredients')
-    plt.xlabel('Frequency')
-    plt.tight_layout()
-    plt.savefig(f'{charts_dir}/top_ingredients_bar_chart.png')
-    plt.close()
-
-    # Chart 3: Prep Time vs Rating (SCATTER PLOT)
-    plt.figure(figsize=(10, 6))
-    plt.scatter(merged_data['prep_time_min'], merged_data['rating'], alpha=0.6, c='teal', edgecolors='w', s=80)
-    plt.title('Correlation: Prep Time vs Average Rating')
-    plt.xlabel('Prep Time (minutes)')
-    plt.ylabel('Average Rating (0-5)')
-    plt.grid(True, linestyle='--', alpha=0.5)
-    plt.tight_layout()
-    plt.savefig(f'{charts_dir}/prep_vs_rating_scatter_plot.png')
-    plt.close()
-
-    # Chart 4: Cook Time Distribution (HISTOGRAM)
-    plt.figure(figsize=(10, 6))
-    plt.hist(recipes['cook_time_min'].dropna(), bins=15, color='#86bf91', edgecolor='black')
-    plt.title('Distribution of Cooking Times')
-    plt.xlabel('Cooking Time (minutes)')
-    plt.ylabel('Number of Recipes')
-    plt.grid(axis='y', alpha=0.5)
-    plt.tight_layout()
-    plt.savefig(f'{charts_dir}/cook_time_histogram.png')
-    plt.close()
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers <= 1:
+        for render, data, path in jobs:
+            render(data, path)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for future in [pool.submit(render, data, path) for render, data, path in jobs]:
+            future.result()
+
+# --- CACHED RUN ---
+def _streaming_insights(data_dir, fmt, chunksize, valid_mask_path=None):
+    try:
+        from analytics.streaming import streaming_insights
+    except ModuleNotFoundError:
+        # Run as a script from this folder: `analytics` is this module
+        from streaming import streaming_insights
+    return streaming_insights(data_dir, fmt, chunksize, valid_mask_path)
+
+def _rollup_insights(path):
+    try:
+        from analytics.rollups import Rollups, rollup_insights
+    except ModuleNotFoundError:
+        from rollups import Rollups, rollup_insights
+    rollups = Rollups.load(path)
+    rollups.check_sources()
+    return rollup_insights(rollups)
+
+def run_analytics(fmt="csv", cache=None, charts=True, chunksize=None, charts_dir='charts',
+                  chart_workers=None, scatter_mode="auto", metrics=None, data_dir=None, tables=None,
+                  output_dir='', valid_mask_path=None, rollups=None):
+    """Computes the insight summary (and charts) for the ETL tables.
+
+    With an InsightCache, metrics and charts whose input tables are unchanged
+    are served from the cache, and only the tables the remaining ones read
+    are loaded. `chunksize` switches to the streaming engine (no charts).
+    Load, per-insight compute, chart and save timings and cache hits are
+    recorded into `metrics`. An insight's time includes the intermediates it
+    is the first to need (merged tables, rating stats).
+
+    Tables are read from `data_dir` (default DATA_DIR) unless `tables`
+    already maps table names to DataFrames; cache keys are file hashes, so
+    in-memory tables are always computed. Outputs go to `output_dir`.
+
+    valid_mask_path: a mask written by the validator; only recipes that
+    passed validation (and their ingredients, steps and interactions) are
+    analyzed. Raises StaleMaskError if it was built from other tables.
+
+    rollups: path of the rollups the ETL maintains (see rollups.py); every
+    metric is answered from them without reading the tables (no charts).
+    Raises StaleRollupError if a table changed after they were updated.
+    """
+    data_dir = data_dir or DATA_DIR
+    metrics = metrics or Metrics("analytics")
+    if tables is not None and (cache is not None or chunksize):
+        raise ValueError("In-memory tables cannot be combined with a cache or streaming")
+    if rollups and (tables is not None or cache is not None or chunksize or valid_mask_path):
+        raise ValueError("Rollups cannot be combined with tables, a cache, streaming or a valid-row mask")
+    hashes = None
+    if cache is not None:
+        hits, misses = cache.hits, cache.misses
+        paths = {name: table_path(name, fmt, str(data_dir)) for name in TABLE_NAMES}
+        if valid_mask_path:
+            paths["valid_mask"] = valid_mask_path
+        try:
+            hashes = cache.fingerprints(paths)
+        except FileNotFoundError:
+            print(f"Error: Could not find {fmt} files in {data_dir}. Did you run the ETL pipeline?")
+            exit(1)
+
+    def cache_key(name, inputs):
+        # Filtering by the mask changes every result
+        if valid_mask_path:
+            inputs = tuple(inputs) + ("valid_mask",)
+        return cache.key(name, [hashes[table] for table in inputs])
+
+    out, missing = {}, []
+    for name in METRIC_NAMES:
+        hit, value = cache.get_metric(cache_key(name, METRIC_INPUTS[name])) if cache else (False, None)
+        if hit:
+            out[name] = value
+        else:
+            missing.append(name)
+
+    missing_charts = []
+    if charts and chunksize is None and rollups is None:
+        os.makedirs(charts_dir, exist_ok=True)
+        for name, (_, _, inputs) in CHARTS.items():
+            path = os.path.join(charts_dir, name)
+            if not (cache and cache.get_chart(cache_key(chart_cache_name(name, scatter_mode), inputs), path)):
+                missing_charts.append(name)
+
+    if missing and rollups:
+        print(f"Answering from the rollups in: {rollups}")
+        try:
+            with metrics.timer("rollups"):
+                computed = _rollup_insights(rollups)
+        except FileNotFoundError:
+            print(f"Error: Could not find {rollups}. Run the ETL pipeline with --rollups first.")
+            exit(1)
+        out.update((name, computed[name]) for name in missing)
+    elif missing and chunksize:
+        print(f"Streaming {fmt} tables from: {data_dir} ({chunksize} rows per chunk)")
+        try:
+            with metrics.timer("streaming"):
+                computed = _streaming_insights(data_dir, fmt, chunksize, valid_mask_path)
+        except FileNotFoundError:
+            print(f"Error: Could not find {fmt} files in {data_dir}. Did you run the ETL pipeline?")
+            exit(1)
+        out.update((name, computed[name]) for name in missing)
+    elif missing or missing_charts:
+        needed = {table for name in missing for table in METRIC_INPUTS[name]}
+        needed.update(table for name in missing_charts for table in CHARTS[name][2])
+        if valid_mask_path:
+            # The mask is applied through the recipes table
+            needed.add("recipes")
+        needed = [name for name in TABLE_NAMES if name in needed]
+        if tables is None:
+            with metrics.timer("load"):
+                tables = dict(zip(needed, load_tables(fmt, needed, data_dir)))
+        for name in needed:
+            metrics.inc("rows_loaded", len(tables[name]), table=name)
+        if valid_mask_path:
+            with metrics.timer("filter_valid"):
+                recipes = tables["recipes"]
+                valid_mask = load_valid_mask(valid_mask_path, recipe_ids_digest([recipes['recipe_id']]))
+                tables = filter_valid({name: tables.get(name) for name in needed}, valid_mask)
+            metrics.inc("recipes_excluded", int(len(recipes) - len(tables["recipes"])))
+        # Tables no pending metric or chart reads are never loaded
+        engine = InsightEngine(*(tables.get(name) for name in TABLE_NAMES))
+        for name in missing:
+            started = time.perf_counter()
+            out[name] = engine.metric(name)
+            metrics.add_time("metric_compute", time.perf_counter() - started, metric=name)
+        if missing_charts:
+            with metrics.timer("charts"):
+                generate_charts(engine, charts_dir, missing_charts, chart_workers, scatter_mode)
+
+    if cache is not None:
+        for name in missing:
+            cache.put_metric(cache_key(name, METRIC_INPUTS[name]), out[name])
+        for name in missing_charts:
+            key = cache_key(chart_cache_name(name, scatter_mode), CHARTS[name][2])
+            cache.put_chart(key, os.path.join(charts_dir, name))
+        cache.evict()
+        metrics.inc("cache_lookups", cache.hits - hits, result="hit")
+        metrics.inc("cache_lookups", cache.misses - misses, result="miss")
+    metrics.inc("metrics_computed", len(missing))
+    metrics.inc("charts_rendered", len(missing_charts))
+
+    out = {name: out[name] for name in METRIC_NAMES}
+    with metrics.timer("save"):
+        save_outputs(out, output_dir)
+    for name in OUTPUT_FILES:
+        metrics.inc("bytes_written", os.path.getsize(os.path.join(output_dir, name)), file=name)
+    return out
 
 if __name__ == "__main__":
-    recipes, ingredients, steps, interactions = load_csvs()
-    # Capture merged_data returned from insights
-    out, merged_data = insights(recipes, ingredients, steps, interactions)
-    generate_charts(recipes, ingredients, interactions, merged_data, out)
-    print(f"Analytics complete. Charts saved to '{os.getcwd()}/charts/'")
\ No newline at end of file
+    from cache import DEFAULT_MAX_AGE, DEFAULT_MAX_BYTES, InsightCache
+    from rollups import ROLLUPS_FILE, StaleRollupError
+
+    parser = argparse.ArgumentParser(description="Compute recipe insights and charts.")
+    parser.add_argument("--format", choices=sorted(FORMAT_EXTENSIONS), default="csv",
+                        help="Format of the ETL output tables to read (default: csv)")
+    parser.add_argument("--data-dir", default=str(DATA_DIR),
+                        help="Folder holding the ETL output tables (default: transform_data/)")
+    parser.add_argument("--chunksize", type=int, default=None,
+                        help="Stream the tables in chunks of N rows instead of loading them "
+                             "whole (bounded memory; charts are skipped)")
+    parser.add_argument("--rollups", nargs="?", metavar="PATH", default=None,
+                        const=str(DATA_DIR / ROLLUPS_FILE),
+                        help=f"Answer every metric from the rollups kept by the ETL's --rollups, without "
+                             f"reading the tables (charts are skipped; default: transform_data/{ROLLUPS_FILE})")
+    parser.add_argument("--cache-dir", default=str(PROJECT_ROOT / 'analytics' / '.insight_cache'),
+                        help="Where computed metrics and charts are cached")
+    parser.add_argument("--no-cache", action="store_true", help="Recompute everything, without reading or writing the cache")
+    parser.add_argument("--invalidate-cache", action="store_true",
+                        help="Drop every cached metric and chart before running")
+    parser.add_argument("--cache-max-mb", type=float, default=DEFAULT_MAX_BYTES / 2**20,
+                        help="Evict least recently used cache entries beyond this size")
+    parser.add_argument("--cache-max-age-days", type=float, default=DEFAULT_MAX_AGE / 86400,
+                        help="Evict cache entries unused for this many days")
+    parser.add_argument("--valid-only", nargs="?", metavar="MASK", default=None,
+                        const=str(PROJECT_ROOT / 'data_validation' / MASK_FILE),
+                        help=f"Only analyze recipes that passed validation, using the validator's "
+                             f"{MASK_FILE} (default: data_validation/{MASK_FILE})")
+    parser.add_argument("--no-charts", action="store_true", help="Only compute the JSON/CSV insights")
+    parser.add_argument("--chart-workers", type=int, default=None,
+                        help="Processes used to render charts (default: one per chart, up to the CPU count)")
+    parser.add_argument("--scatter", choices=SCATTER_MODES, default="auto",
+                        help=f"Prep time vs rating plot style; 'auto' switches to a hexbin density plot "
+                             f"from {HEXBIN_MIN_POINTS} recipes")
+    add_metrics_arguments(parser, "analytics", progress=False)
+    args = parser.parse_args()
+    if args.rollups and (args.chunksize or args.valid_only):
+        parser.error("--rollups cannot be combined with --chunksize or --valid-only")
+
+    cache = None
+    if not args.no_cache and not args.rollups:
+        cache = InsightCache(args.cache_dir, int(args.cache_max_mb * 2**20), args.cache_max_age_days * 86400)
+        if args.invalidate_cache:
+            cache.clear()
+            print(f"Cache cleared: {args.cache_dir}")
+
+    if args.valid_only and not os.path.exists(args.valid_only):
+        print(f"Error: {args.valid_only} not found. Run the validator first.")
+        exit(1)
+    metrics = Metrics("analytics")
+    try:
+        run_analytics(args.format, cache, charts=not args.no_charts, chunksize=args.chunksize,
+                      chart_workers=args.chart_workers, scatter_mode=args.scatter, metrics=metrics,
+                      data_dir=args.data_dir, valid_mask_path=args.valid_only, rollups=args.rollups)
+    except (StaleMaskError, StaleRollupError) as error:
+        print(f"Error: {error}")
+        exit(1)
+    metrics.save(args.metrics, args.prometheus)
+    print(f"Metrics saved to: {args.metrics}")
+    if cache is not None:
+        print(f"Cache: {cache.hits} hits, {cache.misses} misses")
+    if args.no_charts:
+        print("Analytics complete.")
+    elif args.chunksize or args.rollups:
+        print(f"Analytics complete. Charts are not generated in {'streaming' if args.chunksize else 'rollup'} mode.")
+    else:
+        print(f"Analytics complete. Charts saved to '{os.getcwd()}/charts/'")
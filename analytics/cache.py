@@ -0,0 +1,149 @@
+"""Persistent, content-addressed cache for insight metrics and charts.
+
+Every cached result is keyed by the SHA-256 of the input tables it was
+computed from (plus its name and CACHE_VERSION), so a metric is recomputed
+only when one of *its* tables changes. File hashes are memoized by
+(size, mtime) in fingerprints.json, so unchanged inputs are not re-read.
+
+Layout of the cache directory:
+
+    fingerprints.json         path -> {size, mtime_ns, sha256}
+    metrics/<key>.json        one metric value
+    charts/<key>.png          one rendered chart
+"""
+import hashlib
+import json
+import os
+import shutil
+import time
+
+# Bump when a metric or chart changes meaning, to orphan old entries
+CACHE_VERSION = 2
+DEFAULT_MAX_BYTES = 256 * 2**20
+DEFAULT_MAX_AGE = 7 * 24 * 3600
+
+def file_sha256(path, block_size=2**20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+class InsightCache:
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES, max_age=DEFAULT_MAX_AGE):
+        self.cache_dir = str(cache_dir)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        for kind in ("metrics", "charts"):
+            os.makedirs(os.path.join(self.cache_dir, kind), exist_ok=True)
+
+    # --- Input fingerprints ---
+    def fingerprints(self, paths):
+        """Maps each name in {name: path} to the content hash of its file.
+        Raises FileNotFoundError if an input is missing."""
+        memo_path = os.path.join(self.cache_dir, 'fingerprints.json')
+        try:
+            with open(memo_path, encoding='utf-8') as f:
+                memo = json.load(f)
+        except (FileNotFoundError, ValueError):
+            memo = {}
+
+        hashes = {}
+        for name, path in paths.items():
+            path = os.path.abspath(path)
+            stat = os.stat(path)
+            known = memo.get(path)
+            if not known or known['size'] != stat.st_size or known['mtime_ns'] != stat.st_mtime_ns:
+                known = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': file_sha256(path)}
+                memo[path] = known
+            hashes[name] = known['sha256']
+
+        with open(memo_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(memo, f, indent=2)
+        os.replace(memo_path + '.tmp', memo_path)
+        return hashes
+
+    def key(self, name, input_hashes):
+        """Cache key of a result named `name` computed from `input_hashes`."""
+        text = json.dumps([CACHE_VERSION, name, list(input_hashes)])
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    # --- Entries ---
+    def _entry(self, kind, key):
+        ext = '.json' if kind == 'metrics' else '.png'
+        return os.path.join(self.cache_dir, kind, key + ext)
+
+    def _hit(self, path):
+        if not os.path.exists(path):
+            self.misses += 1
+            return False
+        os.utime(path)  # mark as recently used for eviction
+        self.hits += 1
+        return True
+
+    def _store(self, path, write):
+        tmp_path = path + '.tmp'
+        write(tmp_path)
+        os.replace(tmp_path, path)
+
+    def get_metric(self, key):
+        """Returns (True, value) on a hit and (False, None) on a miss."""
+        path = self._entry('metrics', key)
+        if not self._hit(path):
+            return False, None
+        with open(path, encoding='utf-8') as f:
+            return True, json.load(f)
+
+    def put_metric(self, key, value):
+        def write(path):
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(value, f, default=str)
+        self._store(self._entry('metrics', key), write)
+
+    def get_chart(self, key, dest):
+        """Copies a cached chart to `dest`. Returns False on a miss."""
+        path = self._entry('charts', key)
+        if not self._hit(path):
+            return False
+        shutil.copyfile(path, dest)
+        return True
+
+    def put_chart(self, key, src):
+        self._store(self._entry('charts', key), lambda path: shutil.copyfile(src, path))
+
+    # --- Eviction ---
+    def entries(self):
+        """(last used, size, path) of every cached result, oldest first."""
+        found = []
+        for kind in ("metrics", "charts"):
+            folder = os.path.join(self.cache_dir, kind)
+            for entry in os.scandir(folder):
+                if entry.is_file() and not entry.name.endswith('.tmp'):
+                    stat = entry.stat()
+                    found.append((stat.st_mtime, stat.st_size, entry.path))
+        return sorted(found)
+
+    def evict(self):
+        """Drops entries unused for longer than max_age, then the least
+        recently used ones until the cache fits in max_bytes. Returns the
+        number of entries removed."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        cutoff = time.time() - self.max_age if self.max_age is not None else None
+        removed = 0
+        for used, size, path in entries:
+            too_old = cutoff is not None and used < cutoff
+            too_big = self.max_bytes is not None and total > self.max_bytes
+            if not (too_old or too_big):
+                continue
+            os.remove(path)
+            total -= size
+            removed += 1
+        return removed
+
+    def clear(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        for kind in ("metrics", "charts"):
+            os.makedirs(os.path.join(self.cache_dir, kind), exist_ok=True)
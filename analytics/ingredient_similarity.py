@@ -0,0 +1,273 @@
+"""Ingredient co-occurrence and similar recipes from a sparse recipe matrix.
+
+recipe_matrix() turns the ingredients table into a binary CSR matrix X with
+one row per recipe_id and one column per ingredient name. The rest is
+sparse matrix products instead of loops over pairs:
+
+    co-occurrence   X.T @ X: recipes sharing each pair of ingredients (the
+                    diagonal is each ingredient's recipe count)
+    similarity      X[block] @ X.T: ingredients shared by each pair of
+                    recipes, scored as Jaccard |A & B| / |A | B| or cosine
+                    |A & B| / sqrt(|A| |B|)
+
+Recipes are compared a block of rows at a time, with blocks sized so that a
+product holds about `max_pairs` entries, and only the `k` best neighbours
+of each recipe are kept (ties go to the recipe listed first). Memory is
+bounded by `max_pairs`, not by recipes squared. With a small vocabulary
+nearly every pair of recipes shares an ingredient, so the block is then
+multiplied by a dense X.T instead of a sparse one.
+
+build_similarity() saves the neighbours and the co-occurrence matrix to
+ingredient_similarity.npz next to the tables, and SimilarityIndex answers
+from that file. The ingredients table's size and mtime are stored too, and
+an index older than its table is rejected with StaleSimilarityError.
+
+    python ingredient_similarity.py --data-dir ../transform_data --k 10
+    python ingredient_similarity.py --data-dir ../transform_data --recipe RECIPE_ID
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from transform_data.tables import FORMAT_EXTENSIONS, read_table_text, table_path
+
+SIMILARITY_FILE = "ingredient_similarity.npz"
+METRICS = ("jaccard", "cosine")
+DEFAULT_K = 10
+# Entries of one block of the recipe x recipe product
+DEFAULT_MAX_PAIRS = 1 << 24
+
+class StaleSimilarityError(ValueError):
+    """The ingredients table changed after the similarity index was built."""
+
+def _require_scipy():
+    try:
+        import scipy.sparse
+    except ImportError:
+        raise ImportError("scipy is required for ingredient similarity: pip install scipy")
+    return scipy
+
+def _encode(values):
+    return np.char.encode(np.asarray(values, dtype=str), 'utf-8')
+
+def _decode(values):
+    return np.char.decode(values, 'utf-8')
+
+# --- MATRICES ---
+def recipe_matrix(ingredients):
+    """(X, recipe_ids, names): the binary recipe x ingredient CSR matrix of
+    an ingredients DataFrame, with rows and columns in first-seen order.
+    An ingredient listed twice in a recipe counts once."""
+    scipy = _require_scipy()
+    rows = ingredients[ingredients['name'].astype(str).str.strip() != '']
+    recipe_codes, recipe_ids = pd.factorize(rows['recipe_id'].astype(str))
+    name_codes, names = pd.factorize(rows['name'].astype(str))
+    matrix = scipy.sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float32), (recipe_codes, name_codes)), shape=(len(recipe_ids), len(names)))
+    matrix.data[:] = 1
+    return matrix, np.asarray(recipe_ids, dtype=object), np.asarray(names, dtype=object)
+
+def cooccurrence(matrix):
+    """X.T @ X as int64 CSR: recipes that use both ingredients i and j."""
+    return (matrix.T @ matrix).tocsr().astype(np.int64)
+
+def top_pairs(cooc, names, n=20):
+    """The `n` ingredient pairs shared by the most recipes, as a DataFrame
+    (ties in first-seen ingredient order)."""
+    scipy = _require_scipy()
+    pairs = scipy.sparse.triu(cooc, k=1).tocoo()
+    order = np.lexsort((pairs.col, pairs.row, -pairs.data))[:n]
+    return pd.DataFrame({"ingredient": names[pairs.row[order]], "other": names[pairs.col[order]],
+                         "recipes": pairs.data[order]})
+
+# --- NEIGHBOURS ---
+def _scores(shared, size_a, size_b, metric):
+    """Scores from float64 shared-ingredient counts, overwriting `shared`."""
+    if metric == "jaccard":
+        union = np.add(size_a, size_b)
+        union -= shared
+        return np.divide(shared, union, out=shared)
+    norms = np.multiply(size_a, size_b)
+    return np.divide(shared, np.sqrt(norms, out=norms), out=shared)
+
+def _keep_top(rows, cols, scores, k, neighbours, best):
+    """Writes the `k` best (row, col) candidates of every row into
+    `neighbours`/`best`: highest score first, then lowest col."""
+    order = np.lexsort((cols, -scores, rows))
+    rows, cols, scores = rows[order], cols[order], scores[order]
+    rank = np.arange(len(rows)) - np.searchsorted(rows, rows, "left")
+    kept = rank < k
+    neighbours[rows[kept], rank[kept]] = cols[kept]
+    best[rows[kept], rank[kept]] = scores[kept]
+
+def _block_bounds(cost, max_pairs):
+    """Row boundaries of blocks of about `max_pairs` product entries, given
+    the entries of each row."""
+    block = np.cumsum(cost) // max(max_pairs, 1)
+    return np.r_[0, np.flatnonzero(np.diff(block)) + 1, len(cost)]
+
+def top_neighbours(matrix, k=DEFAULT_K, metric="jaccard", max_pairs=DEFAULT_MAX_PAIRS):
+    """(neighbours, scores): the `k` recipes (row numbers of `matrix`) that
+    share the most ingredients with each recipe by `metric`, as (n, k)
+    int32 and float32 arrays padded with -1 and NaN. Recipes sharing no
+    ingredient are never neighbours."""
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric: {metric!r}")
+    n = matrix.shape[0]
+    sizes = np.asarray(matrix.sum(axis=1), dtype=float).ravel()
+    neighbours = np.full((n, k), -1, dtype=np.int32)
+    best = np.full((n, k), np.nan, dtype=np.float32)
+    if not n:
+        return neighbours, best
+    # Product entries of each row: at most the recipes holding any of its ingredients
+    recipes_per_name = np.asarray(matrix.sum(axis=0)).ravel()
+    cost = np.minimum(matrix @ recipes_per_name, n).astype(np.int64)
+    # When most pairs share an ingredient (a small vocabulary), multiplying
+    # by a dense X.T is several times faster, if it fits in one block
+    dense = n * matrix.shape[1] <= max_pairs and cost.mean() >= n / 4
+    if dense:
+        cost = np.full(n, n, dtype=np.int64)
+    other = matrix.T.toarray() if dense else matrix.T.tocsr()
+    bounds = _block_bounds(cost, max_pairs)
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        product = matrix[start:end] @ other
+        if dense:
+            scores = _scores(product.astype(float), sizes[start:end, None], sizes[None, :], metric)
+            scores[np.arange(end - start), np.arange(start, end)] = 0
+            # Only scores tied with or above each row's k-th best compete
+            threshold = np.partition(scores, n - k, axis=1)[:, n - k:n - k + 1] if n > k else 0
+            rows, cols = np.nonzero(scores >= np.maximum(threshold, np.finfo(float).tiny))
+            scores = scores[rows, cols]
+        else:
+            product = product.tocoo()
+            rows, cols = product.row, product.col
+            others = rows + start != cols
+            rows, cols = rows[others], cols[others]
+            scores = _scores(product.data[others].astype(float), sizes[rows + start], sizes[cols], metric)
+        _keep_top(rows + start, cols, scores, k, neighbours, best)
+    return neighbours, best
+
+# --- PERSISTENCE ---
+def build_similarity(fmt="csv", data_dir="", k=DEFAULT_K, metric="jaccard", max_pairs=DEFAULT_MAX_PAIRS,
+                     output=None):
+    """Builds the neighbours and co-occurrence of the ingredients table in
+    `data_dir` and saves them (default: <data_dir>/ingredient_similarity.npz).
+    Returns the output path."""
+    path = table_path("ingredients", fmt, data_dir)
+    stat = os.stat(path)
+    matrix, recipe_ids, names = recipe_matrix(read_table_text(path, columns=["recipe_id", "name"]))
+    neighbours, scores = top_neighbours(matrix, k, metric, max_pairs)
+    cooc = cooccurrence(matrix)
+    keys = _encode(recipe_ids)
+    order = np.argsort(keys, kind="stable")
+    output = output or os.path.join(data_dir, SIMILARITY_FILE)
+    with open(output + '.tmp', 'wb') as f:
+        # keys/rows: the recipe_ids sorted, and each one's row in the other arrays
+        np.savez(f, recipe_ids=keys, keys=keys[order], rows=order, names=_encode(names),
+                 neighbours=neighbours, scores=scores, metric=metric,
+                 cooc_indptr=cooc.indptr, cooc_indices=cooc.indices, cooc_data=cooc.data,
+                 source=os.path.abspath(path), size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+    os.replace(output + '.tmp', output)
+    return output
+
+class SimilarityIndex:
+    """Similar recipes and ingredient co-occurrence from a saved index."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        with np.load(self.path) as saved:
+            self._index = {name: saved[name] for name in saved.files}
+        source = str(self._index["source"])
+        stat = os.stat(source) if os.path.exists(source) else None
+        if stat is None or (stat.st_size, stat.st_mtime_ns) != (int(self._index["size"]),
+                                                                int(self._index["mtime_ns"])):
+            raise StaleSimilarityError(f"{source} changed after the similarity index was built")
+        self.metric = str(self._index["metric"])
+        self.recipe_ids = _decode(self._index["recipe_ids"])
+        self.names = _decode(self._index["names"])
+
+    def _row(self, recipe_id):
+        keys = self._index["keys"]
+        key = _encode([recipe_id])[0]
+        position = np.searchsorted(keys, key)
+        if position == len(keys) or keys[position] != key:
+            return None
+        return self._index["rows"][position]
+
+    def similar(self, recipe_id, k=None):
+        """[{"recipe_id", "score"}, ...] of the recipes most similar to one
+        recipe, best first ([] for a recipe without ingredients)."""
+        row = self._row(recipe_id)
+        if row is None:
+            return []
+        neighbours, scores = self._index["neighbours"][row][:k], self._index["scores"][row][:k]
+        found = neighbours >= 0
+        return [{"recipe_id": other, "score": float(score)}
+                for other, score in zip(self.recipe_ids[neighbours[found]], scores[found])]
+
+    def cooccurrence(self):
+        scipy = _require_scipy()
+        return scipy.sparse.csr_matrix(
+            (self._index["cooc_data"], self._index["cooc_indices"], self._index["cooc_indptr"]),
+            shape=(len(self.names), len(self.names)))
+
+    def top_pairs(self, n=20):
+        return top_pairs(self.cooccurrence(), self.names, n)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or query the ingredient similarity index.")
+    parser.add_argument("--format", choices=sorted(FORMAT_EXTENSIONS), default="csv",
+                        help="Format of the ETL output tables to read (default: csv)")
+    parser.add_argument("--data-dir", default=str(PROJECT_ROOT / 'transform_data'),
+                        help="Folder holding the ETL output tables (default: transform_data/)")
+    parser.add_argument("--k", type=int, default=DEFAULT_K,
+                        help=f"Neighbours kept per recipe (default: {DEFAULT_K})")
+    parser.add_argument("--metric", choices=METRICS, default="jaccard",
+                        help="Similarity of two ingredient sets (default: jaccard)")
+    parser.add_argument("--max-pairs", type=int, default=DEFAULT_MAX_PAIRS,
+                        help=f"Recipe pairs scored per block, bounds memory (default: {DEFAULT_MAX_PAIRS})")
+    parser.add_argument("--output", default=None,
+                        help=f"Where to save the index (default: <data-dir>/{SIMILARITY_FILE})")
+    parser.add_argument("--recipe", default=None,
+                        help="Print the recipes most similar to this recipe_id from a saved index instead")
+    parser.add_argument("--pairs", type=int, default=10,
+                        help="Ingredient pairs to print, by recipes sharing them (default: 10)")
+    args = parser.parse_args()
+    if args.k < 1:
+        parser.error("--k must be at least 1")
+    output = args.output or os.path.join(args.data_dir, SIMILARITY_FILE)
+
+    if args.recipe is None:
+        source = table_path("ingredients", args.format, args.data_dir)
+        if not os.path.exists(source):
+            print(f"Error: Could not find {source}. Did you run the ETL pipeline?")
+            exit(1)
+        build_similarity(args.format, args.data_dir, args.k, args.metric, args.max_pairs, output)
+        print(f"✔ Similarity index saved to: {output}")
+    try:
+        index = SimilarityIndex(output)
+    except FileNotFoundError:
+        print(f"Error: Could not find {output}. Build it first (without --recipe).")
+        exit(1)
+    except StaleSimilarityError as error:
+        print(f"Error: {error}. Rebuild it without --recipe.")
+        exit(1)
+
+    if args.recipe is not None:
+        print(f"Recipes most similar to {args.recipe} ({index.metric}):")
+        neighbours = index.similar(args.recipe, args.k)
+        for neighbour in neighbours:
+            print(f"  {neighbour['recipe_id']}  {neighbour['score']:.3f}")
+        if not neighbours:
+            print("  (none: unknown recipe, or no ingredient in common with another one)")
+    elif args.pairs:
+        print("Ingredients most often used together:")
+        print(index.top_pairs(args.pairs).to_string(index=False))
@@ -0,0 +1,403 @@
+"""Materialized rollups: the insight summary without rescanning the tables.
+
+The ETL keeps a few small aggregate tables up to date as it emits rows:
+
+    recipes             per recipe_id: the recipe's attributes, step count,
+                        summed step minutes, interaction count, rating
+                        sum/count, comment count
+    ingredients         per ingredient name: rows and interaction-weighted
+                        rating sum/count
+    difficulty          per difficulty: recipes
+    recipe_ingredients  (recipe_id, name) pairs, to carry new ratings over to
+                        the ingredient totals
+    steps_histogram     steps per recipe -> recipes
+    totals              sums, counts, sums of squares and cross products for
+                        the averages and the prep-vs-rating and step-vs-total
+                        time correlations
+
+apply() folds in one batch of rows with the ETL's upsert rules: a recipe in
+the batch replaces its earlier row, ingredients and steps, and interactions
+are appended. rollup_insights() answers every metric from the rollups in
+time proportional to the number of recipes, never to the interaction
+history. As in the streaming engine, tied entries in the top-N lists are in
+first-seen order.
+
+    python rollups.py --data-dir ../transform_data --format csv
+"""
+import argparse
+import math
+import os
+import pickle
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+try:
+    from analytics.analytics import METRIC_NAMES, TABLE_NAMES, load_tables, step_time_summary
+except ModuleNotFoundError:
+    # Imported from analytics.py run as a script: `analytics` is that module
+    from analytics import METRIC_NAMES, TABLE_NAMES, load_tables, step_time_summary
+from pipeline.typed_ingest import parse_numbers
+from transform_data.durations import step_minutes
+from transform_data.tables import FORMAT_EXTENSIONS, table_path
+
+ROLLUPS_FILE = "rollups.pkl"
+# Bumped whenever the saved state changes shape; older rollups are rebuilt
+ROLLUPS_VERSION = 2
+TOTALS = ("recipe_rows", "prep_sum", "prep_count", "cook_sum", "cook_count", "total_count",
+          "n", "sx", "sy", "sxx", "syy", "sxy",
+          "step_n", "step_sum", "step_max_sum", "step_total_sum", "step_exceed",
+          "step_sxx", "step_syy", "step_sxy")
+
+class StaleRollupError(ValueError):
+    """A table changed after the rollups were last updated from it."""
+
+def _frame(columns, index_name):
+    return pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in columns.items()},
+                        index=pd.Index([], dtype=object, name=index_name))
+
+def _has_comment(notes):
+    return (notes.notnull() & (notes.astype(str).str.strip() != '')).to_numpy()
+
+def _ranked(frame, column, n, seq_column="seq"):
+    """Same rows as frame.sort_values(column, ascending=False, kind="stable",
+    na_position="last").head(n) for a frame in `seq_column` order, but
+    without sorting every row."""
+    values = frame[column].to_numpy(dtype=float)
+    seq = frame[seq_column].to_numpy(dtype=float)
+    present = np.flatnonzero(~np.isnan(values))
+    if len(present) > n:
+        kth = np.partition(values[present], len(present) - n)[len(present) - n]
+        present = present[values[present] >= kth]
+    chosen = present[np.lexsort((seq[present], -values[present]))][:n]
+    if len(chosen) < n:
+        missing = np.flatnonzero(np.isnan(values))
+        chosen = np.concatenate([chosen, missing[np.argsort(seq[missing], kind="stable")][:n - len(chosen)]])
+    return frame.iloc[chosen]
+
+def _lerp(a, b, t):
+    # numpy's linear interpolation, which Series.quantile() uses
+    diff = b - a
+    return b - diff * (1 - t) if t >= 0.5 else a + diff * t
+
+def describe_histogram(histogram):
+    """Series.describe() of the values a {value: count} histogram stands for."""
+    histogram = histogram[histogram > 0].sort_index()
+    count = int(histogram.sum())
+    if not count:
+        return {"count": 0.0, **dict.fromkeys(["mean", "std", "min", "25%", "50%", "75%", "max"], np.nan)}
+    values = histogram.index.to_numpy(dtype=float)
+    counts = histogram.to_numpy()
+    mean = float((values * counts).sum() / count)
+    std = math.sqrt(float((counts * (values - mean) ** 2).sum()) / (count - 1)) if count > 1 else np.nan
+    cumulative = np.cumsum(counts)
+
+    def nth(k):
+        return values[np.searchsorted(cumulative, k, side="right")]
+
+    def quantile(q):
+        position = (count - 1) * q
+        low = math.floor(position)
+        return float(_lerp(nth(low), nth(min(low + 1, count - 1)), position - low))
+
+    return {"count": float(count), "mean": mean, "std": std, "min": float(values[0]),
+            "25%": quantile(0.25), "50%": quantile(0.5), "75%": quantile(0.75), "max": float(values[-1])}
+
+class Rollups:
+    """Aggregates of the four tables, updated one batch of rows at a time.
+
+    Assumes one row per recipe_id in the recipes table, as the ETL writes it.
+    `seq` columns number keys in the order they were first seen (a replaced
+    recipe moves to the end, like its row in the merged table) and break
+    ties in the top-N lists.
+    """
+
+    def __init__(self):
+        self.recipes = _frame({
+            "seq": float, "title": object, "prep_time_min": float, "cook_time_min": float,
+            "total_time_min": float, "difficulty": object, "steps": np.int64, "timed_steps": np.int64,
+            "step_minutes": float, "step_max_minutes": float, "interactions": np.int64,
+            "rating_sum": float, "rating_count": np.int64, "comments": np.int64,
+            "interaction_seq": float, "comment_seq": float,
+        }, "recipe_id")
+        self.ingredients = _frame({"rows": np.int64, "rating_sum": float, "rating_count": np.int64,
+                                   "seq": float}, "name")
+        self.difficulty = _frame({"recipes": np.int64, "seq": float}, "difficulty")
+        self.recipe_ingredients = pd.DataFrame({"recipe_id": pd.Series(dtype=object),
+                                                "name": pd.Series(dtype=object)})
+        self.steps_histogram = pd.Series(dtype=np.int64)
+        self.totals = dict.fromkeys(TOTALS, 0.0)
+        self.next_seq = 0
+        self.version = ROLLUPS_VERSION
+        # Table file -> (size, mtime_ns) after the last update
+        self.sources = {}
+
+    def _seq(self, count):
+        seq = np.arange(self.next_seq, self.next_seq + count, dtype=float)
+        self.next_seq += count
+        return seq
+
+    # --- Contributions of a set of recipes ---
+    def _add_grouped(self, frame, keys, values, sign):
+        """Adds sign * the per-key sums of `values` into `frame`; unseen keys
+        are appended with new seq numbers, in first-seen order."""
+        sums = values.groupby(np.asarray(keys, dtype=object), sort=False).sum()
+        if not len(sums):
+            return frame
+        new = sums.index.difference(frame.index, sort=False)
+        if len(new):
+            added = pd.DataFrame({column: np.zeros(len(new), dtype=dtype)
+                                  for column, dtype in frame.dtypes.items()}, index=new)
+            added["seq"] = self._seq(len(new))
+            frame = pd.concat([frame, added]) if len(frame) else added.rename_axis(frame.index.name)
+        frame.loc[sums.index, sums.columns] += sign * sums
+        return frame
+
+    def _recipe_terms(self, ids, sign):
+        """Adds (sign=1) or retracts (sign=-1) what the recipes `ids`
+        contribute to the totals, the difficulty counts and the steps histogram."""
+        rows = self.recipes.loc[ids]
+        is_recipe = rows["seq"].notna().to_numpy()
+        prep = rows["prep_time_min"].to_numpy()[is_recipe]
+        cook = rows["cook_time_min"].to_numpy()[is_recipe]
+        count = rows["rating_count"].to_numpy()[is_recipe]
+        rating = np.divide(rows["rating_sum"].to_numpy()[is_recipe], count,
+                           out=np.full(len(count), np.nan), where=count > 0)
+        totals = self.totals
+        totals["recipe_rows"] += sign * int(is_recipe.sum())
+        totals["prep_sum"] += sign * float(np.nansum(prep))
+        totals["prep_count"] += sign * int((~np.isnan(prep)).sum())
+        totals["cook_sum"] += sign * float(np.nansum(cook))
+        totals["cook_count"] += sign * int((~np.isnan(cook)).sum())
+        totals["total_count"] += sign * int(rows["total_time_min"][is_recipe].notna().sum())
+        both = ~np.isnan(prep) & ~np.isnan(rating)
+        x, y = prep[both], rating[both]
+        for name, value in (("n", len(x)), ("sx", x.sum()), ("sy", y.sum()), ("sxx", (x * x).sum()),
+                            ("syy", (y * y).sum()), ("sxy", (x * y).sum())):
+            totals[name] += sign * float(value)
+        # Summed step minutes against total_time_min, for recipes with both
+        total = rows["total_time_min"].to_numpy(dtype=float)[is_recipe]
+        both = (rows["timed_steps"].to_numpy()[is_recipe] > 0) & ~np.isnan(total)
+        x, y = rows["step_minutes"].to_numpy()[is_recipe][both], total[both]
+        for name, value in (("step_n", len(x)), ("step_sum", x.sum()),
+                            ("step_max_sum", rows["step_max_minutes"].to_numpy()[is_recipe][both].sum()),
+                            ("step_total_sum", y.sum()), ("step_exceed", (x > y).sum()),
+                            ("step_sxx", (x * x).sum()), ("step_syy", (y * y).sum()), ("step_sxy", (x * y).sum())):
+            totals[name] += sign * float(value)
+
+        difficulty = rows["difficulty"][is_recipe]
+        self.difficulty = self._add_grouped(
+            self.difficulty, difficulty, pd.DataFrame({"recipes": np.ones(len(difficulty), dtype=np.int64)}), sign)
+        steps = rows["steps"].to_numpy()
+        steps = steps[steps > 0]
+        if len(steps):
+            counts = pd.Series(steps).value_counts()
+            self.steps_histogram = self.steps_histogram.add(sign * counts, fill_value=0).astype(np.int64)
+
+    def _ingredient_terms(self, ids, sign):
+        """Adds or retracts the ingredient rows of the recipes `ids`, each
+        weighted by its recipe's current rating sum and count."""
+        pairs = self.recipe_ingredients[self.recipe_ingredients["recipe_id"].isin(ids)]
+        stats = self.recipes.loc[pairs["recipe_id"], ["rating_sum", "rating_count"]]
+        values = pd.DataFrame({"rows": np.ones(len(pairs), dtype=np.int64),
+                               "rating_sum": stats["rating_sum"].to_numpy(),
+                               "rating_count": stats["rating_count"].to_numpy()})
+        self.ingredients = self._add_grouped(self.ingredients, pairs["name"].to_numpy(dtype=object), values, sign)
+
+    # --- Updates ---
+    def apply(self, batch):
+        """Folds in a batch of rows: {table name: DataFrame} as
+        analytics.load_tables() reads them (missing tables are skipped).
+
+        Recipes in the batch replace their earlier row, ingredients and
+        steps; interactions are added to what is already counted.
+        """
+        empty = pd.DataFrame({"recipe_id": pd.Series(dtype=object)})
+        recipes, ingredients, steps, interactions = (
+            batch.get(name) if batch.get(name) is not None else empty for name in TABLE_NAMES)
+        recipes = recipes.drop_duplicates("recipe_id", keep="last")
+        replaced = pd.Index(recipes["recipe_id"].to_numpy(dtype=object))
+
+        # Every recipe whose contributions change this batch
+        touched = pd.Index(pd.unique(np.concatenate([
+            frame["recipe_id"].to_numpy(dtype=object) for frame in (recipes, ingredients, steps, interactions)])))
+        touched = touched[pd.notna(touched)]
+        new = touched.difference(self.recipes.index, sort=False)
+        if len(new):
+            added = _frame(dict(self.recipes.dtypes), "recipe_id").reindex(new)
+            for column in ("steps", "timed_steps", "step_minutes", "step_max_minutes",
+                           "interactions", "rating_sum", "rating_count", "comments"):
+                added[column] = np.zeros(len(new), dtype=self.recipes.dtypes[column])
+            self.recipes = pd.concat([self.recipes, added]) if len(self.recipes) else added
+
+        self._recipe_terms(touched, -1)
+        self._ingredient_terms(touched, -1)
+
+        # Replaced recipes lose their old child rows
+        old = self.recipe_ingredients["recipe_id"].isin(replaced)
+        self.recipe_ingredients = self.recipe_ingredients[~old]
+        self.recipes.loc[replaced, ["steps", "timed_steps", "step_minutes", "step_max_minutes"]] = 0
+
+        if len(interactions):
+            ratings = parse_numbers(interactions["rating"]).series()
+            has_comment = _has_comment(interactions["cooknote"])
+            keys = interactions["recipe_id"].to_numpy(dtype=object)
+            sums = pd.DataFrame({"interactions": np.ones(len(keys), dtype=np.int64),
+                                 "rating_sum": ratings.fillna(0.0).to_numpy(),
+                                 "rating_count": ratings.notna().to_numpy().astype(np.int64),
+                                 "comments": has_comment.astype(np.int64)}).groupby(keys, sort=False).sum()
+            sums = sums[sums.index.notna()]
+            self.recipes.loc[sums.index, sums.columns] += sums
+            for column, ids in (("interaction_seq", sums.index), ("comment_seq", sums.index[sums["comments"] > 0])):
+                first = ids[self.recipes.loc[ids, column].isna().to_numpy()]
+                self.recipes.loc[first, column] = self._seq(len(first))
+
+        if len(ingredients):
+            pairs = pd.DataFrame({"recipe_id": ingredients["recipe_id"].to_numpy(dtype=object),
+                                  "name": ingredients["name"].to_numpy(dtype=object)})
+            self.recipe_ingredients = pd.concat([self.recipe_ingredients, pairs], ignore_index=True)
+        if len(steps):
+            low, high = step_minutes(steps)
+            timed = ~np.isnan(low)
+            sums = pd.DataFrame({"steps": np.ones(len(steps), dtype=np.int64),
+                                 "timed_steps": timed.astype(np.int64),
+                                 "step_minutes": np.where(timed, low, 0.0),
+                                 "step_max_minutes": np.where(timed, high, 0.0),
+                                 }).groupby(steps["recipe_id"].to_numpy(dtype=object), sort=False).sum()
+            self.recipes.loc[sums.index, sums.columns] += sums
+        if len(recipes):
+            attributes = self.recipes.loc[replaced]
+            attributes["seq"] = self._seq(len(replaced))
+            attributes["title"] = recipes["title"].to_numpy(dtype=object)
+            for column in ("prep_time_min", "cook_time_min", "total_time_min"):
+                attributes[column] = parse_numbers(recipes[column]).values
+            attributes["difficulty"] = recipes["difficulty"].to_numpy(dtype=object)
+            self.recipes.loc[replaced, attributes.columns] = attributes
+
+        self._recipe_terms(touched, 1)
+        self._ingredient_terms(touched, 1)
+
+    def record_sources(self, paths):
+        self.sources = {os.path.abspath(path): (os.stat(path).st_size, os.stat(path).st_mtime_ns) for path in paths}
+
+    def check_sources(self):
+        """Raises StaleRollupError if a recorded table file has changed."""
+        for path, (size, mtime_ns) in self.sources.items():
+            stat = os.stat(path) if os.path.exists(path) else None
+            if stat is None or (stat.st_size, stat.st_mtime_ns) != (size, mtime_ns):
+                raise StaleRollupError(f"{path} changed after the rollups were updated")
+
+    # --- Persistence ---
+    # Only the plain attributes are pickled, so loading does not depend on
+    # the module path this class was imported under
+    def save(self, path):
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump(vars(self), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + '.tmp', path)
+
+    @classmethod
+    def load(cls, path):
+        """Loads saved rollups; raises StaleRollupError if they were saved by
+        a version that kept different aggregates."""
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+        if state.get("version") != ROLLUPS_VERSION:
+            raise StaleRollupError(f"{path} was saved by an older version of the rollups")
+        rollups = cls()
+        vars(rollups).update(state)
+        return rollups
+
+def load_current(path):
+    """The rollups saved at `path`, or None when there are none, they are
+    from an older version or a table changed since they were saved (they
+    must then be rebuilt)."""
+    if not os.path.exists(path):
+        return None
+    try:
+        rollups = Rollups.load(path)
+        rollups.check_sources()
+    except StaleRollupError as error:
+        print(f"Rebuilding the rollups: {error}")
+        return None
+    return rollups
+
+# --- QUERIES ---
+def _natural(values):
+    """Integer columns come back as int when nothing is missing, as pandas
+    infers them from the tables."""
+    return values.astype(np.int64) if values.notna().all() else values
+
+def _correlation(n, sx, sy, sxx, syy, sxy):
+    """Pearson correlation from a count, sums, sums of squares and the sum
+    of cross products."""
+    var_x, var_y = sxx - sx * sx / n if n else 0.0, syy - sy * sy / n if n else 0.0
+    return (sxy - sx * sy / n) / math.sqrt(var_x * var_y) if n >= 2 and var_x > 0 and var_y > 0 else np.nan
+
+def rollup_insights(rollups):
+    """The insight summary (same keys and values as analytics.insights()),
+    answered from the rollups."""
+    recipes = rollups.recipes
+    rows = recipes[recipes["seq"].notna()].sort_values("seq")
+    totals = rollups.totals
+    counted = rollups.ingredients[rollups.ingredients["rows"] > 0]
+    difficulty = rollups.difficulty[rollups.difficulty["recipes"] > 0]
+    interacted = recipes[recipes["interactions"] > 0]
+    commented = recipes[recipes["comments"] > 0]
+
+    corr = _correlation(*(totals[name] for name in ("n", "sx", "sy", "sxx", "syy", "sxy")))
+    step_corr = _correlation(*(totals[name] for name in ("step_n", "step_sum", "step_total_sum",
+                                                         "step_sxx", "step_syy", "step_sxy")))
+
+    scores = (counted["rating_sum"] / counted["rating_count"].replace(0, np.nan)).sort_index()
+    rating = rows["rating_sum"] / rows["rating_count"].replace(0, np.nan)
+    top_rated = _ranked(rows.assign(rating=rating), "rating", 10)
+    longest = _ranked(rows, "total_time_min", 10)
+    total_time = longest["total_time_min"]
+    if totals["total_count"] == totals["recipe_rows"]:
+        total_time = total_time.astype(np.int64)
+
+    out = {
+        "most_common_ingredients": _ranked(counted, "rows", 20)["rows"].to_dict(),
+        "avg_prep_time": totals["prep_sum"] / totals["prep_count"] if totals["prep_count"] else np.nan,
+        "avg_cook_time": totals["cook_sum"] / totals["cook_count"] if totals["cook_count"] else np.nan,
+        "difficulty_distribution": _ranked(difficulty, "recipes", len(difficulty))["recipes"].to_dict(),
+        "most_interacted": _ranked(interacted, "interactions", 20, "interaction_seq")["interactions"].to_dict(),
+        "prep_vs_rating_corr": corr,
+        "ingredients_high_rating": scores.dropna().sort_values(ascending=False).head(20).to_dict(),
+        "top_rated_recipes": [{"recipe_id": recipe_id, "title": title, "rating": value} for recipe_id, title, value
+                              in zip(top_rated.index, top_rated["title"], top_rated["rating"])],
+        "steps_count_distribution": describe_histogram(rollups.steps_histogram),
+        "recipes_most_comments": _ranked(commented, "comments", 10, "comment_seq")["comments"].to_dict(),
+        "longest_total_time": [{"recipe_id": recipe_id, "title": title, "total_time_min": value}
+                               for recipe_id, title, value in zip(longest.index, longest["title"], total_time)],
+        "step_time_vs_total_time": step_time_summary(
+            round(totals["step_n"]), totals["step_sum"], totals["step_max_sum"], totals["step_total_sum"],
+            round(totals["step_exceed"]), step_corr),
+    }
+    return {name: out[name] for name in METRIC_NAMES}
+
+def build_rollups(fmt="csv", data_dir=None):
+    """Builds rollups from scratch from the tables in `data_dir`."""
+    rollups = Rollups()
+    rollups.apply(dict(zip(TABLE_NAMES, load_tables(fmt, TABLE_NAMES, data_dir))))
+    rollups.record_sources(table_path(name, fmt, str(data_dir)) for name in TABLE_NAMES)
+    return rollups
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the insight rollups from the ETL tables.")
+    parser.add_argument("--format", choices=sorted(FORMAT_EXTENSIONS), default="csv",
+                        help="Format of the ETL output tables to read (default: csv)")
+    parser.add_argument("--data-dir", default=str(PROJECT_ROOT / 'transform_data'),
+                        help="Folder holding the ETL output tables (default: transform_data/)")
+    parser.add_argument("--output", default=None,
+                        help=f"Where to save the rollups (default: <data-dir>/{ROLLUPS_FILE})")
+    args = parser.parse_args()
+    output = args.output or os.path.join(args.data_dir, ROLLUPS_FILE)
+    build_rollups(args.format, args.data_dir).save(output)
+    print(f"✔ Rollups saved to: {output}")
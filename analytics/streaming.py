@@ -0,0 +1,261 @@
+"""Out-of-core analytics: the insights summary computed from table chunks.
+
+Every table is streamed once, in chunks of `chunksize` rows, and folded into
+small mergeable partial aggregates (grouped sums, correlation moments, top-N
+buffers). Memory is bounded by the chunk size plus per-recipe and
+per-ingredient state; it never depends on the size of the interaction history.
+"""
+import math
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+try:
+    from analytics.analytics import (METRIC_NAMES, first_seen_counts, ingredient_rating_totals,
+                                     recipe_step_minutes, step_time_summary)
+except ModuleNotFoundError:
+    # Imported from analytics.py run as a script: `analytics` is that module
+    from analytics import (METRIC_NAMES, first_seen_counts, ingredient_rating_totals,
+                           recipe_step_minutes, step_time_summary)
+from data_validation.valid_mask import load_valid_mask, recipe_ids_digest
+from pipeline.typed_ingest import parse_numbers
+from transform_data.durations import DURATION_COLUMNS
+from transform_data.tables import file_columns, iter_table_chunks, table_path
+
+DEFAULT_CHUNKSIZE = 100_000
+
+# --- PARTIAL AGGREGATES ---
+class GroupedSums:
+    """Per-key sums (or counts), in first-seen key order.
+
+    Each chunk is reduced with one groupby; the partial results are compacted
+    once they hold more than `compact_rows` keys, so state stays proportional
+    to the number of distinct keys.
+    """
+
+    def __init__(self, compact_rows=1_000_000):
+        self.compact_rows = compact_rows
+        self._parts = []
+        self._rows = 0
+
+    def add(self, partial):
+        """Adds an already-grouped Series/DataFrame indexed by key."""
+        self._parts.append(partial)
+        self._rows += len(partial)
+        if self._rows > self.compact_rows:
+            self._compact()
+
+    def update(self, keys, values):
+        self.add(values.groupby(keys.to_numpy(), sort=False).sum())
+
+    def update_counts(self, keys):
+        self.add(first_seen_counts(keys))
+
+    def merge(self, other):
+        for part in other._parts:
+            self.add(part)
+
+    def _compact(self):
+        if len(self._parts) > 1:
+            self._parts = [pd.concat(self._parts).groupby(level=0, sort=False).sum()]
+        self._rows = len(self._parts[0]) if self._parts else 0
+
+    def result(self, empty=None):
+        self._compact()
+        if not self._parts:
+            return empty if empty is not None else pd.Series(dtype=float)
+        return self._parts[0]
+
+def top_counts(counts, n=None):
+    """Sorts first-seen counts the way Series.value_counts() does."""
+    ordered = counts.sort_values(ascending=False, kind="stable")
+    return ordered if n is None else ordered.head(n)
+
+class MeanAggregate:
+    """Running sum and count of the non-null values of a column."""
+
+    def __init__(self):
+        self.total = 0.0
+        self.count = 0
+
+    def update(self, values):
+        values = parse_numbers(values).series().dropna()
+        self.total += values.sum()
+        self.count += len(values)
+
+    def merge(self, other):
+        self.total += other.total
+        self.count += other.count
+
+    def mean(self):
+        return self.total / self.count if self.count else float("nan")
+
+class CorrelationMoments:
+    """Streaming Pearson correlation from mergeable count, means and
+    co-moments (pairwise update of Chan et al.), over rows where both x and y
+    are present."""
+
+    def __init__(self):
+        self.n = 0
+        self.mean_x = self.mean_y = 0.0
+        self.m2_x = self.m2_y = self.c_xy = 0.0
+
+    def update(self, x, y):
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        present = ~(np.isnan(x) | np.isnan(y))
+        x, y = x[present], y[present]
+        if not len(x):
+            return
+        chunk = CorrelationMoments()
+        chunk.n = len(x)
+        chunk.mean_x, chunk.mean_y = x.mean(), y.mean()
+        dx, dy = x - chunk.mean_x, y - chunk.mean_y
+        chunk.m2_x, chunk.m2_y, chunk.c_xy = (dx * dx).sum(), (dy * dy).sum(), (dx * dy).sum()
+        self.merge(chunk)
+
+    def merge(self, other):
+        if not other.n:
+            return
+        n = self.n + other.n
+        dx = other.mean_x - self.mean_x
+        dy = other.mean_y - self.mean_y
+        weight = self.n * other.n / n
+        self.m2_x += other.m2_x + dx * dx * weight
+        self.m2_y += other.m2_y + dy * dy * weight
+        self.c_xy += other.c_xy + dx * dy * weight
+        self.mean_x += dx * other.n / n
+        self.mean_y += dy * other.n / n
+        self.n = n
+
+    def correlation(self):
+        denominator = math.sqrt(self.m2_x * self.m2_y)
+        if self.n < 2 or denominator == 0:
+            return float("nan")
+        return self.c_xy / denominator
+
+class TopN:
+    """Bounded buffer of the `n` rows with the largest `column` (NaN last,
+    ties keep the earliest row)."""
+
+    def __init__(self, n, column):
+        self.n = n
+        self.column = column
+        self._best = None
+
+    def update(self, rows):
+        candidates = rows if self._best is None else pd.concat([self._best, rows], ignore_index=True)
+        self._best = candidates.sort_values(
+            self.column, ascending=False, kind="stable", na_position="last").head(self.n)
+
+    def merge(self, other):
+        if other._best is not None:
+            self.update(other._best)
+
+    def records(self):
+        return [] if self._best is None else self._best.to_dict(orient='records')
+
+# --- DRIVER ---
+def valid_recipe_ids(recipe_id_chunks, valid_mask_path):
+    """The recipe_ids of the rows set in a validator mask, from the streamed
+    recipe_id column (checked against the mask's digest)."""
+    id_chunks = [chunk['recipe_id'] for chunk in recipe_id_chunks]
+    valid_mask = load_valid_mask(valid_mask_path, recipe_ids_digest(id_chunks))
+    recipe_ids = pd.concat(id_chunks, ignore_index=True) if id_chunks else pd.Series(dtype=str)
+    return pd.Index(recipe_ids[valid_mask].unique())
+
+def streaming_insights(data_dir, fmt="csv", chunksize=DEFAULT_CHUNKSIZE, valid_mask_path=None):
+    """Computes the same summary as analytics.insights() by streaming the
+    tables in `data_dir`. Tied entries in the top-N lists keep file order.
+    With a validator mask, only valid recipes and their child rows count."""
+    def read_chunks(name, columns):
+        return iter_table_chunks(table_path(name, fmt, str(data_dir)), chunksize, columns)
+
+    valid_ids = None
+    if valid_mask_path:
+        # Pass 0: recipe_id column -> the set of valid ids (state per recipe,
+        # like the per-recipe aggregates below)
+        valid_ids = valid_recipe_ids(read_chunks("recipes", ["recipe_id"]), valid_mask_path)
+
+    def chunks(name, columns):
+        for chunk in read_chunks(name, columns):
+            yield chunk if valid_ids is None else chunk[chunk['recipe_id'].isin(valid_ids)]
+
+    # Pass 1: interactions -> per-recipe counts and rating sums
+    interaction_counts, comment_counts, rating_totals = GroupedSums(), GroupedSums(), GroupedSums()
+    for chunk in chunks("interactions", ["recipe_id", "rating", "cooknote"]):
+        recipe_ids = chunk['recipe_id']
+        interaction_counts.update_counts(recipe_ids)
+        ratings = parse_numbers(chunk['rating']).series(chunk.index)
+        rating_totals.update(recipe_ids, pd.DataFrame({'sum': ratings, 'count': ratings.notna().astype(int)}))
+        notes = chunk['cooknote']
+        has_note = notes.notnull() & (notes.astype(str).str.strip() != '')
+        comment_counts.update_counts(recipe_ids[has_note])
+    rating_stats = rating_totals.result(empty=pd.DataFrame({'sum': [], 'count': []}))
+    mean_rating = rating_stats['sum'] / rating_stats['count']
+
+    # Pass 2: ingredients -> name counts and interaction-weighted rating totals
+    ingredient_counts, ingredient_totals = GroupedSums(), GroupedSums()
+    for chunk in chunks("ingredients", ["recipe_id", "name"]):
+        ingredient_counts.update_counts(chunk['name'])
+        ingredient_totals.add(ingredient_rating_totals(chunk, rating_stats))
+    totals = ingredient_totals.result(empty=pd.DataFrame({'sum': [], 'count': []})).sort_index()
+    ing_score = (totals['sum'] / totals['count']).dropna().sort_values(ascending=False).head(20)
+
+    # Pass 3: steps -> steps and summed step minutes per recipe (tables
+    # written before the duration columns existed parse the duration text)
+    step_counts, step_totals = GroupedSums(), GroupedSums()
+    stored = file_columns(table_path("steps", fmt, str(data_dir)))
+    duration_columns = list(DURATION_COLUMNS) if set(DURATION_COLUMNS) <= set(stored) else ["duration"]
+    for chunk in chunks("steps", ["recipe_id", *duration_columns]):
+        step_counts.update_counts(chunk['recipe_id'])
+        step_totals.add(recipe_step_minutes(chunk))
+    step_minutes = step_totals.result(empty=pd.DataFrame({'min': [], 'max': []}))
+
+    # Pass 4: recipes -> time means, difficulty, correlation and top-N lists
+    prep_mean, cook_mean = MeanAggregate(), MeanAggregate()
+    difficulty_counts = GroupedSums()
+    prep_vs_rating = CorrelationMoments()
+    top_rated, longest = TopN(10, 'rating'), TopN(10, 'total_time_min')
+    step_vs_total = CorrelationMoments()
+    step_sums = np.zeros(4)  # recipes, step minutes, step max minutes, total minutes
+    steps_exceed_total = 0
+    for chunk in chunks("recipes", ["recipe_id", "title", "prep_time_min", "cook_time_min",
+                                    "total_time_min", "difficulty"]):
+        prep_mean.update(chunk['prep_time_min'])
+        cook_mean.update(chunk['cook_time_min'])
+        difficulty_counts.update_counts(chunk['difficulty'])
+        rating = chunk['recipe_id'].map(mean_rating)
+        prep_vs_rating.update(parse_numbers(chunk['prep_time_min']).series(chunk.index), rating)
+        top_rated.update(chunk[['recipe_id', 'title']].assign(rating=rating.to_numpy()))
+        longest.update(chunk[['recipe_id', 'title', 'total_time_min']])
+        steps = step_minutes.reindex(chunk['recipe_id'].to_numpy())
+        total = parse_numbers(chunk['total_time_min']).values
+        both = steps['min'].notna().to_numpy() & ~np.isnan(total)
+        low, high, total = steps['min'].to_numpy()[both], steps['max'].to_numpy()[both], total[both]
+        step_vs_total.update(low, total)
+        step_sums += (len(low), low.sum(), high.sum(), total.sum())
+        steps_exceed_total += int((low > total).sum())
+
+    out = {
+        "most_common_ingredients": top_counts(ingredient_counts.result(), 20).to_dict(),
+        "avg_prep_time": prep_mean.mean(),
+        "avg_cook_time": cook_mean.mean(),
+        "difficulty_distribution": top_counts(difficulty_counts.result()).to_dict(),
+        "most_interacted": top_counts(interaction_counts.result(), 20).to_dict(),
+        "prep_vs_rating_corr": prep_vs_rating.correlation(),
+        "ingredients_high_rating": ing_score.to_dict(),
+        "top_rated_recipes": top_rated.records(),
+        "steps_count_distribution": step_counts.result().rename('steps_count').describe().to_dict(),
+        "recipes_most_comments": top_counts(comment_counts.result(), 10).to_dict(),
+        "longest_total_time": longest.records(),
+        "step_time_vs_total_time": step_time_summary(*step_sums, steps_exceed_total,
+                                                     step_vs_total.correlation()),
+    }
+    return {name: out[name] for name in METRIC_NAMES}
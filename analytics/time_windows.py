@@ -0,0 +1,266 @@
+"""Time-windowed interaction analytics: interaction counts per window,
+rolling average ratings and trending recipes.
+
+The created_at column is parsed once per chunk (pipeline/typed_ingest.py)
+and bucketed with integer arithmetic on epoch hours. time_windows.pkl, next
+to the tables, keeps one row per (hour, recipe_id, type) with the
+interaction count and rating sum/count. Days and weeks (starting on Monday)
+are integer divisions of the hour, all in UTC.
+
+TimeWindows.update() folds the interactions table into that state. The ETL
+only adds interactions newer than its previous run, so every hour before
+the newest stored one is final. Only rows from that hour on are aggregated
+again; older rows are just counted, and if their count changed the history
+was rewritten and everything is rebuilt.
+
+    python time_windows.py --data-dir ../transform_data --window hour --top 10
+"""
+import argparse
+import json
+import os
+import pickle
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from pipeline.typed_ingest import parse_numbers, parse_timestamps
+from transform_data.tables import FORMAT_EXTENSIONS, iter_table_chunks, table_path
+
+TIME_WINDOWS_FILE = "time_windows.pkl"
+TIME_WINDOWS_VERSION = 1
+DEFAULT_CHUNKSIZE = 1_000_000
+# Window -> (width, offset) in hours. Epoch hour 0 is a Thursday, so weeks
+# are shifted by 72 hours to start on Monday.
+WINDOW_HOURS = {"hour": (1, 0), "day": (24, 0), "week": (168, 72)}
+COLUMNS = ["recipe_id", "type", "rating", "created_at"]
+
+class StaleTimeWindowsError(ValueError):
+    """The saved time windows were built by an older version."""
+
+def epoch_hours(values):
+    """(hours since the epoch, dated) of a created_at column; hours are 0
+    where `dated` is False (missing or unparseable timestamps)."""
+    stamps = parse_timestamps(values).values
+    dated = ~np.isnat(stamps)
+    hours = np.where(dated, stamps.astype("datetime64[h]").astype(np.int64), 0)
+    return hours, dated
+
+def window_buckets(hours, window):
+    width, offset = WINDOW_HOURS[window]
+    return (np.asarray(hours, dtype=np.int64) + offset) // width
+
+def bucket_starts(buckets, window):
+    """UTC start time of each `window` bucket number."""
+    width, offset = WINDOW_HOURS[window]
+    return pd.to_datetime((np.asarray(buckets, dtype=np.int64) * width - offset) * 3600, unit="s", utc=True)
+
+def _empty_buckets():
+    return pd.DataFrame({"hour": pd.Series(dtype=np.int64), "recipe_id": pd.Series(dtype=object),
+                         "type": pd.Series(dtype=object), "interactions": pd.Series(dtype=np.int64),
+                         "rating_sum": pd.Series(dtype=float), "rating_count": pd.Series(dtype=np.int64)})
+
+def _aggregate(frames):
+    """Sums per (hour, recipe_id, type), in hour order (first-seen within one)."""
+    if not frames:
+        return _empty_buckets()
+    rows = pd.concat(frames, ignore_index=True)
+    sums = rows.groupby(["hour", "recipe_id", "type"], sort=False).sum().reset_index()
+    return sums.sort_values("hour", kind="stable", ignore_index=True)
+
+class TimeWindows:
+    """Hourly interaction aggregates of one interactions table."""
+
+    def __init__(self):
+        self.buckets = _empty_buckets()
+        self.source = None
+        self.version = TIME_WINDOWS_VERSION
+
+    def _scan(self, path, chunksize, cutoff):
+        """(rows before the cutoff hour, aggregates from it on)."""
+        closed = 0
+        fresh = []
+        for chunk in iter_table_chunks(path, chunksize, COLUMNS):
+            hours, dated = epoch_hours(chunk["created_at"])
+            if cutoff is not None:
+                closed += int((dated & (hours < cutoff)).sum())
+                dated &= hours >= cutoff
+            if not dated.any():
+                continue
+            ratings = parse_numbers(chunk["rating"]).values[dated]
+            fresh.append(pd.DataFrame({
+                "hour": hours[dated],
+                "recipe_id": chunk["recipe_id"].astype(object).fillna("").to_numpy()[dated],
+                "type": chunk["type"].astype(object).fillna("").to_numpy()[dated],
+                "interactions": np.ones(int(dated.sum()), dtype=np.int64),
+                "rating_sum": np.nan_to_num(ratings),
+                "rating_count": (~np.isnan(ratings)).astype(np.int64),
+            }).groupby(["hour", "recipe_id", "type"], sort=False).sum().reset_index())
+        return closed, _aggregate(fresh)
+
+    def update(self, path, chunksize=DEFAULT_CHUNKSIZE):
+        """Brings the aggregates up to date with the table at `path`.
+        Returns (hours aggregated again, hours in total)."""
+        source = os.path.abspath(path)
+        cutoff = int(self.buckets["hour"].max()) if len(self.buckets) and source == self.source else None
+        closed, fresh = self._scan(path, chunksize, cutoff)
+        if cutoff is not None:
+            kept = self.buckets[self.buckets["hour"] < cutoff]
+            if closed != int(kept["interactions"].sum()):
+                print("Rebuilding the time windows: interactions before the newest hour changed")
+                self.buckets, self.source = _empty_buckets(), None
+                return self.update(path, chunksize)
+            fresh = pd.concat([kept, fresh], ignore_index=True) if len(kept) else fresh
+        self.buckets = fresh
+        self.source = source
+        hours = self.buckets["hour"]
+        return int(hours[hours >= cutoff].nunique()) if cutoff is not None else hours.nunique(), hours.nunique()
+
+    # --- Persistence ---
+    # Plain attributes only, as in rollups.py
+    def save(self, path):
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump(vars(self), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + '.tmp', path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+        if state.get("version") != TIME_WINDOWS_VERSION:
+            raise StaleTimeWindowsError(f"{path} was saved by an older version of the time windows")
+        windows = cls()
+        vars(windows).update(state)
+        return windows
+
+# --- QUERIES ---
+def interaction_counts(windows, window="day", by=("recipe_id", "type")):
+    """Interactions per `window` bucket and `by` columns, as a DataFrame
+    with the bucket's UTC start time, sorted by start then keys."""
+    buckets = windows.buckets
+    keys = [window_buckets(buckets["hour"], window)] + [buckets[column].to_numpy() for column in by]
+    counts = buckets["interactions"].groupby(keys).sum()
+    counts.index.names = ["bucket", *by]
+    counts = counts.reset_index()
+    counts.insert(0, "start", bucket_starts(counts.pop("bucket"), window))
+    return counts
+
+def rolling_ratings(windows, window="day", periods=7):
+    """Per `window` bucket, from the first to the last one: ratings, their
+    mean and the mean over the last `periods` buckets (NaN without ratings)."""
+    buckets = windows.buckets
+    if not len(buckets):
+        return pd.DataFrame({"start": [], "ratings": [], "mean_rating": [], "rolling_mean_rating": []})
+    bucket = window_buckets(buckets["hour"], window)
+    sums = buckets[["rating_sum", "rating_count"]].groupby(bucket).sum()
+    sums = sums.reindex(np.arange(bucket.min(), bucket.max() + 1), fill_value=0)
+    rolling = sums.rolling(periods, min_periods=1).sum()
+    return pd.DataFrame({
+        "start": bucket_starts(sums.index, window),
+        "ratings": sums["rating_count"].to_numpy(),
+        "mean_rating": (sums["rating_sum"] / sums["rating_count"].replace(0, np.nan)).to_numpy(),
+        "rolling_mean_rating": (rolling["rating_sum"] / rolling["rating_count"].replace(0, np.nan)).to_numpy(),
+    })
+
+def trending(windows, window="hour", n=10, at=None):
+    """The `n` recipes whose interactions grew the most from the previous
+    `window` to the current one: the one holding `at` (a timestamp), or
+    the newest with interactions. Growth is (current - previous) /
+    max(previous, 1); ties go to the busier recipe, then by recipe_id."""
+    buckets = windows.buckets
+    if not len(buckets):
+        return []
+    bucket = window_buckets(buckets["hour"], window)
+    if at is None:
+        current = int(bucket.max())
+    else:
+        hours, dated = epoch_hours(pd.Series([at]))
+        if not dated[0]:
+            raise ValueError(f"Not a timestamp: {at!r}")
+        current = int(window_buckets(hours, window)[0])
+    recipe_ids = buckets["recipe_id"].to_numpy()
+    counts = pd.DataFrame({
+        "interactions": buckets["interactions"][bucket == current].groupby(recipe_ids[bucket == current]).sum(),
+        "previous": buckets["interactions"][bucket == current - 1].groupby(recipe_ids[bucket == current - 1]).sum(),
+    }).fillna(0).astype(np.int64)
+    counts = counts[counts["interactions"] > 0]
+    counts["growth"] = (counts["interactions"] - counts["previous"]) / counts["previous"].clip(lower=1)
+    counts = counts.rename_axis("recipe_id").reset_index()
+    top = counts.sort_values(["growth", "interactions", "recipe_id"], ascending=[False, False, True]).head(n)
+    return top.to_dict(orient="records")
+
+def window_summary(windows, window="hour", periods=24, n=10, at=None):
+    """JSON-ready summary: trending recipes, interactions per type and
+    rolling ratings over the last `periods` buckets of `window`."""
+    by_type = interaction_counts(windows, window, by=("type",))
+    width = pd.Timedelta(hours=WINDOW_HOURS[window][0])
+    recent = by_type[by_type["start"] > by_type["start"].max() - periods * width]
+    per_type = {}
+    for start, kind, count in zip(recent["start"], recent["type"], recent["interactions"]):
+        per_type.setdefault(start.isoformat(), {})[kind] = int(count)
+    ratings = rolling_ratings(windows, window, periods).tail(periods)
+    return {
+        "window": window,
+        "trending": trending(windows, window, n, at),
+        "interactions_by_type": per_type,
+        "rolling_ratings": [{"start": start.isoformat(), "ratings": int(count), "mean_rating": mean,
+                             "rolling_mean_rating": rolling}
+                            for start, count, mean, rolling in zip(ratings["start"], ratings["ratings"],
+                                                                    ratings["mean_rating"],
+                                                                    ratings["rolling_mean_rating"])],
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Update and query the time-windowed interaction metrics.")
+    parser.add_argument("--format", choices=sorted(FORMAT_EXTENSIONS), default="csv",
+                        help="Format of the ETL output tables to read (default: csv)")
+    parser.add_argument("--data-dir", default=str(PROJECT_ROOT / 'transform_data'),
+                        help="Folder holding the ETL output tables (default: transform_data/)")
+    parser.add_argument("--state", default=None,
+                        help=f"Saved hourly aggregates (default: <data-dir>/{TIME_WINDOWS_FILE})")
+    parser.add_argument("--window", choices=sorted(WINDOW_HOURS), default="hour",
+                        help="Window for trending recipes and the summary (default: hour)")
+    parser.add_argument("--periods", type=int, default=24,
+                        help="Buckets in the summary and the rolling rating (default: 24)")
+    parser.add_argument("--top", type=int, default=10, help="Trending recipes to list (default: 10)")
+    parser.add_argument("--at", default=None,
+                        help="ISO timestamp in the current window (default: the newest interaction)")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE,
+                        help=f"Rows read per chunk (default: {DEFAULT_CHUNKSIZE})")
+    parser.add_argument("--output", default="time_windows_summary.json",
+                        help="Where to write the summary (default: ./time_windows_summary.json)")
+    args = parser.parse_args()
+    if args.periods < 1:
+        parser.error("--periods must be at least 1")
+    state = args.state or os.path.join(args.data_dir, TIME_WINDOWS_FILE)
+    source = table_path("interactions", args.format, args.data_dir)
+    if not os.path.exists(source):
+        print(f"Error: Could not find {source}. Did you run the ETL pipeline?")
+        exit(1)
+
+    windows = TimeWindows()
+    if os.path.exists(state):
+        try:
+            windows = TimeWindows.load(state)
+        except StaleTimeWindowsError as error:
+            print(f"Rebuilding the time windows: {error}")
+    recomputed, total = windows.update(source, args.chunksize)
+    windows.save(state)
+    print(f"✔ Aggregated {recomputed} of {total} hourly buckets into {state}")
+
+    try:
+        summary = window_summary(windows, args.window, args.periods, args.top, args.at)
+    except ValueError as error:
+        parser.error(str(error))
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2)
+    print(f"Trending this {args.window}:")
+    for recipe in summary["trending"]:
+        print(f"  {recipe['recipe_id']}  {recipe['interactions']} (previous {recipe['previous']}, "
+              f"growth {recipe['growth']:+.0%})")
+    print(f"Summary saved to: {args.output}")
@@ -0,0 +1,85 @@
+"""Scaling benchmark for the "ingredients with high ratings" metric.
+
+Compares the old ingredient x interaction merge with analytics.ingredient_scores()
+(per-recipe rating sums and counts joined once) as the number of interactions
+per recipe grows. The join size of the naive approach is
+ingredients-per-recipe x interactions-per-recipe, so it is skipped once that
+would exceed --naive-max-rows.
+
+    python benchmarks/bench_ingredient_scores.py --recipes 2000 --interactions-per-recipe 10 100 1000
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from analytics.analytics import ingredient_scores, recipe_rating_stats
+
+def make_tables(recipes, ingredients_per_recipe, interactions_per_recipe, seed=0):
+    rng = np.random.default_rng(seed)
+    recipe_ids = np.array([f"r{i:08d}" for i in range(recipes)])
+    ingredients = pd.DataFrame({
+        "recipe_id": np.repeat(recipe_ids, ingredients_per_recipe),
+        "name": rng.choice([f"ingredient_{i}" for i in range(200)], recipes * ingredients_per_recipe),
+    })
+    interactions = pd.DataFrame({
+        "recipe_id": np.repeat(recipe_ids, interactions_per_recipe),
+        "rating": rng.integers(0, 6, recipes * interactions_per_recipe).astype(str),
+    })
+    return ingredients, interactions
+
+def naive_scores(ingredients, interactions):
+    """The original metric: merge every ingredient with every interaction."""
+    ing_ratings = ingredients.merge(interactions[['recipe_id', 'rating']], on='recipe_id', how='left')
+    ing_ratings['rating'] = pd.to_numeric(ing_ratings['rating'], errors='coerce')
+    return ing_ratings.groupby('name')['rating'].mean()
+
+def weighted_scores(ingredients, interactions):
+    return ingredient_scores(ingredients, recipe_rating_stats(interactions))
+
+def measure(fn, *args):
+    """Returns (result, seconds, peak traced MiB). Timing and memory are
+    measured in separate runs because tracemalloc slows pandas down."""
+    started = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    fn(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 2**20
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--recipes", type=int, default=2000)
+    parser.add_argument("--ingredients-per-recipe", type=int, default=9)
+    parser.add_argument("--interactions-per-recipe", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--naive-max-rows", type=int, default=50_000_000,
+                        help="Skip the naive merge when its join would exceed this many rows")
+    args = parser.parse_args()
+
+    print(f"{'inter/recipe':>12} {'join rows':>12} {'naive s':>9} {'naive MiB':>10} "
+          f"{'weighted s':>11} {'weighted MiB':>13} {'max |diff|':>11}")
+    for per_recipe in args.interactions_per_recipe:
+        ingredients, interactions = make_tables(args.recipes, args.ingredients_per_recipe, per_recipe)
+        join_rows = args.recipes * args.ingredients_per_recipe * per_recipe
+        weighted, w_time, w_mem = measure(weighted_scores, ingredients, interactions)
+        if join_rows <= args.naive_max_rows:
+            naive, n_time, n_mem = measure(naive_scores, ingredients, interactions)
+            diff = f"{(naive - weighted).abs().max():.2e}"
+            naive_cols = f"{n_time:>9.3f} {n_mem:>10.1f}"
+        else:
+            diff = "-"
+            naive_cols = f"{'skipped':>9} {'-':>10}"
+        print(f"{per_recipe:>12} {join_rows:>12} {naive_cols} {w_time:>11.3f} {w_mem:>13.1f} {diff:>11}")
+
+if __name__ == "__main__":
+    main()
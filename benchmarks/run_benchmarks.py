@@ -0,0 +1,336 @@
+"""Benchmark suite for every pipeline stage.
+
+Times and memory-profiles each stage at several dataset scales and writes the
+results as JSON. A scale is the number of interaction rows; each recipe gets
+5 interactions plus the usual 6-12 ingredients and 4-9 steps.
+
+    etl        run_etl_process() against a FakeFirestore (rows = documents read)
+    validate   load_frames() + validate_frames() + report
+    analytics  read_table() + every InsightEngine metric + save_outputs()
+    charts     generate_charts()
+    pipeline   run_pipeline() against a FakeFirestore, tables handed over in
+               memory (rows = documents read)
+
+Every (stage, scale) runs in a fresh subprocess, so peak RSS is that of the
+stage alone. Datasets are generated once per scale and seed with
+generate_tables.py and reused from benchmarks/data/.
+
+    python benchmarks/run_benchmarks.py --scale 1k --scale 100k --output results.json
+    python benchmarks/run_benchmarks.py --scale 100k --baseline results.json
+    python benchmarks/run_benchmarks.py --compare old.json new.json
+"""
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+SCALES = {"1k": 1_000, "100k": 100_000, "10m": 10_000_000}
+STAGES = ("etl", "validate", "analytics", "charts", "pipeline")
+# Stages that extract from a FakeFirestore instead of reading generated tables
+FAKE_STAGES = ("etl", "pipeline")
+INTERACTIONS_PER_RECIPE = 5
+DATA_DIR = PROJECT_ROOT / 'benchmarks' / 'data'
+TABLE_NAMES = ("recipes", "ingredients", "steps", "interactions")
+
+# --- MEMORY ---
+def peak_rss_mb(who="self"):
+    """Peak resident set size of this process (or its largest child) in MiB,
+    or None where the platform does not report it."""
+    try:
+        import resource
+    except ImportError:
+        if who != "self":
+            return None
+        try:
+            import psutil
+            return psutil.Process().memory_info().peak_wset / 2**20
+        except (ImportError, AttributeError):
+            return None
+    target = resource.RUSAGE_SELF if who == "self" else resource.RUSAGE_CHILDREN
+    peak = resource.getrusage(target).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+# --- DATASETS ---
+def dataset_dir(scale, seed):
+    """Generates (once) the tables for a scale and returns their folder."""
+    from Firebase_Setup.generate_tables import generate_tables
+
+    folder = DATA_DIR / f"{scale}-seed{seed}"
+    marker = folder / 'rows.json'
+    if not marker.exists():
+        interactions = SCALES[scale]
+        recipes = max(interactions // INTERACTIONS_PER_RECIPE, 1)
+        print(f"Generating {scale} dataset ({recipes} recipes, {interactions} interactions)...")
+        with contextlib.redirect_stdout(io.StringIO()):
+            rows = generate_tables(str(folder), recipes, interactions, seed, formats=("csv",))
+        marker.write_text(json.dumps(rows))
+    return folder
+
+# --- STAGES ---
+# Each stage runs inside the worker process and returns (rows, breakdown).
+def timed(breakdown, phase, fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    breakdown[phase] = time.perf_counter() - started
+    return result
+
+def _fake_client(options, breakdown):
+    from Firebase_Setup.firestore_client import FakeFirestore
+    from Firebase_Setup.genrate_sytetic import iter_documents, write_documents
+    import random
+
+    random.seed(options["seed"])
+    client = FakeFirestore(seed=options["seed"])
+    interactions = SCALES[options["scale"]]
+    recipes = max(interactions // INTERACTIONS_PER_RECIPE, 1)
+    timed(breakdown, "setup_fake", write_documents, client, iter_documents(client, recipes, interactions))
+    client.latency = options["latency"]
+    return client
+
+def stage_etl(data_dir, options):
+    from transform_data.transform import run_etl_process
+
+    breakdown = {}
+    client = _fake_client(options, breakdown)
+    stats = timed(breakdown, "export", run_etl_process, client, options["concurrency"], options["interaction_mode"])
+    breakdown["extract"] = stats["seconds"]
+    return stats["recipes"] + stats["interactions"], breakdown
+
+def stage_pipeline(data_dir, options):
+    from pipeline.run_pipeline import run_pipeline
+
+    breakdown = {}
+    client = _fake_client(options, breakdown)
+    result = run_pipeline(client, "pipeline_output", concurrency=options["concurrency"],
+                          interaction_mode=options["interaction_mode"], chart_workers=options["chart_workers"],
+                          scatter_mode=options["scatter"])
+    breakdown.update(result["seconds"])
+    with open(os.path.join("pipeline_output", "etl_metrics.json"), encoding='utf-8') as f:
+        documents = json.load(f)["counters"]["documents_read"]
+    return sum(series["value"] for series in documents), breakdown
+
+def stage_validate(data_dir, options):
+    from data_validation import validator
+
+    breakdown = {}
+    frames = timed(breakdown, "load", validator.load_frames, "csv", data_dir)
+    result = timed(breakdown, "validate", validator.validate_frames, frames["recipes"], frames["ingredients"],
+                   frames["steps"], frames["interactions"])
+    invalid_records, valid_records, total = result
+
+    def write_report():
+        with open("validation_report.json", "w", encoding='utf-8') as f:
+            json.dump({"invalid_records": invalid_records, "valid_records": valid_records}, f, indent=2)
+    timed(breakdown, "report", write_report)
+    return sum(len(frame) for frame in frames.values()), breakdown
+
+def _load_engine(data_dir, breakdown):
+    from analytics.analytics import InsightEngine
+    from transform_data.tables import read_table, table_path
+
+    def load():
+        return [read_table(table_path(name, "csv", str(data_dir))) for name in TABLE_NAMES]
+    tables = timed(breakdown, "load", load)
+    return InsightEngine(*tables), sum(len(table) for table in tables)
+
+def stage_analytics(data_dir, options):
+    from analytics.analytics import METRIC_NAMES, save_outputs
+
+    breakdown = {}
+    engine, rows = _load_engine(data_dir, breakdown)
+    out = {}
+    metrics = {}
+    for name in METRIC_NAMES:
+        out[name] = timed(metrics, name, engine.metric, name)
+    breakdown["metrics"] = metrics
+    breakdown["compute"] = sum(metrics.values())
+    timed(breakdown, "save", save_outputs, out)
+    return rows, breakdown
+
+def stage_charts(data_dir, options):
+    from analytics.analytics import CHARTS, generate_charts
+
+    breakdown = {}
+    engine, rows = _load_engine(data_dir, breakdown)
+    timed(breakdown, "render", generate_charts, engine, "charts", tuple(CHARTS),
+          options["chart_workers"], options["scatter"])
+    return rows, breakdown
+
+STAGE_FUNCTIONS = {"etl": stage_etl, "validate": stage_validate, "analytics": stage_analytics,
+                   "charts": stage_charts, "pipeline": stage_pipeline}
+# Imported before the clock starts, so import time and memory are not charged to the stage
+STAGE_MODULES = {
+    "etl": ("Firebase_Setup.genrate_sytetic", "transform_data.transform"),
+    "validate": ("data_validation.validator",),
+    "analytics": ("analytics.analytics",),
+    "charts": ("analytics.analytics", "matplotlib.backends.backend_agg"),
+    "pipeline": ("Firebase_Setup.genrate_sytetic", "pipeline.run_pipeline"),
+}
+
+def run_worker(spec):
+    """Runs one stage in this (fresh) process and prints its result as JSON."""
+    data_dir = Path(spec["data_dir"])
+    for module in STAGE_MODULES[spec["stage"]]:
+        importlib.import_module(module)
+    baseline_rss = peak_rss_mb()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        started = time.perf_counter()
+        # Stage output (progress lines, summaries) is not part of the result
+        with contextlib.redirect_stdout(io.StringIO()):
+            rows, breakdown = STAGE_FUNCTIONS[spec["stage"]](data_dir, spec)
+        seconds = time.perf_counter() - started
+    if spec["stage"] in FAKE_STAGES:
+        # Loading the fake is setup, not pipeline work
+        seconds -= breakdown["setup_fake"]
+    print(json.dumps({
+        "stage": spec["stage"],
+        "scale": spec["scale"],
+        "rows": rows,
+        "seconds": seconds,
+        "rows_per_sec": rows / seconds if seconds > 0 else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "import_rss_mb": baseline_rss,
+        "peak_child_rss_mb": peak_rss_mb("children"),
+        "breakdown": breakdown,
+    }))
+
+def run_stage(stage, scale, options):
+    spec = dict(options, stage=stage, scale=scale)
+    spec["data_dir"] = str(dataset_dir(scale, options["seed"])) if stage not in FAKE_STAGES else ""
+    completed = subprocess.run([sys.executable, __file__, "--worker", json.dumps(spec)],
+                               capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"{stage}@{scale} failed:\n{completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+# --- RESULTS ---
+def environment():
+    import numpy
+    import pandas
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": numpy.__version__,
+        "pandas": pandas.__version__,
+    }
+
+def compare(baseline, current, threshold):
+    """Prints current vs baseline per (stage, scale) and returns the list of
+    regressions: time or peak RSS more than `threshold` (fraction) worse."""
+    def index(results):
+        return {(result["stage"], result["scale"]): result for result in results["results"]}
+
+    old, new = index(baseline), index(current)
+    regressions = []
+    print(f"{'stage':<10} {'scale':>6} {'base s':>9} {'now s':>9} {'Δ time':>8} "
+          f"{'base MiB':>9} {'now MiB':>9} {'Δ RSS':>7}")
+    for key in sorted(new.keys() & old.keys()):
+        was, now = old[key], new[key]
+        flags = []
+        time_change = now["seconds"] / was["seconds"] - 1 if was["seconds"] else 0.0
+        if time_change > threshold:
+            flags.append("time")
+        rss_change = 0.0
+        if was.get("peak_rss_mb") and now.get("peak_rss_mb"):
+            rss_change = now["peak_rss_mb"] / was["peak_rss_mb"] - 1
+            if rss_change > threshold:
+                flags.append("memory")
+        if flags:
+            regressions.append({"stage": key[0], "scale": key[1], "regressed": flags,
+                                "time_change": time_change, "rss_change": rss_change})
+        print(f"{key[0]:<10} {key[1]:>6} {was['seconds']:>9.3f} {now['seconds']:>9.3f} {time_change:>+8.1%} "
+              f"{was.get('peak_rss_mb') or 0:>9.1f} {now.get('peak_rss_mb') or 0:>9.1f} {rss_change:>+7.1%}"
+              f"{'  REGRESSION (' + ', '.join(flags) + ')' if flags else ''}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", action="append", choices=sorted(SCALES), dest="scales",
+                        help="Dataset scale; repeat for several (default: 1k and 100k)")
+    parser.add_argument("--stage", action="append", choices=STAGES, dest="stages",
+                        help="Stage to run; repeat for several (default: all)")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per stage; the fastest is kept")
+    parser.add_argument("--seed", type=int, default=0, help="Dataset seed (default: 0)")
+    parser.add_argument("--etl-max-rows", type=int, default=100_000,
+                        help="Skip the etl and pipeline stages above this many interactions (the fake lives in memory)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Fake Firestore latency per round trip")
+    parser.add_argument("--concurrency", type=int, default=1, help="ETL interaction read concurrency")
+    parser.add_argument("--interactions", choices=("per-recipe", "collection-group"), default="per-recipe",
+                        dest="interaction_mode", help="ETL interaction extraction mode")
+    parser.add_argument("--chart-workers", type=int, default=None, help="Chart rendering processes")
+    parser.add_argument("--scatter", default="auto", help="Scatter chart mode")
+    parser.add_argument("--output", default=None, help="Write results JSON here")
+    parser.add_argument("--baseline", default=None, help="Compare against this results JSON")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Relative slowdown / memory growth flagged as a regression (default: 0.10)")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"),
+                        help="Only compare two existing results files")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(json.loads(args.worker))
+        return
+    if args.compare:
+        with open(args.compare[0], encoding='utf-8') as f:
+            baseline = json.load(f)
+        with open(args.compare[1], encoding='utf-8') as f:
+            current = json.load(f)
+        sys.exit(1 if compare(baseline, current, args.threshold) else 0)
+
+    options = {"seed": args.seed, "latency": args.latency, "concurrency": args.concurrency,
+               "interaction_mode": args.interaction_mode, "chart_workers": args.chart_workers,
+               "scatter": args.scatter}
+    results = []
+    for scale in args.scales or ["1k", "100k"]:
+        for stage in args.stages or STAGES:
+            if stage in FAKE_STAGES and SCALES[scale] > args.etl_max_rows:
+                print(f"{stage:<10} {scale:>6}  skipped (--etl-max-rows {args.etl_max_rows})")
+                continue
+            runs = [run_stage(stage, scale, options) for _ in range(max(args.repeat, 1))]
+            best = min(runs, key=lambda run: run["seconds"])
+            best["samples"] = [run["seconds"] for run in runs]
+            results.append(best)
+            rate = f"{best['rows_per_sec']:,.0f} rows/s" if best["rows_per_sec"] else "-"
+            rss = f"{best['peak_rss_mb']:.0f} MiB" if best["peak_rss_mb"] else "-"
+            print(f"{stage:<10} {scale:>6} {best['seconds']:>9.3f}s {rate:>18} {rss:>10}")
+
+    report = {"environment": environment(), "options": options, "results": results}
+    if args.output:
+        with open(args.output, "w", encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results saved to: {args.output}")
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, report, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Compact validity mask of the recipes table, written by the validator.
+
+Bit i is set when row i of the recipes table belongs to a recipe that passed
+validation. The bits are packed (one bit per row) into an .npz file next to
+validation_report.json, together with the row count and a digest of the
+recipe_id column, so a mask is never applied to a different table.
+"""
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+MASK_FILE = "valid_mask.npz"
+
+def recipe_ids_digest(chunks):
+    """SHA-256 over the per-row hashes of the recipe_id values, fed as one or
+    more Series (the digest does not depend on how the column is chunked)."""
+    digest = hashlib.sha256()
+    for recipe_ids in chunks:
+        values = pd.Series(np.asarray(recipe_ids, dtype=object))
+        digest.update(pd.util.hash_pandas_object(values, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+def valid_row_mask(recipe_ids, valid_ids):
+    """Boolean array: which rows of the recipes table have a valid recipe_id."""
+    return pd.Series(recipe_ids).isin(valid_ids).to_numpy()
+
+def save_valid_mask(path, mask, recipe_ids):
+    np.savez_compressed(path, bits=np.packbits(mask), rows=len(mask),
+                        digest=recipe_ids_digest([recipe_ids]))
+
+class StaleMaskError(ValueError):
+    """The mask was computed for a different recipes table."""
+
+def load_valid_mask(path, digest=None):
+    """Unpacks a mask saved by save_valid_mask(). When `digest` (see
+    recipe_ids_digest()) is given, raises StaleMaskError unless the mask was
+    built from the same recipe_id column."""
+    with np.load(path) as saved:
+        rows = int(saved["rows"])
+        if digest is not None and str(saved["digest"]) != digest:
+            raise StaleMaskError(f"{path} does not match the recipes table; re-run the validator")
+        return np.unpackbits(saved["bits"], count=rows).astype(bool)
@@ -1,58 +1,68 @@
-import csv
+import argparse
+import heapq
 import json
+import os
 import re
+import sys
+import time
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from operator import itemgetter
+from pathlib import Path
+
+# Make the project root importable when run as a script from this folder
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import numpy as np
+import pandas as pd
+
+from data_validation.valid_mask import MASK_FILE, save_valid_mask, valid_row_mask
+from pipeline.metrics import Metrics, add_metrics_arguments
+from pipeline.typed_ingest import parse_number, parse_numbers
+from transform_data.durations import parse_duration, step_minutes
+from transform_data.recipe_index import StaleIndexError, lookup_recipe, open_indexes
+from transform_data.tables import (
+    FORMAT_EXTENSIONS, file_columns, intern_categories, iter_records, read_table_text, table_path,
+)
 
 # --- CONFIGURATION ---
-# Files are located in the 'transform_data' folder
-FILES = {
-    "recipes": ".\\transform_data\\recipes.csv",
-    "ingredients": ".\\transform_data\\ingredients.csv",
-    "steps": ".\\transform_data\\steps.csv",
-    "interactions": ".\\transform_data\\interactions.csv"
-}
+# Tables are read from the 'transform_data' folder unless a data_dir is given
+DATA_DIR = PROJECT_ROOT / 'transform_data'
 
 VALID_DIFFICULTY = {"Easy", "Medium", "Hard", "Expert"}
 NUMBER_REGEX = re.compile(r'^\d+(\.\d+)?$')
 
+def table_file(name, fmt="csv", data_dir=None):
+    """Path of a table in the given format, in data_dir (default DATA_DIR)."""
+    return table_path(name, fmt, str(data_dir or DATA_DIR))
+
 def load_csv_to_dict(filepath, key_field):
-    """Loads CSV into a dictionary keyed by key_field."""
+    """Loads a table file (CSV, parquet or feather) into a dictionary keyed by key_field."""
     data = {}
     try:
-        with open(filepath, encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                data[row[key_field]] = row
+        for row in iter_records(filepath):
+            data[row[key_field]] = intern_categories(row)
     except FileNotFoundError:
         print(f"Warning: File not found: {filepath}")
     return data
 
 def load_csv_to_grouped_dict(filepath, key_field):
-    """Loads CSV into a dictionary of lists, grouped by key_field."""
+    """Loads a table file into a dictionary of lists, grouped by key_field."""
     data = defaultdict(list)
     try:
-        with open(filepath, encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                data[row[key_field]].append(row)
+        for row in iter_records(filepath):
+            data[row[key_field]].append(intern_categories(row))
     except FileNotFoundError:
         print(f"Warning: File not found: {filepath}")
     return data
 
-def parse_float(value):
-    """Safely parses a float string."""
-    if not value or value.strip() == "":
-        return None
-    try:
-        return float(value)
-    except ValueError:
-        return None
-
 def validate_time_integrity(rec, errors):
     """Validates prep, cook, and total time logic."""
-    prep = parse_float(rec.get("prep_time_min"))
-    cook = parse_float(rec.get("cook_time_min"))
-    total = parse_float(rec.get("total_time_min"))
+    prep = parse_number(rec.get("prep_time_min"))
+    cook = parse_number(rec.get("cook_time_min"))
+    total = parse_number(rec.get("total_time_min"))
 
     if prep is not None and prep <= 0:
         errors.append(f"PrepTime must be > 0 (Got: {prep})")
@@ -82,82 +92,441 @@ def validate_interactions(interactions_list, errors):
     for inter in interactions_list:
         rstr = inter.get("rating")
         if rstr:
-            val = parse_float(rstr)
+            val = parse_number(rstr)
             if val is None:
                 errors.append(f"Rating '{rstr}' is not numeric")
             elif not (0 <= val <= 5):
                 errors.append(f"Rating '{val}' out of range (0-5)")
 
-def validate_recipes():
-    print(f"Starting Data Validation...")
+def validate_step_durations(steps_list, errors):
+    """Durations must parse (see transform_data/durations.py) and a range
+    must not run backwards. Uses the parsed minutes the ETL stored."""
+    for step in steps_list:
+        text = step.get("duration") or ""
+        if "duration_min" in step:
+            low, high = parse_number(step["duration_min"]), parse_number(step.get("duration_max_min"))
+        else:
+            # Tables written before the parsed columns existed
+            low, high = parse_duration(text)
+        if text.strip() and low is None:
+            errors.append(f"Step {step.get('step_number')} has unparseable duration: '{text}'")
+        elif low is not None and high is not None and low > high:
+            errors.append(f"Step {step.get('step_number')} duration range is reversed: '{text}'")
 
-    # 1. Load Data
-    print("Loading CSV files from 'transform_data' folder...")
-    recipes = load_csv_to_dict(FILES["recipes"], 'recipe_id')
-    ingredients = load_csv_to_grouped_dict(FILES["ingredients"], 'recipe_id')
-    steps = load_csv_to_grouped_dict(FILES["steps"], 'recipe_id')
-    interactions = load_csv_to_grouped_dict(FILES["interactions"], 'recipe_id')
+def validate_record(rid, rec, ingredients_list, steps_list, interactions_list):
+    """Runs every rule against one recipe and its child rows; returns the error list."""
+    errors = []
 
-    report = {
-        "summary": {
-            "total_recipes": len(recipes),
-            "valid_recipes": 0,
-            "invalid_recipes": 0,
-            "missing_files": []
-        },
-        "invalid_records": [],
-        "valid_records": []
-    }
+    # A. Basic Field Checks
+    if not rec.get("title"):
+        errors.append("Missing Title")
 
-    # Check if main data exists
-    if not recipes:
-        print(f"❌ Error: No recipe data found. Exiting.")
-        return
+    difficulty = rec.get("difficulty", "").strip()
+    if difficulty and difficulty not in VALID_DIFFICULTY:
+        errors.append(f"Invalid difficulty: '{difficulty}'")
+
+    # B. Logic Checks
+    validate_time_integrity(rec, errors)
+    validate_ingredients(rid, ingredients_list, errors)
+    validate_interactions(interactions_list, errors)
+
+    # C. Structure Checks
+    if not steps_list:
+        errors.append("No steps linked to this recipe")
+    else:
+        validate_step_durations(steps_list, errors)
+    return errors
+
+# --- COLUMNAR ENGINE ---
+# The same rules as validate_record(), evaluated as whole-column operations.
+# Each rule yields (recipe position, rule rank, row order, message) rows that
+# are sorted back into the exact per-recipe error order of the row engine.
+RULE_TITLE, RULE_DIFFICULTY, RULE_PREP, RULE_COOK, RULE_TOTAL, \
+    RULE_INGREDIENTS, RULE_INTERACTIONS, RULE_STEPS, RULE_STEP_DURATION = range(9)
+
+# Columns each engine needs from every table
+VALIDATION_COLUMNS = {
+    "recipes": ["recipe_id", "title", "difficulty", "prep_time_min", "cook_time_min", "total_time_min"],
+    "ingredients": ["recipe_id", "name", "quantity"],
+    "steps": ["recipe_id", "step_number", "duration", "duration_min", "duration_max_min"],
+    "interactions": ["recipe_id", "rating"],
+}
+
+def parse_float_column(values):
+    """parse_number() over a whole column (see pipeline/typed_ingest.py).
+    Returns (floats, present) where `present` is False wherever
+    parse_number() would have returned None."""
+    typed = parse_numbers(values)
+    return typed.values, typed.valid
+
+# Rule an error message was raised by, from its prefix (same for both engines)
+ERROR_RULES = (
+    ("Missing Title", "title"),
+    ("Invalid difficulty", "difficulty"),
+    ("PrepTime", "prep_time"),
+    ("CookTime", "cook_time"),
+    ("TotalTime", "total_time"),
+    ("No ingredients", "ingredients"),
+    ("Ingredient ", "ingredients"),
+    ("Rating ", "interactions"),
+    ("No steps", "steps"),
+    ("Step ", "step_duration"),
+)
+
+def error_rule(message):
+    for prefix, rule in ERROR_RULES:
+        if message.startswith(prefix):
+            return rule
+    return "other"
+
+def _text(value):
+    # A numeric cell as the row engine sees it ("" when missing)
+    return "" if pd.isna(value) else value
+
+def _rule_errors(positions, rule, order, messages):
+    return pd.DataFrame({"pos": positions, "rule": rule, "order": order, "message": messages})
+
+def validate_frames(recipes, ingredients, steps, interactions):
+    """Validates the four tables (DataFrames of strings, "" for missing values;
+    the time columns may also be numeric, as load_frames() reads them from
+    parquet/feather).
+
+    Returns (invalid_records, valid_records, total_recipes) exactly as the row
+    engine builds them: recipes keep their first-seen order and a repeated
+    recipe_id keeps its last row.
+    """
+    first_seen = recipes.drop_duplicates("recipe_id", keep="first")["recipe_id"]
+    order = pd.Index(first_seen)
+    recs = recipes.drop_duplicates("recipe_id", keep="last").set_index("recipe_id").reindex(order)
+    positions = np.arange(len(order))
+    found = []
+
+    # A. Basic Field Checks
+    missing_title = (recs["title"] == "").to_numpy()
+    found.append(_rule_errors(positions[missing_title], RULE_TITLE, 0, "Missing Title"))
+
+    difficulty = recs["difficulty"]
+    if isinstance(difficulty.dtype, pd.CategoricalDtype):
+        # Check each distinct value once, then test the integer codes
+        categories = difficulty.cat.categories.str.strip()
+        bad_codes = np.flatnonzero((categories != "") & ~categories.isin(VALID_DIFFICULTY))
+        codes = difficulty.cat.codes.to_numpy()
+        bad = np.isin(codes, bad_codes)
+        stripped = categories.to_numpy()[codes[bad]]
+    else:
+        difficulty = difficulty.str.strip()
+        bad = ((difficulty != "") & ~difficulty.isin(VALID_DIFFICULTY)).to_numpy()
+        stripped = difficulty[bad]
+    found.append(_rule_errors(positions[bad], RULE_DIFFICULTY, 0,
+                              [f"Invalid difficulty: '{d}'" for d in stripped]))
+
+    # B. Time integrity
+    prep, has_prep = parse_float_column(recs["prep_time_min"])
+    cook, has_cook = parse_float_column(recs["cook_time_min"])
+    total, has_total = parse_float_column(recs["total_time_min"])
+
+    bad = has_prep & (prep <= 0)
+    found.append(_rule_errors(positions[bad], RULE_PREP, 0,
+                              [f"PrepTime must be > 0 (Got: {float(v)})" for v in prep[bad]]))
+    bad = has_cook & (cook < 0)
+    found.append(_rule_errors(positions[bad], RULE_COOK, 0,
+                              [f"CookTime must be >= 0 (Got: {float(v)})" for v in cook[bad]]))
+    found.append(_rule_errors(positions[~has_total], RULE_TOTAL, 0, "TotalTime missing"))
+    # Allow a small floating point margin
+    bad = has_total & has_prep & has_cook & (total < (prep + cook) - 0.1)
+    found.append(_rule_errors(positions[bad], RULE_TOTAL, 0, [
+        f"TotalTime ({float(t)}) < Prep ({float(p)}) + Cook ({float(c)})"
+        for t, p, c in zip(total[bad], prep[bad], cook[bad])]))
 
-    # 2. Validation Loop
+    # C. Ingredients: presence and quantity > 0 (only for plain numbers)
+    ing_pos = order.get_indexer(ingredients["recipe_id"])
+    linked = ing_pos >= 0
+    has_ingredients = np.zeros(len(order), dtype=bool)
+    has_ingredients[ing_pos[linked]] = True
+    found.append(_rule_errors(positions[~has_ingredients], RULE_INGREDIENTS, -1,
+                              "No ingredients linked to this recipe"))
+
+    quantity = ingredients["quantity"]
+    qty, has_qty = parse_float_column(quantity)
+    candidates = linked & has_qty & (qty <= 0)
+    if candidates.any():
+        candidates[candidates] = quantity[candidates].str.strip().map(
+            lambda text: NUMBER_REGEX.match(text) is not None).to_numpy(dtype=bool)
+    rows = np.flatnonzero(candidates)
+    found.append(_rule_errors(ing_pos[rows], RULE_INGREDIENTS, rows, [
+        f"Ingredient '{name}' has invalid quantity: {q}"
+        for name, q in zip(ingredients["name"].to_numpy()[rows], quantity.to_numpy()[rows])]))
+
+    # D. Interactions: rating must be numeric and within 0-5
+    int_pos = order.get_indexer(interactions["recipe_id"])
+    rating_text = interactions["rating"]
+    rating, has_rating = parse_float_column(rating_text)
+    rated = (int_pos >= 0) & (rating_text != "").to_numpy()
+    rows = np.flatnonzero(rated & ~has_rating)
+    found.append(_rule_errors(int_pos[rows], RULE_INTERACTIONS, rows,
+                              [f"Rating '{r}' is not numeric" for r in rating_text.to_numpy()[rows]]))
+    rows = np.flatnonzero(rated & has_rating & ~((rating >= 0) & (rating <= 5)))
+    found.append(_rule_errors(int_pos[rows], RULE_INTERACTIONS, rows,
+                              [f"Rating '{float(v)}' out of range (0-5)" for v in rating[rows]]))
+
+    # E. Structure Checks
+    step_pos = order.get_indexer(steps["recipe_id"])
+    has_steps = np.zeros(len(order), dtype=bool)
+    has_steps[step_pos[step_pos >= 0]] = True
+    found.append(_rule_errors(positions[~has_steps], RULE_STEPS, 0, "No steps linked to this recipe"))
+
+    # F. Step durations, from the minutes the ETL parsed
+    low, high = step_minutes(steps)
+    duration, numbers = steps["duration"], steps["step_number"]
+    described = (step_pos >= 0) & (duration.astype(str).str.strip() != "").to_numpy()
+    rows = np.flatnonzero(described & np.isnan(low))
+    found.append(_rule_errors(step_pos[rows], RULE_STEP_DURATION, rows, [
+        f"Step {_text(numbers.iat[row])} has unparseable duration: '{duration.iat[row]}'" for row in rows]))
+    rows = np.flatnonzero((step_pos >= 0) & (low > high))
+    found.append(_rule_errors(step_pos[rows], RULE_STEP_DURATION, rows, [
+        f"Step {_text(numbers.iat[row])} duration range is reversed: '{duration.iat[row]}'" for row in rows]))
+
+    # G. Collect errors per recipe in rule order
+    found = [frame for frame in found if len(frame)]
+    errors = pd.concat(found, ignore_index=True) if found else _rule_errors([], 0, 0, [])
+    errors = errors.sort_values(["pos", "rule", "order"], kind="stable")
+    error_pos = errors["pos"].to_numpy(dtype=np.int64)
+    messages = errors["message"].tolist()
+    starts = np.flatnonzero(np.diff(error_pos, prepend=-1))
+    ends = np.append(starts[1:], len(error_pos))
+
+    ids = order.to_numpy()
+    titles = recs["title"].to_numpy()
+    invalid_records = [
+        {"recipe_id": ids[error_pos[start]], "title": titles[error_pos[start]],
+         "errors": messages[start:end]}
+        for start, end in zip(starts, ends)
+    ]
+    invalid = np.zeros(len(order), dtype=bool)
+    invalid[error_pos] = True
+    valid_records = ids[~invalid].tolist()
+    return invalid_records, valid_records, len(order)
+
+def validate_rows(recipes, ingredients, steps, interactions):
+    """Row-by-row reference engine over the dicts built by the load_* helpers."""
+    invalid_records, valid_records = [], []
     for rid, rec in recipes.items():
-        errors = []
-
-        # A. Basic Field Checks
-        if not rec.get("title"):
-            errors.append("Missing Title")
-        
-        difficulty = rec.get("difficulty", "").strip()
-        if difficulty and difficulty not in VALID_DIFFICULTY:
-            errors.append(f"Invalid difficulty: '{difficulty}'")
-
-        # B. Logic Checks
-        validate_time_integrity(rec, errors)
-        validate_ingredients(rid, ingredients.get(rid, []), errors)
-        validate_interactions(interactions.get(rid, []), errors)
-
-        # C. Structure Checks
-        if not steps.get(rid):
-            errors.append("No steps linked to this recipe")
-
-        # D. Record Result
+        errors = validate_record(rid, rec, ingredients.get(rid, []), steps.get(rid),
+                                 interactions.get(rid, []))
         if errors:
-            report["invalid_records"].append({
+            invalid_records.append({
                 "recipe_id": rid,
                 "title": rec.get("title", "Unknown"),
                 "errors": errors
             })
         else:
-            report["valid_records"].append(rid)
+            valid_records.append(rid)
+    return invalid_records, valid_records, len(recipes)
+
+# --- PARALLEL (SHARDED) VALIDATION ---
+def shard_frames(frames, shards):
+    """Hash-partitions every table by recipe_id, so a recipe and all of its
+    child rows land in the same shard. Row order (and index) is preserved."""
+    parts = [{} for _ in range(shards)]
+    for name, frame in frames.items():
+        shard_ids = pd.util.hash_pandas_object(frame["recipe_id"], index=False).to_numpy() % shards
+        for shard, part in frame.groupby(shard_ids, sort=False):
+            parts[shard][name] = part
+        for part in parts:
+            part.setdefault(name, frame.iloc[0:0])
+    return parts
+
+def _validate_shard(frames):
+    """Process-pool worker: validates one shard and tags each result with the
+    recipe's first row number, so shards can be merged back in file order."""
+    invalid_records, valid_records, total = validate_frames(
+        frames["recipes"], frames["ingredients"], frames["steps"], frames["interactions"])
+    first = frames["recipes"].drop_duplicates("recipe_id", keep="first")
+    row_of = dict(zip(first["recipe_id"], first.index))
+    return ([(row_of[record["recipe_id"]], record) for record in invalid_records],
+            [(row_of[rid], rid) for rid in valid_records],
+            total)
+
+def validate_sharded(frames, workers):
+    """Validates `workers` hash shards in a process pool and merges the
+    per-shard results into the same output validate_frames() would give."""
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_validate_shard, shard_frames(frames, workers)))
+    by_row = itemgetter(0)
+    invalid_records = [record for _, record in heapq.merge(*(r[0] for r in results), key=by_row)]
+    valid_records = [rid for _, rid in heapq.merge(*(r[1] for r in results), key=by_row)]
+    return invalid_records, valid_records, sum(r[2] for r in results)
+
+ENGINES = ("columnar", "python")
+
+def _load_frame(name, fmt, data_dir=None):
+    path = table_file(name, fmt, data_dir)
+    needed = VALIDATION_COLUMNS[name]
+    try:
+        # Tables written before a column was added are read without it
+        stored = set(file_columns(path))
+        return read_table_text(path, [column for column in needed if column in stored], typed=True)
+    except FileNotFoundError:
+        print(f"Warning: File not found: {path}")
+        return pd.DataFrame({column: pd.Series(dtype=str) for column in needed})
+
+def load_frames(fmt="csv", data_dir=None):
+    """Loads the columns the validator needs from each table as string
+    DataFrames (parquet/feather integer columns stay numbers, so they are not
+    formatted and parsed back), reading the four files concurrently."""
+    with ThreadPoolExecutor(max_workers=len(VALIDATION_COLUMNS)) as pool:
+        futures = {name: pool.submit(_load_frame, name, fmt, data_dir) for name in VALIDATION_COLUMNS}
+    return {name: future.result() for name, future in futures.items()}
+
+def validate_recipes(fmt="csv", engine="columnar", workers=1, metrics=None, data_dir=None,
+                     frames=None, output_path="validation_report.json", mask_path=MASK_FILE):
+    """Validates the ETL output and writes the report to `output_path`, and
+    the valid-row bitmap of the recipes table to `mask_path` (see
+    valid_mask.py; None to skip it).
+
+    workers > 1 splits the columnar engine across that many processes
+    (hash-sharded by recipe_id); 0 uses every CPU core. Load/validate/report
+    timings, rows loaded and errors per rule are recorded into `metrics`.
+    Tables are read from `data_dir` (default DATA_DIR), unless `frames`
+    already holds them as string DataFrames (see load_frames()), in which
+    case nothing is read and the columnar engine is used.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine: {engine!r}")
+    workers = workers or os.cpu_count() or 1
+    metrics = metrics or Metrics("validate")
+    print(f"Starting Data Validation...")
+
+    # 1. Load Data
+    started = time.perf_counter()
+    if frames is not None:
+        engine = "columnar"
+    elif engine == "columnar":
+        print(f"Loading {fmt} files from {data_dir or DATA_DIR}...")
+        frames = load_frames(fmt, data_dir)
+    if engine == "columnar":
+        loaded = len(frames["recipes"])
+        for name, frame in frames.items():
+            metrics.inc("rows_loaded", len(frame), table=name)
+    else:
+        print(f"Loading {fmt} files from {data_dir or DATA_DIR}...")
+        recipes = load_csv_to_dict(table_file("recipes", fmt, data_dir), 'recipe_id')
+        ingredients = load_csv_to_grouped_dict(table_file("ingredients", fmt, data_dir), 'recipe_id')
+        steps = load_csv_to_grouped_dict(table_file("steps", fmt, data_dir), 'recipe_id')
+        interactions = load_csv_to_grouped_dict(table_file("interactions", fmt, data_dir), 'recipe_id')
+        loaded = len(recipes)
+        metrics.inc("rows_loaded", loaded, table="recipes")
+        for name, grouped in (("ingredients", ingredients), ("steps", steps), ("interactions", interactions)):
+            metrics.inc("rows_loaded", sum(map(len, grouped.values())), table=name)
+    metrics.add_time("load", time.perf_counter() - started)
+
+    # Check if main data exists
+    if not loaded:
+        print(f"❌ Error: No recipe data found. Exiting.")
+        return
+
+    # 2. Validate
+    started = time.perf_counter()
+    if engine == "columnar" and workers > 1:
+        print(f"Validating {workers} shards in parallel...")
+        invalid_records, valid_records, total = validate_sharded(frames, workers)
+    elif engine == "columnar":
+        invalid_records, valid_records, total = validate_frames(
+            frames["recipes"], frames["ingredients"], frames["steps"], frames["interactions"])
+    else:
+        invalid_records, valid_records, total = validate_rows(recipes, ingredients, steps, interactions)
+    metrics.add_time("validate", time.perf_counter() - started)
+    metrics.inc("recipes_validated", len(valid_records), result="valid")
+    metrics.inc("recipes_validated", len(invalid_records), result="invalid")
+    for record in invalid_records:
+        for message in record["errors"]:
+            metrics.inc("validation_errors", rule=error_rule(message))
 
     # 3. Summarize
-    report["summary"]["valid_recipes"] = len(report["valid_records"])
-    report["summary"]["invalid_recipes"] = len(report["invalid_records"])
+    report = {
+        "summary": {
+            "total_recipes": total,
+            "valid_recipes": len(valid_records),
+            "invalid_recipes": len(invalid_records),
+            "missing_files": []
+        },
+        "invalid_records": invalid_records,
+        "valid_records": valid_records
+    }
 
     # 4. Write Report
-    output_path = "validation_report.json"
-    with open(output_path, "w", encoding='utf-8') as f:
-        json.dump(report, f, indent=2)
+    with metrics.timer("report"):
+        with open(output_path, "w", encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    metrics.inc("bytes_written", os.path.getsize(output_path), file=output_path)
+    if mask_path:
+        if engine == "columnar":
+            recipe_ids = frames["recipes"]["recipe_id"]
+        else:
+            recipe_ids = read_table_text(table_file("recipes", fmt, data_dir), ["recipe_id"])["recipe_id"]
+        with metrics.timer("mask"):
+            save_valid_mask(mask_path, valid_row_mask(recipe_ids, valid_records), recipe_ids)
+        metrics.inc("bytes_written", os.path.getsize(mask_path), file=mask_path)
 
     print(f"Validation Complete.")
     print(f"✔ Valid: {report['summary']['valid_recipes']}")
     print(f"✖ Invalid: {report['summary']['invalid_recipes']}")
     print(f"Report saved to: {output_path}")
+    if mask_path:
+        print(f"Valid-row mask saved to: {mask_path}")
+    return report
+
+# --- SINGLE-RECIPE RE-VALIDATION ---
+def revalidate_recipe(recipe_id, fmt="csv", data_dir=None, indexes=None):
+    """Validates one recipe, reading only its rows through the recipe_id
+    indexes written by the ETL (see transform_data/recipe_index.py).
+    Returns {"recipe_id", "title", "errors"}, or None if the recipe is not
+    in the recipes table."""
+    rows = lookup_recipe(recipe_id, data_dir or DATA_DIR, fmt, indexes)
+    if not rows["recipes"]:
+        return None
+    # Like load_csv_to_dict(), the last row wins for a duplicated recipe_id
+    rec = rows["recipes"][-1]
+    errors = validate_record(recipe_id, rec, rows["ingredients"], rows["steps"], rows["interactions"])
+    return {"recipe_id": recipe_id, "title": rec.get("title", "Unknown"), "errors": errors}
+
+def revalidate_recipes(recipe_ids, fmt="csv", data_dir=None):
+    """Spot-checks the given recipes and prints the result of each."""
+    results = []
+    indexes = open_indexes(data_dir or DATA_DIR, fmt)
+    for recipe_id in recipe_ids:
+        result = revalidate_recipe(recipe_id, fmt, data_dir, indexes)
+        results.append(result)
+        if result is None:
+            print(f"? {recipe_id}: not found")
+        elif result["errors"]:
+            print(f"✖ {recipe_id} ({result['title']}): {'; '.join(result['errors'])}")
+        else:
+            print(f"✔ {recipe_id} ({result['title']}): valid")
+    return results
 
 if __name__ == "__main__":
-    validate_recipes()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Validate the normalized recipe tables.")
+    parser.add_argument("--format", choices=sorted(FORMAT_EXTENSIONS), default="csv",
+                        help="Format of the ETL output tables to read (default: csv)")
+    parser.add_argument("--engine", choices=ENGINES, default="columnar",
+                        help="columnar (vectorized, default) or python (row-by-row reference)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Processes for the columnar engine (0 = all cores, default: 1)")
+    parser.add_argument("--data-dir", default=str(DATA_DIR),
+                        help="Folder holding the ETL output tables (default: transform_data/)")
+    parser.add_argument("--recipe", dest="recipe_ids", action="append", metavar="RECIPE_ID",
+                        help="Only re-validate this recipe using the recipe_id indexes; repeat for several")
+    add_metrics_arguments(parser, "validate", progress=False)
+    args = parser.parse_args()
+    if args.recipe_ids:
+        try:
+            revalidate_recipes(args.recipe_ids, args.format, args.data_dir)
+        except (FileNotFoundError, StaleIndexError) as error:
+            print(f"Error: {error}. Build the indexes with transform_data/recipe_index.py --data-dir {args.data_dir}")
+            exit(1)
+        exit(0)
+    metrics = Metrics("validate")
+    validate_recipes(args.format, args.engine, args.workers, metrics, args.data_dir)
+    metrics.save(args.metrics, args.prometheus)
+    print(f"Metrics saved to: {args.metrics}")
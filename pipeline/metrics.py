@@ -0,0 +1,147 @@
+"""Lightweight instrumentation shared by the pipeline stages.
+
+A Metrics registry holds labelled counters, gauges and accumulated timers for
+one stage (etl, validate, analytics). It is exported as a JSON file and,
+optionally, in the Prometheus text exposition format (e.g. for the node
+exporter's textfile collector). Progress replaces per-row prints with a line
+at most every few seconds.
+
+    metrics = Metrics("etl")
+    metrics.inc("documents_read", 20, collection="Recipe")
+    with metrics.timer("extract"):
+        ...
+    metrics.save("etl_metrics.json", prometheus_path="etl_metrics.prom")
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+PROMETHEUS_PREFIX = "recipe_pipeline"
+DEFAULT_PROGRESS_EVERY = 5.0
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+class Metrics:
+    """Counters (monotonic sums), gauges (last value) and timers (summed
+    seconds, exported as <name>_seconds), each keyed by name and labels.
+    Safe to update from several threads."""
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.started_at = datetime.now(timezone.utc)
+        self._lock = threading.Lock()
+        self._series = {"counter": {}, "gauge": {}, "timer": {}}
+
+    def _add(self, kind, name, value, labels, replace=False):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series[kind].setdefault(name, {})
+            series[key] = value if replace else series.get(key, 0) + value
+
+    def inc(self, name, value=1, **labels):
+        self._add("counter", name, value, labels)
+
+    def set(self, name, value, **labels):
+        self._add("gauge", name, value, labels, replace=True)
+
+    def add_time(self, name, seconds, **labels):
+        self._add("timer", name, seconds, labels)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Adds the wall-clock time of the `with` block to timer `name`."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - started, **labels)
+
+    def value(self, name, kind="counter", **labels):
+        return self._series[kind].get(name, {}).get(_label_key(labels), 0)
+
+    # --- Export ---
+    def as_dict(self):
+        with self._lock:
+            series = {kind: {name: [{"labels": dict(key), "value": value} for key, value in values.items()]
+                             for name, values in by_name.items()}
+                      for kind, by_name in self._series.items()}
+        return {
+            "stage": self.stage,
+            "started_at": self.started_at.isoformat(),
+            "counters": series["counter"],
+            "gauges": series["gauge"],
+            "timers_seconds": series["timer"],
+        }
+
+    def to_prometheus(self, prefix=PROMETHEUS_PREFIX):
+        """The metrics in Prometheus text format; every sample carries a
+        `stage` label. Counters get a _total suffix, timers _seconds."""
+        lines = []
+        exported = (("counter", "counter", "_total"), ("gauge", "gauge", ""), ("timer", "gauge", "_seconds"))
+        with self._lock:
+            for kind, prom_type, suffix in exported:
+                for name, values in sorted(self._series[kind].items()):
+                    metric = f"{prefix}_{name}{suffix}"
+                    lines.append(f"# TYPE {metric} {prom_type}")
+                    for key, value in values.items():
+                        labels = ",".join(f'{label}="{_escape(text)}"'
+                                          for label, text in (("stage", self.stage),) + key)
+                        lines.append(f"{metric}{{{labels}}} {float(value):g}")
+        return "\n".join(lines) + "\n"
+
+    def save(self, path, prometheus_path=None):
+        """Writes the JSON export to `path` (and the Prometheus text to
+        `prometheus_path`), replacing the files atomically."""
+        _write_atomic(path, json.dumps(self.as_dict(), indent=2))
+        if prometheus_path:
+            _write_atomic(prometheus_path, self.to_prometheus())
+
+def _escape(text):
+    return str(text).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _write_atomic(path, text):
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(path + '.tmp', path)
+
+class Progress:
+    """Rate-limited progress reporting: update() is cheap enough to call per
+    row and prints at most one line every `every` seconds (never if
+    `every` is None)."""
+
+    def __init__(self, label, every=DEFAULT_PROGRESS_EVERY, total=None):
+        self.label = label
+        self.every = every
+        self.total = total
+        self.count = 0
+        self.started = self._last = time.perf_counter()
+
+    def update(self, n=1):
+        self.count += n
+        if self.every is None:
+            return
+        now = time.perf_counter()
+        if now - self._last >= self.every:
+            self._last = now
+            self._report(now)
+
+    def _report(self, now):
+        elapsed = now - self.started
+        rate = self.count / elapsed if elapsed > 0 else 0.0
+        of_total = f"/{self.total}" if self.total is not None else ""
+        print(f"  {self.label}: {self.count}{of_total} ({rate:,.0f}/s)")
+
+def add_metrics_arguments(parser, stage, progress=True):
+    """Adds --metrics, --prometheus and (for stages that report progress)
+    --progress-every to a stage CLI."""
+    parser.add_argument("--metrics", default=f"{stage}_metrics.json",
+                        help=f"Where to write the stage metrics as JSON (default: {stage}_metrics.json)")
+    parser.add_argument("--prometheus", default=None,
+                        help="Also write the metrics in Prometheus text format to this file")
+    if progress:
+        parser.add_argument("--progress-every", type=float, default=DEFAULT_PROGRESS_EVERY,
+                            help=f"Seconds between progress lines (default: {DEFAULT_PROGRESS_EVERY:g})")
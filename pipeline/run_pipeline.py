@@ -0,0 +1,175 @@
+"""One-shot pipeline runner: extract -> transform -> validate -> analyze.
+
+The ETL keeps every table in memory as a typed Arrow table. Validation gets
+string views of the columns it checks and analytics gets typed DataFrames,
+so nothing is written out and parsed back between stages. Validation and
+analytics only read the extracted tables, so they run concurrently, unless
+--valid-only makes analytics wait for the validator's valid-row mask.
+
+--checkpoint also writes the tables to disk (in any ETL output format), and
+--resume restarts from a parquet/feather checkpoint without reading Firestore.
+
+    python pipeline/run_pipeline.py --fake fake_firestore.pkl --checkpoint parquet
+    python pipeline/run_pipeline.py --resume parquet --no-charts
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Make the project root importable when run as a script from this folder
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from analytics.analytics import HEXBIN_MIN_POINTS, SCATTER_MODES, TABLE_NAMES, run_analytics
+from data_validation.valid_mask import MASK_FILE
+from data_validation.validator import VALIDATION_COLUMNS, validate_recipes
+from Firebase_Setup.firestore_client import add_client_arguments, client_from_args
+from pipeline.metrics import DEFAULT_PROGRESS_EVERY, Metrics
+from transform_data.tables import OUTPUT_FORMATS, arrow_table_text, read_arrow_table, table_path
+from transform_data.transform import INTERACTION_MODES, run_etl_process
+
+DEFAULT_OUT_DIR = "pipeline_output"
+# Checkpoints that keep column types, so resuming does not re-infer them
+RESUMABLE_FORMATS = ("parquet", "feather")
+STAGES = ("etl", "validate", "analytics")
+
+# --- HAND-OFF ---
+def load_checkpoint(out_dir, fmt):
+    """Reads checkpointed tables back as typed pyarrow Tables."""
+    if fmt not in RESUMABLE_FORMATS:
+        raise ValueError(f"Can only resume from {' or '.join(RESUMABLE_FORMATS)} checkpoints, not {fmt!r}")
+    return {name: read_arrow_table(table_path(name, fmt, out_dir)) for name in TABLE_NAMES}
+
+def validation_frames(tables):
+    """The DataFrames validate_frames() expects, built from the typed tables
+    the same way load_frames() builds them from a file."""
+    return {name: arrow_table_text(tables[name], columns, typed=True)
+            for name, columns in VALIDATION_COLUMNS.items()}
+
+def analytics_frames(tables):
+    """Typed DataFrames, as analytics.load_tables() reads a parquet file."""
+    return {name: tables[name].to_pandas() for name in TABLE_NAMES}
+
+# --- RUNNER ---
+def run_pipeline(client=None, out_dir=DEFAULT_OUT_DIR, checkpoint_formats=(), resume=None,
+                 concurrency=1, interaction_mode="per-recipe", validate_workers=1, charts=True,
+                 chart_workers=None, scatter_mode="auto", progress_every=DEFAULT_PROGRESS_EVERY,
+                 prometheus=False, valid_only=False):
+    """Runs every stage, writing reports, charts, checkpoints and
+    <stage>_metrics.json into `out_dir`. Returns {"validation": report
+    summary, "insights": insight summary, "seconds": {stage: wall time}}.
+
+    resume: "parquet" or "feather" to start from a checkpoint in `out_dir`
+        instead of extracting from `client`.
+    valid_only: analyze only the recipes that passed validation.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    metrics = {stage: Metrics(stage) for stage in STAGES}
+    seconds = {}
+    started = time.perf_counter()
+
+    # 1. Extract + transform (or reload a checkpoint)
+    if resume:
+        print(f"Resuming from the {resume} checkpoint in {out_dir}...")
+        with metrics["etl"].timer("load"):
+            tables = load_checkpoint(out_dir, resume)
+    else:
+        stats = run_etl_process(client, concurrency, interaction_mode,
+                                watermark_path=os.path.join(out_dir, 'etl_watermark.json'),
+                                formats=tuple(checkpoint_formats), metrics=metrics["etl"],
+                                progress_every=progress_every, data_dir=out_dir, keep_tables=True)
+        tables = stats["tables"]
+    seconds["etl"] = time.perf_counter() - started
+
+    # 2. Validate and analyze the same in-memory tables
+    mask_path = os.path.join(out_dir, MASK_FILE)
+    def validate():
+        stage_started = time.perf_counter()
+        with metrics["validate"].timer("prepare"):
+            frames = validation_frames(tables)
+        report = validate_recipes(workers=validate_workers, metrics=metrics["validate"], frames=frames,
+                                  output_path=os.path.join(out_dir, 'validation_report.json'),
+                                  mask_path=mask_path)
+        seconds["validate"] = time.perf_counter() - stage_started
+        return report
+
+    def analyze():
+        stage_started = time.perf_counter()
+        with metrics["analytics"].timer("prepare"):
+            frames = analytics_frames(tables)
+        out = run_analytics(charts=charts, charts_dir=os.path.join(out_dir, 'charts'),
+                            chart_workers=chart_workers, scatter_mode=scatter_mode,
+                            metrics=metrics["analytics"], tables=frames, output_dir=out_dir,
+                            valid_mask_path=mask_path if valid_only else None)
+        seconds["analytics"] = time.perf_counter() - stage_started
+        return out
+
+    if valid_only:
+        report = validate()
+        insights = analyze()
+    else:
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            report, insights = pool.submit(validate), pool.submit(analyze)
+            report, insights = report.result(), insights.result()
+    seconds["total"] = time.perf_counter() - started
+
+    for stage, stage_metrics in metrics.items():
+        stage_metrics.set("stage_seconds", seconds[stage])
+        prom_path = os.path.join(out_dir, f"{stage}_metrics.prom") if prometheus else None
+        stage_metrics.save(os.path.join(out_dir, f"{stage}_metrics.json"), prom_path)
+
+    print(f"\nPipeline finished in {seconds['total']:.2f}s "
+          f"(etl {seconds['etl']:.2f}s, validate {seconds['validate']:.2f}s, "
+          f"analytics {seconds['analytics']:.2f}s). Outputs in {os.path.abspath(out_dir)}")
+    return {"validation": report["summary"] if report else None, "insights": insights, "seconds": seconds}
+
+def main():
+    parser = argparse.ArgumentParser(description="Run extract, transform, validate and analyze in one process.")
+    parser.add_argument("--out-dir", default=DEFAULT_OUT_DIR,
+                        help=f"Folder for reports, charts, checkpoints and metrics (default: ./{DEFAULT_OUT_DIR})")
+    parser.add_argument("--checkpoint", dest="checkpoint_formats", action="append", choices=sorted(OUTPUT_FORMATS),
+                        help="Also write the extracted tables in this format; repeat for several")
+    parser.add_argument("--resume", choices=RESUMABLE_FORMATS, default=None,
+                        help="Skip extraction and start from a checkpoint in --out-dir")
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="Parallel Interaction sub-collection reads (default: 1)")
+    parser.add_argument("--interactions", choices=INTERACTION_MODES, default="per-recipe",
+                        help="How to extract the Interaction sub-collections")
+    parser.add_argument("--validate-workers", type=int, default=1,
+                        help="Processes for validation (0 = all cores, default: 1)")
+    parser.add_argument("--valid-only", action="store_true",
+                        help="Only analyze recipes that passed validation (runs the stages one after the other)")
+    parser.add_argument("--no-charts", action="store_true", help="Only compute the JSON/CSV insights")
+    parser.add_argument("--chart-workers", type=int, default=None,
+                        help="Processes used to render charts (default: one per chart, up to the CPU count)")
+    parser.add_argument("--scatter", choices=SCATTER_MODES, default="auto",
+                        help=f"Prep time vs rating plot style; 'auto' switches to a hexbin density plot "
+                             f"from {HEXBIN_MIN_POINTS} recipes")
+    parser.add_argument("--prometheus", action="store_true",
+                        help="Also write each stage's metrics in Prometheus text format")
+    parser.add_argument("--progress-every", type=float, default=DEFAULT_PROGRESS_EVERY,
+                        help=f"Seconds between progress lines (default: {DEFAULT_PROGRESS_EVERY:g})")
+    add_client_arguments(parser)
+    args = parser.parse_args()
+
+    client = None
+    if not args.resume:
+        try:
+            client = client_from_args(args)
+        except FileNotFoundError as error:
+            print(f"Error: {error}")
+            exit(1)
+    try:
+        run_pipeline(client, args.out_dir, args.checkpoint_formats or (), args.resume, args.concurrency,
+                     args.interactions, args.validate_workers, not args.no_charts, args.chart_workers,
+                     args.scatter, args.progress_every, args.prometheus, args.valid_only)
+    except FileNotFoundError as error:
+        print(f"Error: Checkpoint table not found: {error}. Run once with --checkpoint {args.resume} first.")
+        exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Typed parsing of the numeric and timestamp columns, shared by the stages.
+
+The validator and analytics both need prep/cook/total times, quantities,
+ratings and creation timestamps as numbers. parse_numbers() and
+parse_timestamps() convert a whole column once, with explicit masks:
+
+    values   float64 (datetime64 in UTC, without a time zone, for
+             timestamps); NaN/NaT unless the cell parsed
+    null     the cell is missing or blank
+    invalid  the cell holds text that is not a number/timestamp
+
+Text is parsed the way float() parses the stripped cell (parse_number() is
+the same rule for one value), so "1_000" is a number and "nan" parses to NaN
+without being invalid. Low-cardinality columns (ratings, quantities, times)
+are factorized first and only their distinct values are parsed. Columns that
+are already typed (parquet/feather integers, CSV columns pandas inferred) are
+taken as they are.
+
+    typed = typed_columns(frame, "recipes")
+    prep = typed["prep_time_min"]
+    prep.values[prep.valid]
+"""
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+# Columns converted by typed_columns(), per table
+NUMBER_COLUMNS = {
+    "recipes": ("prep_time_min", "cook_time_min", "total_time_min"),
+    "ingredients": ("quantity",),
+    "steps": ("duration_min", "duration_max_min"),
+    "interactions": ("rating",),
+}
+TIMESTAMP_COLUMNS = {
+    "recipes": ("created_at",),
+    "ingredients": (),
+    "steps": (),
+    "interactions": ("created_at",),
+}
+# Rows sampled to decide whether a text column is worth factorizing
+CARDINALITY_SAMPLE = 10_000
+
+class TypedColumn(NamedTuple):
+    values: np.ndarray
+    null: np.ndarray
+    invalid: np.ndarray
+
+    @property
+    def valid(self):
+        return ~(self.null | self.invalid)
+
+    def series(self, index=None):
+        """The values as a Series (NaN/NaT wherever the cell did not parse)."""
+        return pd.Series(self.values, index=index)
+
+def parse_number(value):
+    """float() of one text cell; None when it is blank or not a number."""
+    if not value or value.strip() == "":
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+def _stripped(texts):
+    """Stripped strings of an object array. Other values (numbers or
+    timestamps mixed into text, as in frames concatenated in memory) are
+    formatted with str() instead of becoming missing."""
+    texts = pd.Series(texts, dtype=object)
+    stripped = texts.str.strip()
+    other = stripped.isna().to_numpy() & texts.notna().to_numpy()
+    if other.any():
+        stripped[other] = texts[other].map(str)
+    return stripped
+
+def _parse_texts(texts):
+    """(floats, null, invalid) for an object array of strings (or None)."""
+    stripped = _stripped(texts)
+    null = stripped.isna().to_numpy() | (stripped == "").to_numpy()
+    try:
+        # Fast path: every non-blank cell is a number
+        floats = stripped.where(~null).astype(float).to_numpy()
+        return floats, null, np.zeros(len(texts), dtype=bool)
+    except ValueError:
+        floats = pd.to_numeric(stripped.where(~null), errors='coerce').to_numpy(dtype=float, copy=True)
+    invalid = ~null & np.isnan(floats)
+    # Strings pandas cannot parse but float() can ('1_000', 'nan', non-ASCII digits...)
+    for i in np.flatnonzero(invalid):
+        value = parse_number(stripped.iat[i])
+        if value is not None:
+            floats[i], invalid[i] = value, False
+    return floats, null, invalid
+
+def _by_distinct_value(values, parse):
+    """Applies `parse` (object array -> tuple of arrays) to the distinct
+    values only when the column repeats values a lot, else to every cell."""
+    sample = values.iloc[:CARDINALITY_SAMPLE]
+    if sample.nunique(dropna=False) > len(sample) // 2:
+        return parse(values.to_numpy(dtype=object))
+    codes, uniques = pd.factorize(values)
+    # Code -1 (a missing cell) picks the extra None entry at the end
+    parsed = parse(np.append(np.asarray(uniques, dtype=object), None))
+    return tuple(array[codes] for array in parsed)
+
+def parse_numbers(values):
+    """TypedColumn of float64 for a column of numbers or number strings."""
+    values = values if isinstance(values, pd.Series) else pd.Series(values)
+    if pd.api.types.is_numeric_dtype(values.dtype) and not isinstance(values.dtype, pd.CategoricalDtype):
+        null = values.isna().to_numpy()
+        return TypedColumn(values.to_numpy(dtype=float, na_value=np.nan), null, np.zeros(len(values), dtype=bool))
+    return TypedColumn(*_by_distinct_value(values, _parse_texts))
+
+def _parse_timestamp_texts(texts):
+    stripped = _stripped(texts)
+    null = stripped.isna().to_numpy() | (stripped == "").to_numpy()
+    stamps = pd.to_datetime(stripped.where(~null), errors='coerce', utc=True, format="ISO8601")
+    return stamps.dt.tz_convert(None).to_numpy(), null, ~null & stamps.isna().to_numpy()
+
+def parse_timestamps(values):
+    """TypedColumn of UTC datetime64 for a timestamp or ISO 8601 string
+    column (naive timestamps are taken to be UTC already)."""
+    values = values if isinstance(values, pd.Series) else pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(values.dtype):
+        stamps = values if values.dt.tz is None else values.dt.tz_convert(None)
+        return TypedColumn(stamps.to_numpy(), values.isna().to_numpy(), np.zeros(len(values), dtype=bool))
+    return TypedColumn(*_by_distinct_value(values, _parse_timestamp_texts))
+
+def typed_columns(frame, name):
+    """{column: TypedColumn} for the numeric and timestamp columns of table
+    `name` that `frame` holds."""
+    typed = {column: parse_numbers(frame[column]) for column in NUMBER_COLUMNS[name] if column in frame}
+    typed.update((column, parse_timestamps(frame[column])) for column in TIMESTAMP_COLUMNS[name]
+                 if column in frame)
+    return typed
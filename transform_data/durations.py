@@ -0,0 +1,68 @@
+"""Step durations ("9 min", "4-6 hours", "30 sec") as numeric minutes.
+
+parse_duration() turns one duration string into (minimum, maximum) minutes:
+"9 min" is (9.0, 9.0), "4-6 hours" is (240.0, 360.0) and components add up,
+so "1 hr 30 min" is (90.0, 90.0). Blank or unrecognised strings give
+(None, None). Steps repeat a few hundred distinct strings across millions of
+rows, so the parser is memoized and parse_durations() parses each distinct
+value of a column once.
+
+The transform stage stores the result in the steps table as duration_min and
+duration_max_min; step_minutes() reads those columns back (or parses the text
+of tables written before they existed).
+"""
+import re
+from functools import lru_cache
+
+import numpy as np
+
+DURATION_COLUMNS = ("duration_min", "duration_max_min")
+UNIT_MINUTES = {
+    **dict.fromkeys(("s", "sec", "secs", "second", "seconds"), 1 / 60),
+    **dict.fromkeys(("m", "min", "mins", "minute", "minutes"), 1.0),
+    **dict.fromkeys(("h", "hr", "hrs", "hour", "hours"), 60.0),
+    **dict.fromkeys(("d", "day", "days"), 1440.0),
+}
+_NUMBER = r"\d+(?:\.\d+)?"
+# One "<number>[-<number>] <unit>" component, e.g. "4-6 hours" or "30 sec"
+_COMPONENT = re.compile(rf"\s*({_NUMBER})(?:\s*(?:-|–|to)\s*({_NUMBER}))?\s*([a-z]+)\.?\s*")
+
+@lru_cache(maxsize=65536)
+def parse_duration(text):
+    """(minimum, maximum) minutes of a duration string, or (None, None)."""
+    text = (text or "").strip().lower()
+    low = high = 0.0
+    position = 0
+    while position < len(text):
+        match = _COMPONENT.match(text, position)
+        if not match or match.group(3) not in UNIT_MINUTES:
+            return None, None
+        minutes = UNIT_MINUTES[match.group(3)]
+        low += float(match.group(1)) * minutes
+        high += float(match.group(2) or match.group(1)) * minutes
+        position = match.end()
+    return (low, high) if position else (None, None)
+
+def duration_columns(text):
+    """{"duration_min": ..., "duration_max_min": ...} for one steps row."""
+    return dict(zip(DURATION_COLUMNS, parse_duration(text if isinstance(text, str) else None)))
+
+def parse_durations(values):
+    """(minimum, maximum) minutes of a pandas column of duration strings, as
+    float arrays with NaN where a value is missing or not a duration."""
+    import pandas as pd
+
+    codes, uniques = pd.factorize(values)
+    parsed = np.array([parse_duration(text if isinstance(text, str) else None) for text in uniques] +
+                      [(None, None)], dtype=float).reshape(-1, 2)
+    # Code -1 (a missing cell) picks the (NaN, NaN) row at the end
+    return parsed[codes, 0], parsed[codes, 1]
+
+def step_minutes(steps):
+    """(minimum, maximum) minutes of every row of a steps DataFrame, from the
+    duration_min/duration_max_min columns when it has them."""
+    from pipeline.typed_ingest import parse_numbers
+
+    if all(column in steps for column in DURATION_COLUMNS):
+        return tuple(parse_numbers(steps[column]).values for column in DURATION_COLUMNS)
+    return parse_durations(steps["duration"])
@@ -0,0 +1,220 @@
+"""Sidecar index from recipe_id to the rows of each normalized table.
+
+For a table file such as ingredients.csv, build_index() writes
+ingredients.csv.idx.npz. It holds one entry per run of consecutive rows with
+the same recipe_id (the ETL emits child rows grouped by recipe, so usually
+one run per recipe), sorted by recipe_id:
+
+    keys        recipe_id of each run (UTF-8 bytes, sorted)
+    row_start   first row of the run; row_end is one past the last row
+    byte_start  CSV only: byte range of the run's lines in the file
+    chunk_rows  parquet/feather only: first row of every row group/batch
+
+RecipeIndex.records() finds a recipe's runs with a binary search. It then
+reads only those bytes (CSV) or row groups/record batches (parquet,
+feather). The file's size and mtime are stored too, and an index older
+than its table is rejected with StaleIndexError.
+
+    python recipe_index.py --data-dir . --format csv
+"""
+import argparse
+import csv
+import io
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from transform_data.tables import (
+    FORMAT_EXTENSIONS, TABLES, _require_pyarrow, _to_text, format_of, read_arrow_table, table_path,
+)
+
+INDEX_SUFFIX = ".idx.npz"
+SCAN_BLOCK = 1 << 23
+
+class StaleIndexError(ValueError):
+    """The table file changed after its index was built."""
+
+def index_path(path):
+    return str(path) + INDEX_SUFFIX
+
+def _encode(values):
+    return np.char.encode(np.asarray(values, dtype=str), 'utf-8')
+
+# --- BUILD ---
+def csv_record_offsets(path, block_size=SCAN_BLOCK):
+    """(starts, ends): byte range of every CSV record, the header included.
+    Newlines inside quoted fields are skipped (a newline ends a record only
+    after an even number of quote characters), and so are blank lines, as
+    csv.DictReader and pandas skip them."""
+    offsets = [np.zeros(1, dtype=np.int64)]
+    in_quotes = 0
+    base = 0
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            data = np.frombuffer(block, dtype=np.uint8)
+            # uint8 cumsum wraps around, but only its parity is needed
+            parity = (np.cumsum(data == ord('"'), dtype=np.uint8) & 1) ^ in_quotes
+            ends = np.flatnonzero((data == ord('\n')) & (parity == 0))
+            offsets.append(base + ends + 1)
+            in_quotes = int(parity[-1])
+            base += len(data)
+        offsets = np.concatenate(offsets)
+        if offsets[-1] != base:
+            # No newline after the last record
+            offsets = np.append(offsets, base)
+        starts, ends = offsets[:-1], offsets[1:]
+        keep = np.ones(len(starts), dtype=bool)
+        for i in np.flatnonzero(ends - starts <= 2):
+            f.seek(starts[i])
+            keep[i] = bool(f.read(int(ends[i] - starts[i])).strip(b'\r\n'))
+    return starts[keep], ends[keep]
+
+def _runs(recipe_ids):
+    """(run start rows, run end rows, run keys) of consecutive equal ids."""
+    ids = np.asarray(recipe_ids, dtype=object)
+    if not len(ids):
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, ids
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+    ends = np.r_[starts[1:], len(ids)]
+    return starts, ends, ids[starts]
+
+def build_index(path):
+    """Writes the sidecar index of a table file and returns its path."""
+    import pandas as pd
+
+    fmt = format_of(path)
+    arrays = {}
+    if fmt == "csv":
+        recipe_ids = pd.read_csv(path, usecols=["recipe_id"], dtype=str, keep_default_na=False)["recipe_id"]
+        record_starts, record_ends = csv_record_offsets(path)
+        if len(record_starts) - 1 != len(recipe_ids):
+            raise ValueError(f"{path}: {len(record_starts) - 1} records but {len(recipe_ids)} rows")
+        starts, ends, keys = _runs(recipe_ids.to_numpy())
+        # Data row r is record r + 1 (record 0 is the header)
+        arrays["byte_start"], arrays["byte_end"] = record_starts[starts + 1], record_ends[ends]
+    else:
+        pa = _require_pyarrow()
+        recipe_ids = read_arrow_table(path, ["recipe_id"])["recipe_id"].to_numpy(zero_copy_only=False)
+        starts, ends, keys = _runs(recipe_ids)
+        if fmt == "parquet":
+            metadata = pa.parquet.ParquetFile(path).metadata
+            chunk_sizes = [metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)]
+        else:
+            with pa.memory_map(path) as source:
+                reader = pa.ipc.open_file(source)
+                chunk_sizes = [reader.get_batch(i).num_rows for i in range(reader.num_record_batches)]
+        arrays["chunk_rows"] = np.r_[0, np.cumsum(chunk_sizes, dtype=np.int64)]
+
+    order = np.argsort(_encode(keys), kind="stable")
+    stat = os.stat(path)
+    out = index_path(path)
+    with open(out + '.tmp', 'wb') as f:
+        np.savez(f, keys=_encode(keys)[order], row_start=starts[order], row_end=ends[order],
+                 rows=len(recipe_ids), size=stat.st_size, mtime_ns=stat.st_mtime_ns,
+                 **{name: values[order] if name != "chunk_rows" else values for name, values in arrays.items()})
+    os.replace(out + '.tmp', out)
+    return out
+
+def build_indexes(data_dir="", fmt="csv", names=tuple(TABLES)):
+    """Indexes every table of one format in `data_dir`; returns the paths."""
+    return [build_index(table_path(name, fmt, data_dir)) for name in names]
+
+# --- LOOKUP ---
+class RecipeIndex:
+    """Random access to the rows of one table file by recipe_id."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.fmt = format_of(self.path)
+        with np.load(index_path(self.path)) as saved:
+            self._index = {name: saved[name] for name in saved.files}
+        stat = os.stat(self.path)
+        if stat.st_size != int(self._index["size"]) or stat.st_mtime_ns != int(self._index["mtime_ns"]):
+            raise StaleIndexError(f"{self.path} changed after it was indexed")
+        self.rows = int(self._index["rows"])
+
+    def runs(self, recipe_id):
+        """Positions (in the index) of the runs of one recipe."""
+        key = _encode([recipe_id])[0]
+        keys = self._index["keys"]
+        return range(np.searchsorted(keys, key, "left"), np.searchsorted(keys, key, "right"))
+
+    def row_ranges(self, recipe_id):
+        """[(first row, one past the last row), ...] of a recipe, in file order."""
+        return sorted((int(self._index["row_start"][i]), int(self._index["row_end"][i]))
+                      for i in self.runs(recipe_id))
+
+    def records(self, recipe_id):
+        """The recipe's rows as dicts of strings, exactly as iter_records()
+        yields them, without scanning the rest of the file."""
+        runs = sorted(self.runs(recipe_id), key=lambda i: self._index["row_start"][i])
+        if self.fmt == "csv":
+            return self._csv_records(runs)
+        return self._arrow_records(runs)
+
+    def _csv_records(self, runs):
+        if not runs:
+            return []
+        with open(self.path, 'rb') as f:
+            header = f.readline()
+            parts = [header]
+            for i in runs:
+                f.seek(int(self._index["byte_start"][i]))
+                parts.append(f.read(int(self._index["byte_end"][i] - self._index["byte_start"][i])))
+        text = b''.join(parts).decode('utf-8')
+        return list(csv.DictReader(io.StringIO(text, newline='')))
+
+    def _arrow_records(self, runs):
+        pa = _require_pyarrow()
+        chunk_rows = self._index["chunk_rows"]
+        records = []
+        for i in runs:
+            start, end = int(self._index["row_start"][i]), int(self._index["row_end"][i])
+            first = int(np.searchsorted(chunk_rows, start, "right")) - 1
+            last = int(np.searchsorted(chunk_rows, end, "left"))
+            table = self._read_chunks(pa, range(first, last))
+            rows = table.slice(start - int(chunk_rows[first]), end - start).to_pylist()
+            records.extend({column: _to_text(value) for column, value in row.items()} for row in rows)
+        return records
+
+    def _read_chunks(self, pa, chunks):
+        if self.fmt == "parquet":
+            return pa.parquet.ParquetFile(self.path).read_row_groups(list(chunks))
+        with pa.memory_map(self.path) as source:
+            reader = pa.ipc.open_file(source)
+            return pa.Table.from_batches([reader.get_batch(i) for i in chunks], schema=reader.schema)
+
+def open_indexes(data_dir="", fmt="csv", names=tuple(TABLES)):
+    """{table name: RecipeIndex}, to reuse across many lookups."""
+    return {name: RecipeIndex(table_path(name, fmt, data_dir)) for name in names}
+
+def lookup_recipe(recipe_id, data_dir="", fmt="csv", indexes=None):
+    """{table name: [row dicts]} for one recipe, read through the indexes
+    (opened from `data_dir` unless already open in `indexes`)."""
+    indexes = indexes or open_indexes(data_dir, fmt)
+    return {name: index.records(recipe_id) for name, index in indexes.items()}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build recipe_id indexes for the normalized tables.")
+    parser.add_argument("--data-dir", default=str(PROJECT_ROOT / 'transform_data'),
+                        help="Folder holding the tables (default: transform_data/)")
+    parser.add_argument("--format", choices=sorted(FORMAT_EXTENSIONS), default="csv",
+                        help="Format of the tables to index (default: csv)")
+    parser.add_argument("--lookup", metavar="RECIPE_ID", default=None,
+                        help="Print the rows of one recipe instead of building the indexes")
+    args = parser.parse_args()
+    if args.lookup:
+        for name, records in lookup_recipe(args.lookup, args.data_dir, args.format).items():
+            print(f"{name}: {len(records)} rows")
+            for record in records:
+                print(f"  {record}")
+    else:
+        for path in build_indexes(args.data_dir, args.format):
+            print(f"✔ Indexed {path}")
@@ -0,0 +1,597 @@
+"""Schemas, writers and readers for the normalized recipe tables.
+
+The transform stage writes every table through one of the OUTPUT_FORMATS
+writers; the validator and analytics stages read them back with
+iter_records() / read_table().
+"""
+import csv
+import os
+import sys
+from collections import defaultdict
+from datetime import datetime
+
+# --- TABLE SCHEMAS ---
+# name -> ([(column, type), ...], upsert key)
+# Types: "string", "int", "float", "bool", "timestamp", "category". `quantity` and
+# `rating` stay strings so the validator can still report the raw value it
+# rejected. "category" columns hold a few distinct strings repeated on many
+# rows; they are dictionary-encoded (int32 codes + one dictionary) in Arrow
+# files and memory, and loaded as pandas categoricals.
+TABLES = {
+    "recipes": ([
+        ("recipe_id", "string"),
+        ("title", "string"),
+        ("description", "string"),
+        ("prep_time_min", "int"),
+        ("cook_time_min", "int"),
+        ("total_time_min", "int"),
+        ("difficulty", "category"),
+        ("category", "category"),
+        ("dietary_type", "category"),
+        ("author_id", "category"),
+        ("author_name", "category"),
+        ("created_at", "timestamp"),
+    ], "recipe_id"),
+    "ingredients": ([
+        ("recipe_id", "string"),
+        ("name", "category"),
+        ("quantity", "string"),
+        ("unit", "category"),
+        ("is_optional", "bool"),
+    ], "recipe_id"),
+    "steps": ([
+        ("recipe_id", "string"),
+        ("step_number", "int"),
+        ("instruction", "string"),
+        ("duration", "category"),
+        # Parsed from `duration` by durations.py; NaN when it is not a duration
+        ("duration_min", "float"),
+        ("duration_max_min", "float"),
+    ], "recipe_id"),
+    "interactions": ([
+        ("interaction_id", "string"),
+        ("recipe_id", "string"),
+        ("user_id", "category"),
+        ("username", "category"),
+        ("type", "category"),
+        ("rating", "string"),
+        ("cooknote", "string"),
+        ("created_at", "timestamp"),
+    ], "interaction_id"),
+}
+
+FORMAT_EXTENSIONS = {"csv": ".csv", "parquet": ".parquet", "feather": ".feather"}
+DEFAULT_BUFFER_ROWS = 1000
+
+def columns(name):
+    return [column for column, _ in TABLES[name][0]]
+
+def key_field(name):
+    return TABLES[name][1]
+
+def category_columns(name):
+    return [column for column, kind in TABLES[name][0] if kind == "category"]
+
+CATEGORY_COLUMNS = {column for name in TABLES for column in category_columns(name)}
+
+def table_name(path):
+    """'recipes' for '<dir>/recipes.parquet' (None for an unknown table)."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return stem if stem in TABLES else None
+
+def table_path(name, fmt="csv", data_dir=""):
+    """Returns e.g. '<data_dir>/recipes.parquet' for ('recipes', 'parquet')."""
+    return os.path.join(data_dir, name + FORMAT_EXTENSIONS[fmt])
+
+def format_of(path):
+    """Infers the table format from a file extension (defaults to csv)."""
+    ext = os.path.splitext(path)[1].lower()
+    for fmt, known in FORMAT_EXTENSIONS.items():
+        if ext == known:
+            return fmt
+    return "csv"
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("pyarrow is required for parquet/feather tables: pip install pyarrow")
+    return pyarrow
+
+# --- VALUE COERCION ---
+def _to_int(value):
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return int(number) if number.is_integer() else None
+
+def _to_float(value):
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def _to_bool(value):
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower() if value is not None else ""
+    if text in ("true", "1", "yes"):
+        return True
+    if text in ("false", "0", "no"):
+        return False
+    return None
+
+def _to_timestamp(value):
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+def _to_string(value):
+    return None if value is None else str(value)
+
+COERCERS = {"string": _to_string, "int": _to_int, "float": _to_float, "bool": _to_bool,
+            "timestamp": _to_timestamp, "category": _to_string}
+
+def intern_categories(row):
+    """Makes the category values of a row dict share one string object per
+    distinct value, for code that keeps millions of rows as dicts."""
+    for column in CATEGORY_COLUMNS.intersection(row):
+        if isinstance(row[column], str):
+            row[column] = sys.intern(row[column])
+    return row
+
+def _to_text(value):
+    """Renders a typed value the way csv.DictWriter would have written it."""
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+def _iso_text(values):
+    """Vectorized _to_text() for a pandas datetime Series ("" for NaT)."""
+    import numpy as np
+
+    if values.dt.tz is not None:
+        values = values.dt.tz_convert("UTC")
+    text = np.datetime_as_string(values.to_numpy(dtype="datetime64[us]"), unit="us")
+    if values.dt.tz is not None:
+        text = np.char.add(text, "+00:00")
+    return np.where(values.isna().to_numpy(), "", text)
+
+_CSV_SPECIALS = (',', '"', '\r', '\n')
+
+def _csv_cells(values, kind):
+    """Renders a pandas column as the text csv.DictWriter would write for it
+    (QUOTE_MINIMAL, "" for missing values), as a list of str."""
+    import numpy as np
+    import pandas as pd
+
+    if kind == "timestamp" and pd.api.types.is_datetime64_any_dtype(values):
+        return _iso_text(values).tolist()
+    if pd.api.types.is_bool_dtype(values):
+        text = np.where(values.to_numpy(dtype=bool, na_value=False), "True", "False")
+        return np.where(values.isna().to_numpy(), "", text).tolist()
+    if kind == "int" and pd.api.types.is_float_dtype(values):
+        values = values.astype("Int64")
+    text = values.to_numpy(dtype=object)
+    # All-str columns (the common case) have no missing values to blank out
+    if pd.api.types.infer_dtype(text, skipna=False) != "string":
+        missing = values.isna().to_numpy()
+        text = ["" if miss else str(value) for value, miss in zip(text, missing)]
+    # One C-level scan decides whether any cell needs quoting at all
+    joined = '\x1f'.join(text)
+    if any(special in joined for special in _CSV_SPECIALS):
+        text = ['"' + value.replace('"', '""') + '"' if any(special in value for special in _CSV_SPECIALS)
+                else value for value in text]
+    return list(text)
+
+def arrow_schema(name):
+    pa = _require_pyarrow()
+    types = {
+        "string": pa.string(),
+        "int": pa.int64(),
+        "float": pa.float64(),
+        "bool": pa.bool_(),
+        "timestamp": pa.timestamp("us", tz="UTC"),
+        "category": pa.dictionary(pa.int32(), pa.string()),
+    }
+    return pa.schema([(column, types[kind]) for column, kind in TABLES[name][0]])
+
+# --- WRITERS ---
+class TableWriter:
+    """Streams rows of one table to disk through a bounded buffer.
+
+    Rows are flushed every `buffer_rows` rows, so memory stays constant and
+    output appears while extraction is still running. Subclasses implement
+    flush(), close() and copy_from().
+    """
+
+    def __init__(self, path, name, buffer_rows=DEFAULT_BUFFER_ROWS):
+        self.path = path
+        self.name = name
+        self.rows = 0
+        self._buffer = []
+        self._buffer_rows = buffer_rows
+
+    def write(self, row):
+        self._buffer.append(row)
+        self.rows += 1
+        if len(self._buffer) >= self._buffer_rows:
+            self.flush()
+
+    def writerows(self, rows):
+        for row in rows:
+            self.write(row)
+
+    def write_frame(self, frame):
+        """Writes a pandas DataFrame of this table's columns in one go, after
+        any buffered rows. Timestamp columns may be tz-aware datetimes."""
+        raise NotImplementedError
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class CsvTableWriter(TableWriter):
+    fmt = "csv"
+
+    def __init__(self, path, name, buffer_rows=DEFAULT_BUFFER_ROWS):
+        super().__init__(path, name, buffer_rows)
+        self._file = open(path, mode='w', newline='', encoding='utf-8')
+        self._writer = csv.DictWriter(self._file, fieldnames=columns(name))
+        self._writer.writeheader()
+
+    def copy_from(self, path, replaced_keys=()):
+        """Appends the rows of another file of this table, skipping replaced keys."""
+        key = key_field(self.name)
+        self.writerows(row for row in iter_records(path, self.fmt) if row[key] not in replaced_keys)
+
+    def write_frame(self, frame):
+        self.flush()
+        if not len(frame):
+            return
+        cells = [_csv_cells(frame[column], kind) for column, kind in TABLES[self.name][0]]
+        # Joined in C; several times faster than DataFrame.to_csv on string columns
+        self._file.write('\r\n'.join(map(','.join, zip(*cells))) + '\r\n')
+        self.rows += len(frame)
+
+    def flush(self):
+        self._writer.writerows(self._buffer)
+        self._buffer.clear()
+        self._file.flush()
+
+    def close(self):
+        if self._file.closed:
+            return
+        self.flush()
+        self._file.close()
+
+class ArrowTableWriter(TableWriter):
+    """Writes rows as typed, compressed Arrow record batches."""
+
+    # Columnar files compress far better with large batches
+    min_buffer_rows = 65536
+
+    def __init__(self, path, name, buffer_rows=DEFAULT_BUFFER_ROWS, compression="zstd"):
+        super().__init__(path, name, max(buffer_rows, self.min_buffer_rows))
+        pa = _require_pyarrow()
+        self._schema = arrow_schema(name)
+        self._coercers = [(column, COERCERS[kind]) for column, kind in TABLES[name][0]]
+        # category column -> {value: code}; codes are only ever appended
+        self._dictionaries = {column: {} for column in category_columns(name)}
+        self._dictionary_arrays = {}
+        self._sink = self._open(pa, path, compression)
+        self._closed = False
+
+    def _open(self, pa, path, compression):
+        raise NotImplementedError
+
+    def copy_from(self, path, replaced_keys=()):
+        pa = _require_pyarrow()
+        self.flush()
+        value_set = pa.array(list(replaced_keys), pa.string())
+        key = key_field(self.name)
+        for batch in iter_batches(path, self.fmt):
+            if len(value_set):
+                batch = batch.filter(pa.compute.invert(pa.compute.is_in(batch[key], value_set=value_set)))
+            self._sink.write_batch(self._conform(pa, batch))
+            self.rows += batch.num_rows
+
+    def write_frame(self, frame):
+        pa = _require_pyarrow()
+        self.flush()
+        table = pa.Table.from_pandas(frame[columns(self.name)], schema=self._schema, preserve_index=False)
+        self._sink.write_table(self._conform(pa, table))
+        self.rows += table.num_rows
+
+    def flush(self):
+        if not self._buffer:
+            return
+        pa = _require_pyarrow()
+        data = {column: [coerce(row.get(column)) for row in self._buffer]
+                for column, coerce in self._coercers}
+        for column in self._dictionaries:
+            data[column] = self._encode(pa, column, data[column])
+        self._sink.write_batch(pa.RecordBatch.from_pydict(data, schema=self._schema))
+        self._buffer.clear()
+
+    def _encode(self, pa, column, values):
+        """Dictionary-encodes `values` (a list, Series or Categorical) against
+        the column's running dictionary. Each batch's dictionary extends the
+        previous one, which the IPC file format needs (one dictionary plus
+        deltas), and distinct values are looked up once per batch, not per row."""
+        import numpy as np
+        import pandas as pd
+
+        if isinstance(values, list):
+            values = np.array(values, dtype=object)
+        codes, uniques = pd.factorize(values)
+        seen = self._dictionaries[column]
+        known = len(seen)
+        mapping = np.array([seen.setdefault(value, len(seen)) for value in uniques] + [0], dtype=np.int32)
+        if len(seen) != known or column not in self._dictionary_arrays:
+            self._dictionary_arrays[column] = pa.array(list(seen), pa.string())
+        indices = pa.array(mapping[codes], type=pa.int32(), mask=codes < 0)
+        return pa.DictionaryArray.from_arrays(indices, self._dictionary_arrays[column])
+
+    def _conform(self, pa, data):
+        """Re-encodes the category columns of a RecordBatch/Table (read from
+        another file, or converted from pandas) with this writer's dictionaries.
+        Plain string columns from files written before they were encoded work too."""
+        if not self._dictionaries:
+            return data
+        arrays = [self._encode(pa, field.name, data.column(field.name).to_pandas())
+                  if field.name in self._dictionaries else data.column(field.name)
+                  for field in self._schema]
+        return type(data).from_arrays(arrays, schema=self._schema)
+
+    def close(self):
+        if self._closed:
+            return
+        self.flush()
+        self._sink.close()
+        self._closed = True
+
+class ParquetTableWriter(ArrowTableWriter):
+    fmt = "parquet"
+
+    def _open(self, pa, path, compression):
+        return pa.parquet.ParquetWriter(path, self._schema, compression=compression)
+
+class FeatherTableWriter(ArrowTableWriter):
+    """Arrow IPC file (Feather v2)."""
+
+    fmt = "feather"
+
+    def _open(self, pa, path, compression):
+        self._file = pa.OSFile(path, 'wb')
+        # Category dictionaries only grow, so later batches append deltas
+        options = pa.ipc.IpcWriteOptions(compression=compression, emit_dictionary_deltas=True)
+        return pa.ipc.new_file(self._file, self._schema, options=options)
+
+    def close(self):
+        if self._closed:
+            return
+        super().close()
+        self._file.close()
+
+class _BatchList(list):
+    """In-memory stand-in for a parquet/IPC writer."""
+
+    def write_batch(self, batch):
+        self.append(batch)
+
+    def write_table(self, table):
+        self.extend(table.to_batches())
+
+    def close(self):
+        pass
+
+class MemoryTableWriter(ArrowTableWriter):
+    """Keeps the typed record batches in memory instead of writing a file,
+    so the next stage can use the table without re-parsing it."""
+
+    fmt = "memory"
+
+    def __init__(self, name, buffer_rows=DEFAULT_BUFFER_ROWS):
+        super().__init__(None, name, buffer_rows)
+
+    def _open(self, pa, path, compression):
+        return _BatchList()
+
+    def table(self):
+        """The rows written so far as one pyarrow Table."""
+        pa = _require_pyarrow()
+        self.flush()
+        return pa.Table.from_batches(self._sink, schema=self._schema)
+
+OUTPUT_FORMATS = {
+    "csv": CsvTableWriter,
+    "parquet": ParquetTableWriter,
+    "feather": FeatherTableWriter,
+}
+
+def open_writer(fmt, name, path, buffer_rows=DEFAULT_BUFFER_ROWS):
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format: {fmt!r}")
+    return OUTPUT_FORMATS[fmt](path, name, buffer_rows)
+
+def merge_table(fmt, name, path, delta_path, replaced_keys, buffer_rows=DEFAULT_BUFFER_ROWS):
+    """Upserts the rows of `delta_path` into the table file at `path`.
+
+    Existing rows whose key is in `replaced_keys` are dropped and the delta
+    rows are appended. Both files are streamed; only the key set is held in
+    memory. Returns the number of rows in the merged file.
+    """
+    tmp_path = path + '.tmp'
+    with open_writer(fmt, name, tmp_path, buffer_rows) as writer:
+        if os.path.exists(path):
+            writer.copy_from(path, replaced_keys)
+        writer.copy_from(delta_path)
+    os.replace(tmp_path, path)
+    os.remove(delta_path)
+    return writer.rows
+
+# --- READERS ---
+def iter_batches(path, fmt=None):
+    """Streams the record batches of a parquet or feather file."""
+    pa = _require_pyarrow()
+    if (fmt or format_of(path)) == "parquet":
+        yield from pa.parquet.ParquetFile(path).iter_batches()
+    else:
+        with pa.ipc.open_file(path) as reader:
+            for i in range(reader.num_record_batches):
+                yield reader.get_batch(i)
+
+def iter_table_chunks(path, chunksize, columns=None):
+    """Streams a table file as pandas DataFrames of at most `chunksize` rows."""
+    import pandas as pd
+
+    fmt = format_of(path)
+    if fmt == "csv":
+        with pd.read_csv(path, chunksize=chunksize, usecols=columns) as reader:
+            yield from reader
+        return
+    pa = _require_pyarrow()
+    if fmt == "parquet":
+        batches = pa.parquet.ParquetFile(path).iter_batches(batch_size=chunksize, columns=columns)
+    else:
+        batches = (batch if columns is None else batch.select(columns) for batch in iter_batches(path, fmt))
+    for table in _rechunk(pa, batches, chunksize):
+        yield table.to_pandas()
+
+def _rechunk(pa, batches, chunksize):
+    """Regroups record batches into Tables of exactly `chunksize` rows (the
+    last one may be shorter). Parquet batches stop at row-group boundaries
+    when a column is dictionary-encoded; to_pandas() unifies the dictionaries."""
+    pending, rows = [], 0
+    for batch in batches:
+        while batch.num_rows:
+            take = min(chunksize - rows, batch.num_rows)
+            pending.append(batch.slice(0, take))
+            rows += take
+            batch = batch.slice(take)
+            if rows == chunksize:
+                yield pa.Table.from_batches(pending)
+                pending, rows = [], 0
+    if pending:
+        yield pa.Table.from_batches(pending)
+
+def iter_records(path, fmt=None):
+    """Streams a table file as dicts of strings, like csv.DictReader does for
+    CSV. Raises FileNotFoundError if the file does not exist."""
+    fmt = fmt or format_of(path)
+    if fmt == "csv":
+        with open(path, newline='', encoding='utf-8') as f:
+            yield from csv.DictReader(f)
+        return
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+    for batch in iter_batches(path, fmt):
+        for row in batch.to_pylist():
+            yield {column: _to_text(value) for column, value in row.items()}
+
+def file_columns(path):
+    """Column names stored in a table file, read from its header or schema."""
+    fmt = format_of(path)
+    if fmt == "csv":
+        with open(path, newline='', encoding='utf-8') as f:
+            return next(csv.reader(f), [])
+    pa = _require_pyarrow()
+    if fmt == "parquet":
+        return pa.parquet.read_schema(path).names
+    with pa.ipc.open_file(path) as reader:
+        return reader.schema.names
+
+def read_table(path):
+    """Loads a table file into a pandas DataFrame. Columnar files keep their
+    stored types; CSV types are inferred by pandas. Category columns are
+    pandas categoricals in every format."""
+    import pandas as pd
+
+    fmt = format_of(path)
+    if fmt == "parquet":
+        return pd.read_parquet(path)
+    if fmt == "feather":
+        return pd.read_feather(path)
+    name = table_name(path)
+    return pd.read_csv(path, dtype={column: "category" for column in category_columns(name)} if name else None)
+
+def read_arrow_table(path, columns=None):
+    """Loads a parquet or feather file as a typed pyarrow Table."""
+    pa = _require_pyarrow()
+    if format_of(path) == "parquet":
+        return pa.parquet.read_table(path, columns=columns)
+    import pyarrow.feather
+    return pyarrow.feather.read_table(path, columns=columns)
+
+def read_table_text(path, columns=None, typed=False):
+    """Loads a table file as a DataFrame of strings ("" for missing values),
+    matching what csv.DictReader yields row by row. `columns` limits which
+    columns are read. Category columns are categoricals of those strings.
+    typed: keep the integer and float columns of parquet/feather files as
+    nullable numbers instead of formatting them (CSV columns are strings
+    either way)."""
+    import pandas as pd
+
+    fmt = format_of(path)
+    if fmt == "csv":
+        dtype = defaultdict(lambda: str, {column: "category" for column in CATEGORY_COLUMNS})
+        return pd.read_csv(path, dtype=dtype, keep_default_na=False, usecols=columns)
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+    reader = pd.read_parquet if fmt == "parquet" else pd.read_feather
+    return _text_frame(reader(path, columns=columns, dtype_backend="numpy_nullable"), typed)
+
+def arrow_table_text(table, columns=None, typed=False):
+    """read_table_text() for an in-memory pyarrow Table."""
+    import pandas as pd
+
+    pa = _require_pyarrow()
+    if columns is not None:
+        table = table.select(columns)
+    # Same nullable dtypes as dtype_backend="numpy_nullable" for the schema types
+    nullable = {pa.int64(): pd.Int64Dtype(), pa.float64(): pd.Float64Dtype(), pa.bool_(): pd.BooleanDtype(),
+                pa.string(): pd.StringDtype()}
+    return _text_frame(table.to_pandas(types_mapper=nullable.get), typed)
+
+def _text_frame(frame, typed=False):
+    import pandas as pd
+
+    for column in frame.columns:
+        values = frame[column]
+        if typed and (pd.api.types.is_integer_dtype(values.dtype) or pd.api.types.is_float_dtype(values.dtype)):
+            continue
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # Only the (few) categories are converted; the codes are kept
+            values = values.cat.rename_categories(values.cat.categories.astype(str))
+            if values.isna().any():
+                if "" not in values.cat.categories:
+                    values = values.cat.add_categories([""])
+                values = values.fillna("")
+            frame[column] = values
+            continue
+        if pd.api.types.is_datetime64_any_dtype(values):
+            text = values.map(_to_text, na_action="ignore")
+        else:
+            text = values.astype(str)
+        frame[column] = text.where(values.notna(), "").astype(str)
+    return frame
@@ -1,25 +1,34 @@
-import firebase_admin
-from firebase_admin import credentials, firestore
-import csv
+import argparse
 import os
 import json
-from datetime import datetime
-
-# --- CONFIGURATION ---
-KEY_PATH = 'config/serviceAccountKey.json'
-
-# --- 1. INITIALIZE FIREBASE (EXTRACT) ---
-if not firebase_admin._apps:
-    if os.path.exists(KEY_PATH):
-        with open(KEY_PATH, 'r') as readfile:
-            service_account_info = json.load(readfile)
-        cred = credentials.Certificate(service_account_info)
-        firebase_admin.initialize_app(cred)
-    else:
-        print(f"Error: Key file not found at {KEY_PATH}")
-        exit()
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Make the project root importable when run as a script from this folder
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from analytics.rollups import ROLLUPS_FILE, Rollups, load_current
+from Firebase_Setup.firestore_client import (
+    DOCUMENT_ID, add_client_arguments, client_from_args, get_client,
+)
+from pipeline.metrics import DEFAULT_PROGRESS_EVERY, Metrics, Progress, add_metrics_arguments
+from transform_data.durations import duration_columns
+from transform_data.recipe_index import build_index
+from transform_data.tables import (
+    DEFAULT_BUFFER_ROWS, OUTPUT_FORMATS, TABLES, MemoryTableWriter, columns, file_columns, merge_table,
+    open_writer, read_table, table_path,
+)
 
-db = firestore.client()
+# --- 1. FIRESTORE CLIENT (EXTRACT) ---
+# The client is created on demand by run_etl_process() or the CLI, so this
+# module can be imported (and benchmarked against a FakeFirestore) without
+# credentials.
 
 def clean_timestamp(ts):
     """Helper to convert Firestore Timestamp to ISO string."""
@@ -27,127 +36,396 @@ def clean_timestamp(ts):
         return ts.isoformat()
     return ""
 
-# --- 2. TRANSFORM LOGIC ---
-def run_etl_process():
-    print("Starting ETL Process...")
-    
-    # Data containers for normalized tables
-    recipes_table = []
-    ingredients_table = []
-    steps_table = []
-    interactions_table = []
-
-    # Fetch all recipes
-    docs = db.collection("Recipe").stream()
-    
-    count = 0
-    for doc in docs:
-        count += 1
-        data = doc.to_dict()
-        recipe_id = doc.id
-        
-        print(f"Processing Recipe: {data.get('Title', 'Unknown')}")
-
-        # --- TRANSFORM RECIPE (Parent Table) ---
-        time_info = data.get("TimeRequired", {})
-        
-        recipe_row = {
+# --- 2. EXTRACT INTERACTIONS ---
+INTERACTION_MODES = ("per-recipe", "collection-group")
+
+def fetch_interactions(recipe_ref):
+    """Reads the 'Interaction' sub-collection of one recipe as (id, data) pairs."""
+    return [(i.id, i.to_dict()) for i in recipe_ref.collection("Interaction").stream()]
+
+def stream_group_interactions(query):
+    """Yields (recipe_id, interaction_id, data) for a collection-group query over
+    'Interaction', joining each document on its parent recipe path."""
+    for interaction in query.stream():
+        recipe_ref = interaction.reference.parent.parent
+        # Skip 'Interaction' sub-collections that live under other collections
+        if recipe_ref is None or recipe_ref.parent.id != "Recipe":
+            continue
+        yield recipe_ref.id, interaction.id, interaction.to_dict()
+
+def iter_recipes(client, concurrency=1, interaction_mode="per-recipe"):
+    """Yields (recipe_doc, interactions) in Recipe stream order.
+
+    With concurrency > 1 the per-recipe sub-collection reads are fanned out to a
+    thread pool while the parent stream keeps flowing; at most 2 * concurrency
+    reads are in flight, so memory stays bounded. In "collection-group" mode
+    interactions are left empty here and streamed separately.
+    """
+    docs = client.collection("Recipe").stream()
+
+    if interaction_mode == "collection-group":
+        for doc in docs:
+            yield doc, []
+        return
+
+    if concurrency <= 1:
+        for doc in docs:
+            yield doc, fetch_interactions(doc.reference)
+        return
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        pending = deque()
+        for doc in docs:
+            pending.append((doc, pool.submit(fetch_interactions, doc.reference)))
+            if len(pending) >= 2 * concurrency:
+                head, future = pending.popleft()
+                yield head, future.result()
+        while pending:
+            head, future = pending.popleft()
+            yield head, future.result()
+
+# --- 3. INCREMENTAL EXTRACTION (WATERMARK) ---
+WATERMARK_PATH = 'etl_watermark.json'
+
+def load_watermark(path=WATERMARK_PATH):
+    """Returns the watermark saved by the previous run, or None."""
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def save_watermark(watermark, path=WATERMARK_PATH):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(watermark, f, indent=2)
+
+def outdated_tables(formats, data_dir=""):
+    """Existing table files whose columns are not the current schema's
+    (written by an older version); new rows cannot be merged into them."""
+    outdated = []
+    for name in TABLES:
+        for fmt in formats:
+            path = table_path(name, fmt, data_dir)
+            if os.path.exists(path) and file_columns(path) != columns(name):
+                outdated.append(path)
+    return outdated
+
+def parse_timestamp(value):
+    """Parses an ISO string (or passes a datetime through) as an aware UTC datetime."""
+    ts = datetime.fromisoformat(value) if isinstance(value, str) else value
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts
+
+def advance_watermark(mark, created_at, doc_key):
+    """Returns whichever of `mark` and (created_at, doc_key) sorts last.
+    Documents without a timestamp never move the watermark."""
+    if not created_at:
+        return mark
+    if mark is not None:
+        current = (parse_timestamp(mark["created_at"]), mark["doc_id"])
+        if (parse_timestamp(created_at), doc_key) <= current:
+            return mark
+    return {"created_at": clean_timestamp(created_at), "doc_id": doc_key}
+
+def fetch_new_recipes(client, mark):
+    """Streams Recipe documents created after the watermark, oldest first.
+    Documents without a 'CreatedAt' field are only picked up by a full export."""
+    query = client.collection("Recipe").order_by("CreatedAt").order_by(DOCUMENT_ID)
+    if mark:
+        query = query.start_after({"CreatedAt": parse_timestamp(mark["created_at"]),
+                                   DOCUMENT_ID: mark["doc_id"]})
+    return query.stream()
+
+def fetch_new_interactions(client, mark):
+    """Yields (recipe_id, interaction_id, data) for every Interaction created
+    after the watermark, across all recipes (one collection-group query)."""
+    query = client.collection_group("Interaction").order_by("createdAt").order_by(DOCUMENT_ID)
+    if mark:
+        query = query.start_after({"createdAt": parse_timestamp(mark["created_at"]),
+                                   DOCUMENT_ID: client.document(mark["doc_id"])})
+    return stream_group_interactions(query)
+
+# --- 4. TRANSFORM LOGIC ---
+def transform_recipe(recipe_id, data):
+    """Flattens one Recipe document into (recipe_row, ingredient_rows, step_rows)."""
+    # --- TRANSFORM RECIPE (Parent Table) ---
+    time_info = data.get("TimeRequired", {})
+
+    recipe_row = {
+        "recipe_id": recipe_id,
+        "title": data.get("Title"),
+        "description": data.get("Description"),
+        "prep_time_min": time_info.get("PrepTime"),
+        "cook_time_min": time_info.get("CookTime"),
+        "total_time_min": time_info.get("TotalTime"),
+        "difficulty": data.get("Difficulty"),
+        "category": data.get("Category", "Uncategorized"),
+        "dietary_type": data.get("DietaryType", "Unknown"),
+        "author_id": data.get("AuthorID"),
+        "author_name": data.get("AuthorName"),
+        "created_at": clean_timestamp(data.get("CreatedAt"))
+    }
+
+    # --- TRANSFORM INGREDIENTS (Child Table) ---
+    # One-to-Many relationship: One Recipe -> Many Ingredients
+    ingredient_rows = [
+        {
+            "recipe_id": recipe_id,
+            "name": ing.get("name"),
+            "quantity": ing.get("Quantity"),
+            "unit": ing.get("Unit"),
+            "is_optional": ing.get("Optional", False)
+        }
+        for ing in data.get("Ingredients", [])
+    ]
+
+    # --- TRANSFORM STEPS (Child Table) ---
+    # One-to-Many relationship: One Recipe -> Many Steps
+    step_rows = [
+        {
             "recipe_id": recipe_id,
-            "title": data.get("Title"),
-            "description": data.get("Description"),
-            "prep_time_min": time_info.get("PrepTime"),
-            "cook_time_min": time_info.get("CookTime"),
-            "total_time_min": time_info.get("TotalTime"),
-            "difficulty": data.get("Difficulty"),
-            "category": data.get("Category", "Uncategorized"),
-            "dietary_type": data.get("DietaryType", "Unknown"),
-            "author_id": data.get("AuthorID"),
-            "author_name": data.get("AuthorName"),
-            "created_at": clean_timestamp(data.get("CreatedAt"))
+            "step_number": step.get("StepNumber"),
+            "instruction": step.get("Instruction"),
+            "duration": step.get("Duration"),
+            # Numeric minutes (memoized: steps repeat a few distinct strings)
+            **duration_columns(step.get("Duration")),
         }
-        recipes_table.append(recipe_row)
-
-        # --- TRANSFORM INGREDIENTS (Child Table) ---
-        # One-to-Many relationship: One Recipe -> Many Ingredients
-        raw_ingredients = data.get("Ingredients", [])
-        for ing in raw_ingredients:
-            ing_row = {
-                "recipe_id": recipe_id,
-                "name": ing.get("name"),
-                "quantity": ing.get("Quantity"),
-                "unit": ing.get("Unit"),
-                "is_optional": ing.get("Optional", False)
-            }
-            ingredients_table.append(ing_row)
-
-        # --- TRANSFORM STEPS (Child Table) ---
-        # One-to-Many relationship: One Recipe -> Many Steps
-        raw_steps = data.get("Steps", [])
-        for step in raw_steps:
-            step_row = {
-                "recipe_id": recipe_id,
-                "step_number": step.get("StepNumber"),
-                "instruction": step.get("Instruction"),
-                "duration": step.get("Duration")
-            }
-            steps_table.append(step_row)
-
-        # --- TRANSFORM INTERACTIONS (Sub-collection Extraction) ---
-        # Fetch sub-collection 'Interaction' for this specific recipe
-        interactions = doc.reference.collection("Interaction").stream()
-        
-        for interaction in interactions:
-            idata = interaction.to_dict()
-            interaction_row = {
-                "interaction_id": interaction.id,
-                "recipe_id": recipe_id, # Foreign Key
-                "user_id": idata.get("userID"),
-                "username": idata.get("username"),
-                "type": idata.get("type"),
-                "rating": idata.get("rating"),
-                "cooknote": idata.get("cooknote"),
-                "created_at": clean_timestamp(idata.get("createdAt"))
-            }
-            interactions_table.append(interaction_row)
-
-    # --- 3. LOAD (Export to CSV) ---
-    print(f"\nExtraction complete. Processed {count} recipes.")
-    print("Writing to CSV...")
-
-    # Helper to write CSV
-    def write_csv(filename, fieldnames, data_list):
-        # Modified to save in the same folder (current directory)
-        filepath = filename 
-        with open(filepath, mode='w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(data_list)
-        print(f"✔ Generated {filename} ({len(data_list)} rows)")
-
-    # Write Recipes
-    write_csv('recipes.csv', 
-              ["recipe_id", "title", "description", "prep_time_min", "cook_time_min", 
-               "total_time_min", "difficulty", "category", "dietary_type", 
-               "author_id", "author_name", "created_at"], 
-              recipes_table)
-
-    # Write Ingredients
-    write_csv('ingredients.csv', 
-              ["recipe_id", "name", "quantity", "unit", "is_optional"], 
-              ingredients_table)
-
-    # Write Steps
-    write_csv('steps.csv', 
-              ["recipe_id", "step_number", "instruction", "duration"], 
-              steps_table)
-
-    # Write Interactions
-    write_csv('interactions.csv', 
-              ["interaction_id", "recipe_id", "user_id", "username", 
-               "type", "rating", "cooknote", "created_at"], 
-              interactions_table)
-
-    print(f"\nETL Pipeline Finished successfully. Data saved to current folder.")
+        for step in data.get("Steps", [])
+    ]
+    return recipe_row, ingredient_rows, step_rows
+
+def transform_interaction(interaction_id, recipe_id, idata):
+    """Flattens one Interaction document into an interactions row."""
+    return {
+        "interaction_id": interaction_id,
+        "recipe_id": recipe_id, # Foreign Key
+        "user_id": idata.get("userID"),
+        "username": idata.get("username"),
+        "type": idata.get("type"),
+        "rating": idata.get("rating"),
+        "cooknote": idata.get("cooknote"),
+        "created_at": clean_timestamp(idata.get("createdAt"))
+    }
+
+def run_etl_process(client=None, concurrency=1, interaction_mode="per-recipe",
+                    incremental=False, watermark_path=WATERMARK_PATH,
+                    buffer_rows=DEFAULT_BUFFER_ROWS, formats=("csv",), metrics=None,
+                    progress_every=DEFAULT_PROGRESS_EVERY, data_dir="", keep_tables=False, index=True,
+                    rollups=None):
+    """Runs the Firestore -> normalized tables export and returns extraction throughput stats.
+
+    client: Firestore client (defaults to the real one, see
+        firestore_client.get_client()); a FakeFirestore or any object with the
+        same collection()/collection_group()/stream() API can be passed in.
+    concurrency: number of parallel Interaction sub-collection reads.
+    interaction_mode: "per-recipe" (one query per recipe) or "collection-group"
+        (one query for every Interaction, joined on the parent recipe path).
+    incremental: only read documents created after the saved watermark and
+        upsert them into the existing CSVs. Falls back to a full export when
+        no watermark exists yet, or when a table was written with older
+        columns.
+    buffer_rows: rows buffered per table before they are flushed to disk.
+    formats: output formats to write, any of tables.OUTPUT_FORMATS
+        ("csv", "parquet", "feather").
+    metrics: a pipeline.metrics.Metrics to record documents read, rows and
+        bytes written per table and stage timings into.
+    progress_every: seconds between progress lines (None for silence).
+    data_dir: folder the tables (and merges) are written to; default cwd.
+    keep_tables: also keep every table in memory and return them as typed
+        pyarrow Tables under "tables" (full exports only). `formats` may
+        then be empty, so nothing is written to disk.
+    index: write a recipe_id index next to every table file (see
+        recipe_index.py), rebuilt after incremental merges.
+    rollups: path of the insight rollups (see analytics/rollups.py) to keep
+        up to date. A full export rebuilds them; an incremental run folds in
+        only the new rows, unless they are missing or stale.
+    """
+    if interaction_mode not in INTERACTION_MODES:
+        raise ValueError(f"Unknown interaction_mode: {interaction_mode!r}")
+    unknown = [fmt for fmt in formats if fmt not in OUTPUT_FORMATS]
+    if unknown:
+        raise ValueError(f"Unknown output format(s): {unknown}")
+    client = client or get_client()
+    metrics = metrics or Metrics("etl")
+
+    watermark = load_watermark(watermark_path) if incremental else None
+    if incremental and watermark is None:
+        print("No watermark found, running a full export first.")
+    outdated = outdated_tables(formats, data_dir) if watermark else []
+    if outdated:
+        print(f"{outdated[0]} has older columns, running a full export instead.")
+        watermark = None
+    if not formats and not keep_tables:
+        raise ValueError("Nothing to write: pass at least one format or keep_tables=True")
+    if keep_tables and watermark:
+        raise ValueError("keep_tables needs a full export; an incremental run only sees new documents")
+    new_watermark = dict(watermark or {"recipes": None, "interactions": None})
+
+    print(f"Starting {'incremental' if watermark else 'full'} ETL Process...")
+
+    # Each normalized row goes straight to one writer per output format. An
+    # incremental run writes to '<table>.<ext>.delta' files merged in afterwards.
+    suffix = '.delta' if watermark else ''
+    writers = {
+        name: [open_writer(fmt, name, table_path(name, fmt, data_dir) + suffix, buffer_rows) for fmt in formats]
+        for name in TABLES
+    }
+    # In-memory copies go last, so writers[name][:len(formats)] are the files.
+    # An incremental run keeps its new rows to fold them into the rollups.
+    previous_rollups = load_current(rollups) if rollups and watermark else None
+    keep_batch = keep_tables or previous_rollups is not None
+    memory = {name: MemoryTableWriter(name, buffer_rows) for name in TABLES} if keep_batch else {}
+    for name, writer in memory.items():
+        writers[name].append(writer)
+
+    def emit(name, rows):
+        for writer in writers[name]:
+            writer.writerows(rows)
+    # Keys replaced by this run (only tracked for incremental merges)
+    changed_recipes = set()
+    new_interactions = set()
+
+    def add_interaction(recipe_id, interaction_id, idata):
+        emit("interactions", [transform_interaction(interaction_id, recipe_id, idata)])
+        if watermark:
+            new_interactions.add(interaction_id)
+        new_watermark["interactions"] = advance_watermark(
+            new_watermark["interactions"], idata.get("createdAt"),
+            f"Recipe/{recipe_id}/Interaction/{interaction_id}")
+
+    # Fetch recipes (and, for a full export, their interactions)
+    started = time.perf_counter()
+    if watermark:
+        recipe_stream = ((doc, []) for doc in fetch_new_recipes(client, watermark["recipes"]))
+    else:
+        recipe_stream = iter_recipes(client, concurrency, interaction_mode)
+
+    count = 0
+    progress = Progress("Recipes processed", progress_every)
+    try:
+        for doc, interactions in recipe_stream:
+            count += 1
+            data = doc.to_dict()
+            recipe_id = doc.id
+            progress.update()
+
+            recipe_row, ingredient_rows, step_rows = transform_recipe(recipe_id, data)
+            emit("recipes", [recipe_row])
+            emit("ingredients", ingredient_rows)
+            emit("steps", step_rows)
+            if watermark:
+                changed_recipes.add(recipe_id)
+            new_watermark["recipes"] = advance_watermark(
+                new_watermark["recipes"], data.get("CreatedAt"), recipe_id)
+
+            # --- TRANSFORM INTERACTIONS (Sub-collection Extraction) ---
+            # Interactions for this recipe were fetched by iter_recipes()
+            for interaction_id, idata in interactions:
+                add_interaction(recipe_id, interaction_id, idata)
+
+        if watermark:
+            # New interactions may belong to recipes exported in earlier runs
+            group_stream = fetch_new_interactions(client, watermark["interactions"])
+        elif interaction_mode == "collection-group":
+            group_stream = stream_group_interactions(client.collection_group("Interaction"))
+        else:
+            group_stream = ()
+        for recipe_id, interaction_id, idata in group_stream:
+            add_interaction(recipe_id, interaction_id, idata)
+    finally:
+        for table_writers in writers.values():
+            for writer in table_writers:
+                writer.close()
+
+    # --- 5. LOAD (Finalize Output Files) ---
+    elapsed = time.perf_counter() - started
+    rate = count / elapsed if elapsed > 0 else 0.0
+    print(f"\nExtraction complete. Processed {count} recipes in {elapsed:.2f}s ({rate:.1f} recipes/sec).")
+
+    interaction_rows = writers["interactions"][0].rows
+    metrics.add_time("extract", elapsed)
+    metrics.set("recipes_per_sec", rate)
+    metrics.inc("documents_read", count, collection="Recipe")
+    metrics.inc("documents_read", interaction_rows, collection="Interaction")
+    for name, table_writers in writers.items():
+        metrics.inc("rows_emitted", table_writers[0].rows, table=name)
+    finalize_started = time.perf_counter()
+    if watermark:
+        print(f"Merging {count} recipes and {interaction_rows} interactions into existing tables...")
+        # Child rows of a re-exported recipe replace its old ones wholesale
+        for name, table_writers in writers.items():
+            replaced = new_interactions if name == "interactions" else changed_recipes
+            for fmt, writer in zip(formats, table_writers):
+                path = table_path(name, fmt, data_dir)
+                total = merge_table(fmt, name, path, writer.path, replaced, buffer_rows)
+                metrics.inc("bytes_written", os.path.getsize(path), table=name, format=fmt)
+                print(f"✔ Merged {writer.rows} rows into {path} ({total} rows)")
+    else:
+        for name, table_writers in writers.items():
+            for fmt, writer in zip(formats, table_writers):
+                metrics.inc("bytes_written", os.path.getsize(writer.path), table=name, format=fmt)
+                print(f"✔ Generated {writer.path} ({writer.rows} rows)")
+
+    save_watermark(new_watermark, watermark_path)
+    metrics.add_time("load", time.perf_counter() - finalize_started)
+
+    if index and formats:
+        with metrics.timer("index"):
+            for name in TABLES:
+                for fmt in formats:
+                    build_index(table_path(name, fmt, data_dir))
+        print(f"✔ Indexed recipe_id in {len(TABLES) * len(formats)} tables")
+
+    if rollups:
+        with metrics.timer("rollups"):
+            state = previous_rollups or Rollups()
+            if memory:
+                state.apply({name: writer.table().to_pandas() for name, writer in memory.items()})
+            else:
+                state.apply({name: read_table(table_path(name, formats[0], data_dir)) for name in TABLES})
+            state.record_sources(table_path(name, fmt, data_dir) for name in TABLES for fmt in formats)
+            state.save(rollups)
+        print(f"✔ {'Updated' if previous_rollups else 'Rebuilt'} the insight rollups in {rollups}")
+
+    if formats:
+        print(f"\nETL Pipeline Finished successfully. Data saved to {os.path.abspath(data_dir or '.')}.")
+    else:
+        print(f"\nETL Pipeline Finished successfully. Tables kept in memory.")
+    stats = {"recipes": count, "interactions": interaction_rows,
+             "seconds": elapsed, "recipes_per_sec": rate}
+    if keep_tables:
+        stats["tables"] = {name: writer.table() for name, writer in memory.items()}
+    return stats
 
 if __name__ == "__main__":
-    run_etl_process()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Export Firestore recipes to normalized CSVs.")
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="Parallel Interaction sub-collection reads (default: 1)")
+    parser.add_argument("--interactions", choices=INTERACTION_MODES, default="per-recipe",
+                        help="How to extract the Interaction sub-collections")
+    parser.add_argument("--incremental", action="store_true",
+                        help=f"Only export documents newer than the watermark in {WATERMARK_PATH}")
+    parser.add_argument("--buffer-rows", type=int, default=DEFAULT_BUFFER_ROWS,
+                        help=f"Rows buffered per table before flushing (default: {DEFAULT_BUFFER_ROWS})")
+    parser.add_argument("--format", dest="formats", action="append", choices=sorted(OUTPUT_FORMATS),
+                        help="Output format; repeat to write several (default: csv)")
+    parser.add_argument("--no-index", action="store_true",
+                        help="Do not write the <table>.<ext>.idx.npz recipe_id indexes")
+    parser.add_argument("--rollups", action="store_true",
+                        help=f"Keep the insight rollups in {ROLLUPS_FILE} up to date (see analytics/rollups.py)")
+    add_client_arguments(parser)
+    add_metrics_arguments(parser, "etl")
+    args = parser.parse_args()
+    try:
+        client = client_from_args(args)
+    except FileNotFoundError as error:
+        print(f"Error: {error}")
+        exit()
+    metrics = Metrics("etl")
+    run_etl_process(client, concurrency=args.concurrency, interaction_mode=args.interactions,
+                    incremental=args.incremental, buffer_rows=args.buffer_rows,
+                    formats=args.formats or ["csv"], metrics=metrics,
+                    progress_every=args.progress_every, index=not args.no_index,
+                    rollups=ROLLUPS_FILE if args.rollups else None)
+    metrics.save(args.metrics, args.prometheus)
+    print(f"Metrics saved to: {args.metrics}")